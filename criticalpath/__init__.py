@@ -1,4 +1,12 @@
-from .criticalpath import Node
+from .criticalpath import Node, CycleError
+from .compiled import CompiledNetwork
+from .index import ScheduleIndex
+from .parallel import batch_update
+from .resources import ResourceSchedule
+from .scenarios import FrozenNetwork, ScenarioResult
+from .simulation import simulate, SimulationResult
+from .snapshot import Snapshot, load_snapshot
+from .stats import Stats
 
 VERSION = (0, 1, 5)
 __version__ = '.'.join(map(str, VERSION))
@@ -0,0 +1,383 @@
+#!/usr/bin/env python
+"""
+Benchmarks for the critical path calculations.
+
+To print the results:
+
+    python -m criticalpath.benchmarks
+
+To time only some generators and sizes, and save the results as JSON to
+compare with another version:
+
+    python -m criticalpath.benchmarks --generators chain layered --sizes 1000 10000 --output new.json
+    python -m criticalpath.benchmarks --compare old.json new.json
+
+Networks are generated as nested (name, lag, tasks, links) descriptions, in
+the form used by parallel.describe(), so building one from a description
+can be timed like any other step.
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import operator
+import os
+import platform
+import random
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    # Python 2 has no tracemalloc, so memory is not measured there.
+    tracemalloc = None
+
+from . import __version__
+from .criticalpath import Node, iter_dsv, parse_number
+
+PY3 = sys.version_info[0] >= 3
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+class UnslottedNode(object):
+    """
+    A leaf task laid out the way Node was before it used slots, with a
+    per-instance dictionary and every child container created eagerly.
+
+    Only used as a reference point for measure_node_memory().
+    """
+
+    def __init__(self, name, duration=None, lag=0):
+        self.parent = None
+        self.name = name
+        self.description = None
+        self._duration = duration
+        self._lag = lag
+        self.drag = None
+        self._es = None
+        self._ef = None
+        self._ls = None
+        self._lf = None
+        self._free_float = None
+        self._total_float = None
+        self.nodes = []
+        self.name_to_node = {}
+        self.to_nodes = set()
+        self.incoming_nodes = set()
+        self.forward_pending = set()
+        self.backward_pending = []
+        self._critical_path = None
+        self.exit_node = None
+
+
+def measure_node_memory(node_class=Node, count=100000):
+    """
+    Returns the average number of bytes allocated per leaf task, or None
+    without tracemalloc.
+    """
+    if tracemalloc is None:
+        return
+    nodes = [None] * count
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(count):
+            nodes[i] = node_class(i, duration=1)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before) / float(count)
+
+
+def ladder(size, rng):
+    """
+    A chain of diamonds with 2**(size/3) simple paths from end to end.
+    """
+    n = max(1, size // 3)
+    tasks = [(i, 1 if i % 3 != 2 else 2, 0, None) for i in range(3 * n + 1)]
+    links = []
+    for i in range(n):
+        links.extend([(3 * i, 3 * i + 1), (3 * i, 3 * i + 2), (3 * i + 1, 3 * i + 3), (3 * i + 2, 3 * i + 3)])
+    return 'ladder', 0, tasks, links
+
+
+def layered(size, rng, degree=3):
+    """
+    Levels of about sqrt(size) tasks, each depending on up to degree random
+    tasks in the level before.
+    """
+    width = max(1, int(size ** 0.5))
+    tasks = [(i, rng.randint(0, 10), rng.choice((0, 0, 0, 1)), None) for i in range(size)]
+    links = []
+    for i in range(width, size):
+        start = (i // width - 1) * width
+        for j in set(rng.randrange(start, start + width) for _ in range(degree)):
+            links.append((j, i))
+    return 'layered', 0, tasks, links
+
+
+def fan(size, rng):
+    """
+    One task that all but the last task depend on, and a last task that depends on all of them.
+    """
+    size = max(3, size)
+    tasks = [(i, rng.randint(0, 10), 0, None) for i in range(size)]
+    links = [(0, i) for i in range(1, size - 1)] + [(i, size - 1) for i in range(1, size - 1)]
+    return 'fan', 0, tasks, links
+
+
+def chain(size, rng):
+    """
+    Tasks that each depend on the one before.
+    """
+    tasks = [(i, rng.randint(0, 10), 0, None) for i in range(size)]
+    links = [(i - 1, i) for i in range(1, size)]
+    return 'chain', 0, tasks, links
+
+
+def nested(size, rng):
+    """
+    A layered network of about sqrt(size) subprojects, each a layered
+    network of about sqrt(size) tasks.
+    """
+    count = max(1, int(size ** 0.5))
+    _, lag, projects, links = layered(count, rng)
+    tasks = []
+    for i, (name, _, project_lag, _) in enumerate(projects):
+        network = (name,) + layered(max(1, size // count), rng)[1:]
+        tasks.append((name, None, project_lag, network))
+    return 'nested', lag, tasks, links
+
+
+def fixture(deps):
+    """
+    Returns a generator of the shipped timings and the given dependencies
+    file, which ignores the size. Tasks named only in the dependencies are
+    given no duration, as with missing='create_zero'.
+    """
+
+    def generate(size, rng):
+        path = os.path.join(BASE_DIR, 'fixtures')
+        index = {}
+        tasks = []
+        for name, duration in iter_dsv(os.path.join(path, 'timings.dsv'), (0, 1)):
+            if name not in index:
+                index[name] = len(tasks)
+                tasks.append((name, parse_number(duration), 0, None))
+        links = []
+        for from_name, to_name in iter_dsv(os.path.join(path, deps), ('PARENT_ID', 'UPROC_ID')):
+            for name in (from_name, to_name):
+                if name not in index:
+                    index[name] = len(tasks)
+                    tasks.append((name, 0, 0, None))
+            links.append((index[from_name], index[to_name]))
+        return deps, 0, tasks, links
+
+    generate.__name__ = os.path.splitext(deps)[0]
+    return generate
+
+
+GENERATORS = dict((_.__name__, _) for _ in (
+    ladder, layered, fan, chain, nested, fixture('deps_small.dsv'), fixture('deps_big.dsv')))
+
+# Generators whose networks do not depend on the size.
+FIXED_GENERATORS = ('deps_small', 'deps_big')
+
+
+def count(description):
+    """
+    Returns the number of tasks and links in a description, including nested ones.
+    """
+    tasks = len(description[2])
+    links = len(description[3])
+    for task in description[2]:
+        if task[3] is not None:
+            sub_tasks, sub_links = count(task[3])
+            tasks += sub_tasks
+            links += sub_links
+    return tasks, links
+
+
+def build(description):
+    """
+    Returns a new parent node built from a description with add() and link().
+    """
+    name, lag, tasks, links = description
+    parent = Node(name, lag=lag)
+    children = []
+    for task_name, duration, task_lag, network in tasks:
+        if network is None:
+            children.append(parent.add(Node(task_name, duration=duration, lag=task_lag)))
+        else:
+            children.append(parent.add(build(network)))
+    for i, j in links:
+        parent.link(children[i], children[j])
+    return parent
+
+
+def steps(description):
+    """
+    Yields the name of each step in building and scheduling a network, just
+    before the step is run.
+    """
+    yield 'add/link'
+    parent = build(description)
+
+    yield 'is_acyclic'
+    parent.is_acyclic()
+
+    # Nested subprojects are scheduled from the bottom up.
+    yield 'update_all'
+    if any(_._nodes for _ in parent.nodes):
+        parent.update_tree()
+    else:
+        parent.update_all()
+
+    # Forget the cached path so it is found again from the scheduled times.
+    parent._critical_path = None
+    yield 'get_critical_path'
+    parent.get_critical_path()
+
+
+def measure_steps(description, memory=False):
+    """
+    Returns a list of each step's name and its wall time in seconds, or,
+    if memory is set, the peak memory in bytes traced while it ran.
+    """
+    assert not memory or tracemalloc is not None, 'Measuring memory requires tracemalloc.'
+    timer = getattr(time, 'perf_counter', time.time)
+    results = []
+    gc.collect()
+    if memory:
+        tracemalloc.start()
+    try:
+        step = None
+        for next_step in steps(description):
+            if step is not None:
+                results.append((step, tracemalloc.get_traced_memory()[1] - start if memory else timer() - start))
+            step = next_step
+            if memory:
+                # Older Pythons have no reset_peak(), so forget the traces instead.
+                if hasattr(tracemalloc, 'reset_peak'):
+                    tracemalloc.reset_peak()
+                else:
+                    tracemalloc.clear_traces()
+                start = tracemalloc.get_traced_memory()[0]
+            else:
+                start = timer()
+        results.append((step, tracemalloc.get_traced_memory()[1] - start if memory else timer() - start))
+    finally:
+        if memory:
+            tracemalloc.stop()
+    return results
+
+
+def run(generators=None, sizes=DEFAULT_SIZES, seed=0, memory=True, callback=None):
+    """
+    Runs every step on networks from each generator at each size, and returns
+    a list of result dictionaries.
+
+    Each result has the generator, size, number of tasks and links, step,
+    wall time in seconds, and, if memory is set, the peak memory in bytes
+    traced while the step ran. Memory is traced in a second run, so tracing
+    does not slow the timed one, and only where tracemalloc is available,
+    with peak_bytes None otherwise. If callback is given, it is called with each
+    result as it is made.
+    """
+    results = []
+    for name in generators or sorted(GENERATORS):
+        for size in ((None,) if name in FIXED_GENERATORS else sizes):
+            description = GENERATORS[name](size, random.Random(seed))
+            tasks, links = count(description)
+            times = measure_steps(description)
+            if memory and tracemalloc is not None:
+                peaks = [peak for _, peak in measure_steps(description, memory=True)]
+            else:
+                peaks = [None] * len(times)
+            for (step, seconds), peak in zip(times, peaks):
+                result = {
+                    'generator': name,
+                    'size': size,
+                    'tasks': tasks,
+                    'links': links,
+                    'step': step,
+                    'seconds': seconds,
+                    'peak_bytes': peak,
+                }
+                results.append(result)
+                if callback is not None:
+                    callback(result)
+    return results
+
+
+def save(results, fp):
+    """
+    Writes results from run() to an open file as JSON, along with the package
+    and Python versions they were measured with.
+    """
+    json.dump({
+        'version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }, fp, indent=1, sort_keys=True)
+
+
+def compare(old, new):
+    """
+    Returns a list of (generator, size, step, old seconds, new seconds) for
+    each step found in both sets of saved results.
+    """
+    key = operator.itemgetter('generator', 'size', 'step')
+    old_seconds = dict((key(_), _['seconds']) for _ in old['results'])
+    return [key(_) + (old_seconds[key(_)], _['seconds']) for _ in new['results'] if key(_) in old_seconds]
+
+
+def format_result(result):
+    peak = result['peak_bytes']
+    return '%-10s %8s %8i %8i %-18s %10.6f %12s' % (
+        result['generator'], result['size'] or '-', result['tasks'], result['links'], result['step'],
+        result['seconds'], '-' if peak is None else '%i' % peak)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the critical path calculations.')
+    parser.add_argument('--generators', nargs='+', choices=sorted(GENERATORS),
+                        help='Networks to generate. All by default.')
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES,
+                        help='Numbers of tasks to generate.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help='Skip tracing peak memory.')
+    parser.add_argument('--output', help='A file to save the results to as JSON.')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='Compares two saved results.')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], 'rb') as fin:
+            old = json.load(fin)
+        with open(args.compare[1], 'rb') as fin:
+            new = json.load(fin)
+        for generator, size, step, old_seconds, new_seconds in compare(old, new):
+            print('%-10s %8s %-18s %10.6f %10.6f %6.2fx' % (
+                generator, size or '-', step, old_seconds, new_seconds, old_seconds / max(new_seconds, 1e-9)))
+        return
+
+    if tracemalloc is not None:
+        for node_class in (UnslottedNode, Node):
+            print('%s: %.1f bytes per leaf task' % (node_class.__name__, measure_node_memory(node_class)))
+    print('%-10s %8s %8s %8s %-18s %10s %12s' % ('generator', 'size', 'tasks', 'links', 'step', 'seconds', 'peak bytes'))
+    results = run(args.generators, args.sizes, seed=args.seed, memory=not args.no_memory,
+                  callback=lambda result: print(format_result(result)))
+    if args.output:
+        with (open(args.output, 'w', newline='', encoding='utf-8') if PY3 else open(args.output, 'wb')) as fout:
+            save(results, fout)
+
+
+if __name__ == '__main__':
+    main()
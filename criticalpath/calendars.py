@@ -0,0 +1,296 @@
+"""
+Working calendars, for turning a schedule into dates and times.
+
+Durations, lags and the calculated times are numbers of working units, such
+as hours, counted from the start of the parent's calendar. A Calendar holds
+its working periods in sorted lists, with the working time done before each
+period added up once when it is built, so converting between a number of
+working units and a datetime is a binary search, not a walk over the days.
+
+When NumPy is installed, the dates of every task are looked up at once.
+
+Tasks can have calendars of their own, such as a crew that does not work
+Fridays. Tasks are then scheduled from one to the next in datetimes, each
+moving forward or back on its own calendar.
+
+Datetimes are naive, in whatever local time the calendar's periods are in.
+"""
+from __future__ import print_function
+
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class Dates(namedtuple('Dates', ('es', 'ef', 'ls', 'lf'))):
+    """
+    The earliest start, earliest finish, latest start and latest finish of a task, as datetimes.
+    """
+    __slots__ = ()
+
+
+def _seconds(delta):
+    return delta.days * 86400 + delta.seconds
+
+
+class Calendar(object):
+    """
+    Working time as a sorted list of (start, end) datetime periods.
+
+    Overlapping or touching periods are merged. unit is the timedelta that
+    one working unit stands for.
+    """
+
+    def __init__(self, periods, unit=timedelta(hours=1)):
+        merged = []
+        for start, end in sorted(periods):
+            if end <= start:
+                continue
+            if merged and start <= merged[-1][1]:
+                if end > merged[-1][1]:
+                    merged[-1][1] = end
+            else:
+                merged.append([start, end])
+        assert merged, 'A calendar must have some working time.'
+        self.starts = [_[0] for _ in merged]
+        self.ends = [_[1] for _ in merged]
+        self.unit = unit
+        self._unit_seconds = _seconds(unit)
+        # Working seconds done before each period starts, and by the end of the last.
+        self.cumulative = [0]
+        for start, end in merged:
+            self.cumulative.append(self.cumulative[-1] + _seconds(end - start))
+        self._arrays = None
+
+    @classmethod
+    def weekly(cls, start, end, hours=((9, 17),), weekdays=(0, 1, 2, 3, 4), holidays=(), unit=timedelta(hours=1)):
+        """
+        Returns a calendar of the given working hours on the given weekdays,
+        Monday being 0, from the date start up to but not including the date end.
+
+        Each of hours is a (start, end) pair of hours of the day or
+        datetime.time values, and a shift ending at or before it starts runs
+        past midnight. holidays are dates with no working time.
+        """
+        holidays = set(holidays)
+        shifts = []
+        for shift_start, shift_end in hours:
+            if not isinstance(shift_start, time):
+                shift_start = time(shift_start)
+            if not isinstance(shift_end, time):
+                shift_end = time(shift_end % 24)
+            shifts.append((shift_start, shift_end))
+        if isinstance(start, datetime):
+            start = start.date()
+        if isinstance(end, datetime):
+            end = end.date()
+        periods = []
+        day = start
+        while day < end:
+            if day.weekday() in weekdays and day not in holidays:
+                for shift_start, shift_end in shifts:
+                    period_start = datetime.combine(day, shift_start)
+                    period_end = datetime.combine(day, shift_end)
+                    if period_end <= period_start:
+                        period_end += timedelta(days=1)
+                    periods.append((period_start, period_end))
+            day += timedelta(days=1)
+        return cls(periods, unit=unit)
+
+    @property
+    def start(self):
+        """
+        When the first working period starts, which is 0 working units.
+        """
+        return self.starts[0]
+
+    @property
+    def work(self):
+        """
+        The total working time in the calendar, in working units.
+        """
+        return self._units(self.cumulative[-1])
+
+    def _units(self, seconds):
+        units, remainder = divmod(seconds, self._unit_seconds)
+        return units if not remainder else float(seconds) / self._unit_seconds
+
+    def offset(self, moment):
+        """
+        Returns the working units done from the start of the calendar up to
+        the given datetime, which counts time between periods as no work.
+        """
+        i = bisect_right(self.starts, moment) - 1
+        if i < 0:
+            return 0
+        seconds = self.cumulative[i] + min(_seconds(moment - self.starts[i]), self.cumulative[i + 1] - self.cumulative[i])
+        return self._units(seconds)
+
+    def moment(self, offset, finish=False):
+        """
+        Returns the datetime when the given number of working units from the
+        start of the calendar have been done.
+
+        An offset falling between two periods is the start of the later
+        period, or with finish set, the end of the earlier one.
+        """
+        seconds = offset * self._unit_seconds
+        cumulative = self.cumulative
+        if seconds < 0 or seconds > cumulative[-1]:
+            raise ValueError('%s working units is outside the calendar, which has %s.' % (offset, self.work))
+        if finish:
+            i = max(bisect_left(cumulative, seconds) - 1, 0)
+        else:
+            i = min(bisect_right(cumulative, seconds) - 1, len(self.starts) - 1)
+        return self.starts[i] + timedelta(seconds=seconds - cumulative[i])
+
+    def moments(self, offsets, finish=False):
+        """
+        Returns a list of the datetimes for a sequence of offsets, like
+        moment() but quicker for many at once. finish can be a single value
+        or a sequence with one for each offset.
+        """
+        if np is None:
+            if isinstance(finish, bool):
+                return [self.moment(_, finish) for _ in offsets]
+            return [self.moment(_, f) for _, f in zip(offsets, finish)]
+        if self._arrays is None:
+            self._arrays = (
+                np.array(self.cumulative, dtype=np.int64),
+                np.array(self.starts, dtype='datetime64[us]'))
+        cumulative, starts = self._arrays
+        seconds = np.asarray(offsets) * self._unit_seconds
+        if not len(seconds):
+            return []
+        outside = (seconds < 0) | (seconds > cumulative[-1])
+        if outside.any():
+            self.moment(np.asarray(offsets)[outside][0].item())
+        later = np.minimum(np.searchsorted(cumulative, seconds, 'right') - 1, len(starts) - 1)
+        earlier = np.maximum(np.searchsorted(cumulative, seconds, 'left') - 1, 0)
+        i = np.where(finish, earlier, later)
+        elapsed = seconds - cumulative[i]
+        if elapsed.dtype.kind == 'f':
+            elapsed = np.round(elapsed * 1000000).astype(np.int64)
+        else:
+            elapsed = elapsed * 1000000
+        return (starts[i] + elapsed.astype('timedelta64[us]')).tolist()
+
+    def add(self, moment, work, finish=True):
+        """
+        Returns the datetime after the given number of working units from a datetime.
+
+        See moment() for finish.
+        """
+        return self.moment(self.offset(moment) + work, finish=finish)
+
+    def subtract(self, moment, work, finish=False):
+        """
+        Returns the datetime the given number of working units before a datetime.
+
+        See moment() for finish.
+        """
+        return self.moment(self.offset(moment) - work, finish=finish)
+
+    def between(self, start, end):
+        """
+        Returns the working units from one datetime to another.
+        """
+        return self.offset(end) - self.offset(start)
+
+
+class CalendarSchedule(object):
+    """
+    The dates of each task in a schedule, keyed by node.
+    """
+
+    def __init__(self, parent, dates):
+        self.parent = parent
+        self.dates = dates
+
+    def __getitem__(self, node):
+        return self.dates[node]
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def start(self):
+        """
+        When the first task starts.
+        """
+        return min(_.es for _ in self.dates.values()) if self.dates else None
+
+    @property
+    def finish(self):
+        """
+        When the last task finishes.
+        """
+        return max(_.ef for _ in self.dates.values()) if self.dates else None
+
+
+def schedule(parent):
+    """
+    Returns a CalendarSchedule of the parent's child nodes on the parent's
+    calendar, and each task's own calendar where it has one.
+
+    Without any task calendars, the dates are read off the numbers
+    update_all() calculated, with a binary search for each. Otherwise the
+    tasks are scheduled in datetimes in topological order.
+    """
+    calendar = parent.calendar
+    assert calendar is not None, 'The parent must have a calendar.'
+    if parent._needs_update():
+        parent.update_all()
+    nodes = parent.nodes
+    if all(node.calendar is None or node.calendar is calendar for node in nodes):
+        finish = [node.duration > 0 for node in nodes]
+        return CalendarSchedule(parent, dict(zip(nodes, map(
+            Dates,
+            calendar.moments([node._es for node in nodes]),
+            calendar.moments([node._ef for node in nodes], finish),
+            calendar.moments([node._ls for node in nodes]),
+            calendar.moments([node._lf for node in nodes], finish)))))
+
+    order = parent.topological_order()
+    project_start = calendar.moment(parent.lag)
+    es = {}
+    ef = {}
+    for node in order:
+        node_calendar = node.calendar or calendar
+        base = None
+        for from_node in node.incoming_nodes:
+            if from_node.parent is parent and (base is None or ef[from_node] > base):
+                base = ef[from_node]
+        offset = node_calendar.offset(project_start if base is None else base) + node.lag
+        es[node] = node_calendar.moment(offset)
+        ef[node] = node_calendar.moment(offset + node.duration, finish=True) if node.duration > 0 else es[node]
+
+    # Every last task may finish as late as the project does.
+    project_finish = max(ef[node] for node in parent.last_nodes)
+    dates = {}
+    ls = {}
+    for node in reversed(order):
+        node_calendar = node.calendar or calendar
+        lf = None
+        for to_node in node.to_nodes:
+            if to_node.parent is not parent:
+                continue
+            # The latest this node can finish for the successor to start on
+            # time, after its lag, which is counted on the successor's calendar.
+            finish = ls[to_node]
+            if to_node.lag:
+                to_calendar = to_node.calendar or calendar
+                finish = to_calendar.moment(to_calendar.offset(finish) - to_node.lag)
+            if lf is None or finish < lf:
+                lf = finish
+        if lf is None:
+            lf = project_finish
+        offset = node_calendar.offset(lf)
+        lf = node_calendar.moment(offset, finish=node.duration > 0)
+        ls[node] = node_calendar.moment(offset - node.duration)
+        dates[node] = Dates(es[node], ef[node], ls[node], lf)
+    return CalendarSchedule(parent, dates)
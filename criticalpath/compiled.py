@@ -0,0 +1,351 @@
+"""
+Array-backed form of a task network, for scheduling large networks without
+touching a Node object for every task and link.
+
+NumPy is used when it is installed, so each level of the network is
+scheduled with a few vectorized reductions. Otherwise the same arrays are
+held in the standard array module and scheduled with plain loops.
+"""
+from __future__ import print_function
+
+import copy
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Python 2's array module has no 'q' typecode, so 'l' stands in for it there,
+# which is 64 bits wide on 64-bit Unix.
+try:
+    INTEGER = array('q').typecode
+except ValueError:
+    INTEGER = 'l'
+
+
+def integral(values):
+    """
+    Returns true if all the values are integers that fit in an INTEGER array.
+    """
+    # Much quicker than checking each value against numbers.Integral.
+    try:
+        array(INTEGER, values)
+    except (TypeError, OverflowError):
+        return False
+    return True
+
+
+class CompiledNetwork(object):
+    """
+    The child nodes of a parent node, compiled into integer-indexed arrays.
+
+    Nodes are numbered level by level, where a node's level is one more than
+    the highest level of its predecessors, so each level is a contiguous range
+    of indexes and every link points to a higher index. Links are stored in
+    compressed sparse row form in both directions: the successors of node i
+    are targets[offsets[i]:offsets[i+1]] and its predecessors are
+    sources[in_offsets[i]:in_offsets[i+1]]. Level k holds the nodes
+    level_offsets[k] to level_offsets[k+1].
+
+    Call update() to fill the es, ef, ls, lf, total_float, free_float and
+    path_length arrays, and write_back() to copy them onto the Node objects.
+    update() only reads the arrays and start, the parent's lag.
+    """
+
+    def __init__(self, parent):
+        self.parent = parent
+
+        # Translate the links into lists of positions in parent.nodes once, so
+        # everything after this works on integers instead of hashing nodes.
+        position = dict((id(node), i) for i, node in enumerate(parent.nodes))
+        successors = []
+        predecessors = []
+        for node in parent.nodes:
+            row = [position.get(id(_)) for _ in node.to_nodes]
+            successors.append([_ for _ in row if _ is not None])
+            row = [position.get(id(_)) for _ in node.incoming_nodes]
+            predecessors.append([_ for _ in row if _ is not None])
+
+        order = self._compile(
+            successors, predecessors, [_.duration for _ in parent.nodes], [_.lag for _ in parent.nodes], parent.lag)
+        self.nodes = [parent.nodes[_] for _ in order]
+
+    @classmethod
+    def from_lists(cls, successors, predecessors, durations, lags, start=0, positions=None):
+        """
+        Returns a network of tasks numbered from 0, given the successors and
+        predecessors of each task as lists of numbers, with no parent or nodes.
+
+        Critical paths of equal length are told apart by positions, a number
+        for each task, instead of by the tasks' own numbers.
+        """
+        self = cls.__new__(cls)
+        self.parent = None
+        self.nodes = None
+        self._compile(successors, predecessors, durations, lags, start, positions)
+        return self
+
+    def _compile(self, successors, predecessors, durations, lags, start, positions=None):
+        """
+        Fills the arrays, and returns the task numbers in their new order.
+        """
+        # Kahn's algorithm, visiting nodes in the same order as parent.topological_order().
+        indegree = [len(_) for _ in predecessors]
+        order = [i for i, d in enumerate(indegree) if not d]
+        level = [0] * len(indegree)
+        for i in order:
+            for j in successors[i]:
+                indegree[j] -= 1
+                if level[j] <= level[i]:
+                    level[j] = level[i] + 1
+                if not indegree[j]:
+                    order.append(j)
+        assert len(order) == len(indegree), 'Network must not contain any cycles.'
+
+        # Stable, so nodes keep their topological order within a level.
+        order.sort(key=level.__getitem__)
+        index = [0] * len(order)
+        for i, j in enumerate(order):
+            index[j] = i
+
+        offsets = [0]
+        targets = []
+        in_offsets = [0]
+        sources = []
+        level_offsets = [0]
+        for i, j in enumerate(order):
+            targets.extend(index[_] for _ in successors[j])
+            offsets.append(len(targets))
+            sources.extend(index[_] for _ in predecessors[j])
+            in_offsets.append(len(sources))
+            if i and level[j] != level[order[i - 1]]:
+                level_offsets.append(i)
+        if order:
+            level_offsets.append(len(order))
+
+        self.offsets = self._array(INTEGER, offsets)
+        self.targets = self._array(INTEGER, targets)
+        self.in_offsets = self._array(INTEGER, in_offsets)
+        self.sources = self._array(INTEGER, sources)
+        self.level_offsets = level_offsets
+
+        # Where each node sits in parent.nodes, to break ties between
+        # critical paths the same way the parent does.
+        self.positions = self._array(INTEGER, order if positions is None else [positions[_] for _ in order])
+
+        durations = [durations[_] for _ in order]
+        lags = [lags[_] for _ in order]
+        self.typecode = INTEGER if integral(durations + lags + [start]) else 'd'
+        self.durations = self._array(self.typecode, durations)
+        self.lags = self._array(self.typecode, lags)
+        self.start = start
+
+        self.es = None
+        self.ef = None
+        self.ls = None
+        self.lf = None
+        self.path_length = None
+        self.path_prior = None
+        self.path_tail = None
+        self.total_float = None
+        self.free_float = None
+        self.critical_path = None
+        self.duration = None
+        return order
+
+    def __len__(self):
+        return len(self.durations)
+
+    def copy(self, durations, lags, typecode=None):
+        """
+        Returns a copy sharing this network's links but with other durations
+        and lags, given as lists, ready to update().
+        """
+        other = copy.copy(self)
+        if typecode is not None:
+            other.typecode = typecode
+        other.durations = self._array(other.typecode, durations)
+        other.lags = self._array(other.typecode, lags)
+        other.es = other.ef = other.ls = other.lf = None
+        other.path_length = other.path_prior = other.path_tail = None
+        other.total_float = other.free_float = None
+        other.critical_path = other.duration = None
+        return other
+
+    @staticmethod
+    def _array(typecode, values):
+        if np is not None:
+            return np.array(values, dtype=np.int64 if typecode == INTEGER else np.float64)
+        return array(typecode, values)
+
+    def update(self):
+        """
+        Calculates the earliest and latest times and the critical path of every node.
+        """
+        if not len(self):
+            return
+        if np is not None:
+            self._update_numpy()
+        else:
+            self._update_python()
+
+        # The longest path ends at the last node that finishes last. Ties go
+        # to the one that comes first in the parent.
+        if np is not None:
+            last_nodes = np.flatnonzero(self.offsets[1:] == self.offsets[:-1])
+            lengths = self.path_length[last_nodes]
+            last_nodes = last_nodes[lengths == lengths.max()]
+            last = int(last_nodes[np.argmin(self.positions[last_nodes])])
+        else:
+            last_nodes = [_ for _ in range(len(self)) if self.offsets[_] == self.offsets[_ + 1]]
+            longest = max(self.path_length[_] for _ in last_nodes)
+            last = min((self.positions[_], _) for _ in last_nodes if self.path_length[_] == longest)[1]
+        path = []
+        while last >= 0:
+            path.append(last)
+            last = int(self.path_prior[last])
+        path.reverse()
+        self.critical_path = path
+        self.duration = self.path_length[path[-1]]
+
+    def _update_numpy(self):
+        durations, lags = self.durations, self.lags
+        offsets, targets = self.offsets, self.targets
+        in_offsets, sources = self.in_offsets, self.sources
+        levels = self.level_offsets
+
+        # Paths are measured in lags as well as durations.
+        spans = lags + durations
+        es = np.empty_like(durations)
+        ef = np.empty_like(durations)
+        path_length = np.empty_like(durations)
+        path_prior = np.full(len(durations), -1, dtype=np.int64)
+
+        # Forward pass, one level at a time. Nodes on the first level have no
+        # predecessors, and every node on a later level has at least one.
+        a, b = levels[0], levels[1]
+        es[a:b] = self.start + lags[a:b]
+        ef[a:b] = es[a:b] + durations[a:b]
+        path_length[a:b] = spans[a:b]
+        for k in range(1, len(levels) - 1):
+            a, b = levels[k], levels[k + 1]
+            s, e = in_offsets[a], in_offsets[b]
+            segments = in_offsets[a:b] - s
+            priors = sources[s:e]
+            es[a:b] = np.maximum.reduceat(ef[priors], segments) + lags[a:b]
+            ef[a:b] = es[a:b] + durations[a:b]
+            # The first predecessor with the longest path is the one kept.
+            lengths = path_length[priors]
+            longest = np.maximum.reduceat(lengths, segments)
+            is_longest = lengths == np.repeat(longest, np.diff(in_offsets[a:b + 1]))
+            first = np.minimum.reduceat(np.where(is_longest, np.arange(e - s), e - s), segments)
+            path_prior[a:b] = priors[first]
+            path_length[a:b] = longest + spans[a:b]
+
+        # Backward pass, one level at a time in reverse. A last node may
+        # finish as late as the project does, every other node just before
+        # its earliest successor.
+        lf = np.full_like(ef, ef[self.offsets[1:] == self.offsets[:-1]].max())
+        ls = np.empty_like(durations)
+        path_tail = spans.copy()
+        # The earliest any successor can start, before its lag.
+        next_start = lf.copy()
+        for k in range(len(levels) - 2, -1, -1):
+            a, b = levels[k], levels[k + 1]
+            s, e = offsets[a], offsets[b]
+            if e > s:
+                has_successors = offsets[a + 1:b + 1] > offsets[a:b]
+                segments = offsets[a:b][has_successors] - s
+                successors = targets[s:e]
+                lf[a:b][has_successors] = np.minimum.reduceat(ls[successors] - lags[successors], segments)
+                next_start[a:b][has_successors] = np.minimum.reduceat(es[successors] - lags[successors], segments)
+                path_tail[a:b][has_successors] += np.maximum.reduceat(path_tail[successors], segments)
+            ls[a:b] = lf[a:b] - durations[a:b]
+
+        self.es, self.ef, self.ls, self.lf = es, ef, ls, lf
+        self.path_length, self.path_prior, self.path_tail = path_length, path_prior, path_tail
+        self.total_float = ls - es
+        self.free_float = next_start - ef
+
+    def _update_python(self):
+        durations, lags = self.durations, self.lags
+        offsets, targets = self.offsets, self.targets
+        in_offsets, sources = self.in_offsets, self.sources
+        n = len(durations)
+
+        es = array(self.typecode, durations)
+        ef = array(self.typecode, durations)
+        # Paths are measured in lags as well as durations.
+        spans = array(self.typecode, [lag + duration for lag, duration in zip(lags, durations)])
+        path_length = array(self.typecode, spans)
+        path_prior = array(INTEGER, [-1]) * n
+        for i in range(n):
+            s, e = in_offsets[i], in_offsets[i + 1]
+            if s == e:
+                es[i] = self.start + lags[i]
+            else:
+                es[i] = max(ef[j] for j in sources[s:e]) + lags[i]
+                # The first predecessor with the longest path is the one kept.
+                prior = sources[s]
+                for j in sources[s + 1:e]:
+                    if path_length[j] > path_length[prior]:
+                        prior = j
+                path_prior[i] = prior
+                path_length[i] += path_length[prior]
+            ef[i] = es[i] + durations[i]
+
+        # A last node may finish as late as the project does.
+        finish = max(ef[_] for _ in range(n) if offsets[_] == offsets[_ + 1])
+        lf = array(self.typecode, [finish]) * n
+        ls = array(self.typecode, durations)
+        path_tail = array(self.typecode, spans)
+        total_float = array(self.typecode, durations)
+        free_float = array(self.typecode, durations)
+        for i in range(n - 1, -1, -1):
+            s, e = offsets[i], offsets[i + 1]
+            next_start = lf[i]
+            if s < e:
+                lf[i] = min(ls[j] - lags[j] for j in targets[s:e])
+                next_start = min(es[j] - lags[j] for j in targets[s:e])
+                path_tail[i] += max(path_tail[j] for j in targets[s:e])
+            ls[i] = lf[i] - durations[i]
+            total_float[i] = ls[i] - es[i]
+            free_float[i] = next_start - ef[i]
+
+        self.es, self.ef, self.ls, self.lf = es, ef, ls, lf
+        self.path_length, self.path_prior, self.path_tail = path_length, path_prior, path_tail
+        self.total_float, self.free_float = total_float, free_float
+
+    def write_back(self):
+        """
+        Copies the calculated times onto the child nodes and the parent, and
+        marks the parent as scheduled.
+        """
+        if not len(self):
+            # Nothing to schedule, as in the parent's update_all().
+            return
+        if self.es is None:
+            self.update()
+        parent = self.parent
+        nodes = self.nodes
+        es, ef, ls, lf = self.es, self.ef, self.ls, self.lf
+        total_float, free_float = self.total_float, self.free_float
+        path_length, path_prior, path_tail = self.path_length, self.path_prior, self.path_tail
+        if np is not None:
+            # Plain Python numbers, not NumPy scalars.
+            es, ef, ls, lf = es.tolist(), ef.tolist(), ls.tolist(), lf.tolist()
+            total_float, free_float = total_float.tolist(), free_float.tolist()
+            path_length, path_prior, path_tail = path_length.tolist(), path_prior.tolist(), path_tail.tolist()
+        for i, node in enumerate(nodes):
+            node._es = es[i]
+            node._ef = ef[i]
+            node._ls = ls[i]
+            node._lf = lf[i]
+            node._total_float = total_float[i]
+            node._free_float = free_float[i]
+            node._path_length = path_length[i]
+            node._path_prior = nodes[path_prior[i]] if path_prior[i] >= 0 else None
+            node._path_tail = path_tail[i]
+
+        parent._finish_update([nodes[_] for _ in self.critical_path])
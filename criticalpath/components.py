@@ -0,0 +1,131 @@
+"""
+Scheduling the weakly connected components of a network separately.
+
+Tasks with no chain of links between them, in either direction, cannot
+change each other's times. A network merged from several projects, or made
+of separate streams of work, falls apart into such components, found with a
+union-find over the links. Each large component can then be scheduled in a
+worker process at the same time as the others, and the critical path of the
+whole network is the longest of theirs.
+"""
+from __future__ import print_function
+
+from . import parallel
+
+# Components with fewer tasks and links than this are not worth sending to a worker.
+MIN_SIZE = 10000
+
+
+def find(parent):
+    """
+    Returns the parent's child nodes split into weakly connected components,
+    each a list of nodes in the order they were added, largest first.
+    """
+    nodes = parent.nodes
+    position = dict((id(node), i) for i, node in enumerate(nodes))
+    roots = list(range(len(nodes)))
+    sizes = [1] * len(nodes)
+
+    def root(i):
+        while roots[i] != i:
+            # Path halving keeps the trees shallow.
+            roots[i] = roots[roots[i]]
+            i = roots[i]
+        return i
+
+    for i, node in enumerate(nodes):
+        for to_node in node.to_nodes:
+            j = position.get(id(to_node))
+            if j is None:
+                continue
+            a, b = root(i), root(j)
+            if a != b:
+                if sizes[a] < sizes[b]:
+                    a, b = b, a
+                roots[b] = a
+                sizes[a] += sizes[b]
+
+    groups = {}
+    for i, node in enumerate(nodes):
+        groups.setdefault(root(i), []).append(node)
+    return sorted(groups.values(), key=len, reverse=True)
+
+
+def _describe(parent, nodes):
+    """
+    Returns a description of some of the parent's child nodes, like
+    parallel.describe(), with subprojects as plain tasks as update_all()
+    treats them.
+
+    Links are listed in the order of each node's incoming_nodes, so ties
+    between equally long paths are broken just as update_all() breaks them.
+    """
+    index = dict((id(node), i) for i, node in enumerate(nodes))
+    tasks = []
+    links = []
+    for j, node in enumerate(nodes):
+        tasks.append((node.name, node.duration, node.lag, None))
+        for from_node in node.incoming_nodes:
+            i = index.get(id(from_node))
+            if i is not None:
+                links.append((i, j))
+    return parent.name, parent.lag, tasks, links
+
+
+def update(parent, workers=None, min_size=MIN_SIZE):
+    """
+    Calculates the times of the parent's child nodes one weakly connected
+    component at a time, as the parent's update_all() would have done.
+
+    With workers, each component with at least min_size tasks and links is
+    scheduled in one of that many worker processes, while the smaller ones
+    are scheduled together in this process. Without workers, or without a
+    component that large, splitting the network up would only add work, so
+    the parent is updated in full instead.
+    """
+    cls = type(parent)
+    large = []
+    small = []
+    if workers:
+        for component in parent.components():
+            if sum(1 + len(_.to_nodes) for _ in component) >= min_size:
+                large.append(component)
+            else:
+                small.extend(component)
+    if not large:
+        parent.update_all(incremental=False)
+        return
+
+    assert parallel.ProcessPoolExecutor is not None, 'Workers require concurrent.futures.'
+    with parallel.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = dict(
+            (executor.submit(parallel._update_descriptions, [_describe(parent, component)], cls), component)
+            for component in large)
+        # This process schedules the small components while the workers run.
+        if small:
+            result = parallel._schedule_description(_describe(parent, small), cls)
+            parallel.apply_times(small, result[1])
+        for future in parallel.as_completed(futures):
+            parallel.apply_times(futures[future], future.result()[0][1])
+
+    # Each group was scheduled as if it were the whole project, but every
+    # last node may finish as late as the project does, so the latest
+    # times of a group that finishes sooner move later by the difference.
+    sinks = parent._sinks
+    groups = large + [small] if small else large
+    finishes = [max(node._ef for node in group if node in sinks) for group in groups]
+    finish = max(finishes)
+    for group, group_finish in zip(groups, finishes):
+        shift = finish - group_finish
+        if not shift:
+            continue
+        for node in group:
+            node._ls += shift
+            node._lf += shift
+            node._total_float += shift
+            if node in sinks:
+                node._free_float += shift
+
+    # Each component's longest path ends at one of its last nodes, so the
+    # longest of them all is found just as update_all() finds it.
+    parent._finish_update(parent._longest_path_item()[1])
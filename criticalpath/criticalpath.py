@@ -13,10 +13,28 @@ To run a unittest:
 """
 from __future__ import print_function
 
+import bisect
+import csv
+import heapq
+import operator
 import sys
 
+from . import calendars
+from . import components as _components
+from . import export
+from . import index
+from . import parallel
+from . import reduction
+from . import resources
+from . import scenarios
+from . import simulation
+from . import snapshot
+from . import stats as _stats
+from .compiled import CompiledNetwork
+
 PY3 = sys.version_info[0] >= 3
 if PY3:
+    intern = sys.intern
     def cmp(a, b):
         return (a > b) - (a < b)
     # mixin class for Python3 supporting __cmp__
@@ -38,6 +56,41 @@ else:
         pass
 
 
+def iter_dsv(f, columns, delimiter='|'):
+    """
+    Reads a delimiter-separated file with a header line one row at a time,
+    yielding the values of the given columns from each row.
+
+    The file can be a path, read as UTF-8, or an open file, and each column
+    can be given as a header name or an index.
+    """
+    if not hasattr(f, 'read'):
+        # Closed as soon as the rows run out or the caller stops reading them.
+        with (open(f, newline='', encoding='utf-8') if PY3 else open(f, 'rb')) as fin:
+            # Python 2 has no yield from.
+            for row in iter_dsv(fin, columns, delimiter=delimiter): # pylint: disable=use-yield-from
+                yield row
+        return
+    reader = csv.reader(f, delimiter=delimiter)
+    header = next(reader, None)
+    if header is None:
+        return
+    indexes = [_ if isinstance(_, int) else header.index(_) for _ in columns]
+    for row in reader:
+        if row:
+            yield [row[_] for _ in indexes]
+
+
+def parse_number(s):
+    """
+    Converts a duration or lag read from a file to an int, or failing that a float.
+    """
+    try:
+        return int(s)
+    except ValueError:
+        return float(s)
+
+
 # https://codereview.stackexchange.com/a/86067
 def cyclic(graph):
     """
@@ -72,14 +125,75 @@ def cyclic(graph):
     return False
 
 
+class CycleError(AssertionError):
+    """
+    Raised when a link would close a loop in a network kept in strict mode.
+
+    The cycle attribute lists the nodes around the loop, starting and ending
+    with the same node.
+    """
+
+    def __init__(self, cycle):
+        self.cycle = cycle
+        super(CycleError, self).__init__(
+            'Network must not contain any cycles: %s.' % (' -> '.join(str(_) for _ in cycle),))
+
+
 class Node(object):
     """
     Represents a task in a action precedence network.
 
     Nodes can be linked together or grouped under a parent node as child nodes.
+
+    Most nodes in a large network are leaf tasks, so attributes are held in
+    slots instead of a per-instance dictionary, and the containers only a
+    parent needs are not created until the node is given children.
     """
 
-    def __init__(self, name, duration=None, lag=0):
+    __slots__ = (
+        'parent',
+        'name',
+        'description',
+        'capacities',
+        'demands',
+        'calendar',
+        '_duration',
+        '_lag',
+        '_drag',
+        '_es',
+        '_ef',
+        '_ls',
+        '_lf',
+        '_free_float',
+        '_total_float',
+        '_nodes',
+        '_name_to_node',
+        'to_nodes',
+        'incoming_nodes',
+        '_in_degree',
+        '_out_degree',
+        '_sources',
+        '_sinks',
+        '_forward_pending',
+        '_backward_pending',
+        '_dirty_subprojects',
+        '_order',
+        '_order_index',
+        '_scheduled',
+        '_path_length',
+        '_path_prior',
+        '_path_tail',
+        '_drag_pending',
+        '_generation',
+        '_memo',
+        '_structure_generation',
+        '_structure_memo',
+        '_critical_path',
+        'exit_node',
+        '__weakref__',
+    )
+
+    def __init__(self, name, duration=None, lag=0, strict=False):
 
         self.parent = None
 
@@ -88,6 +202,15 @@ class Node(object):
 
         self.description = None
 
+        # How much of each resource the child nodes can use at once, and
+        # how much of each resource this task uses while it runs.
+        self.capacities = None
+        self.demands = None
+
+        # The working time the child nodes are scheduled on, or this task's
+        # own if it differs from its parent's. See calendars.Calendar.
+        self.calendar = None
+
         # How long this task takes to complete.
         self._duration = duration
 
@@ -95,7 +218,9 @@ class Node(object):
         # has finished before beginning.
         self._lag = lag #TODO
 
-        self.drag = None #TODO
+        # How much the project would finish earlier if this task took no time,
+        # calculated for all child nodes at once by the parent's _update_drag().
+        self._drag = None
 
         # Earliest start time.
         self._es = None
@@ -111,24 +236,110 @@ class Node(object):
 
         # The amount time that the activity can be delayed without
         # changing the start of any other activity.
-        self._free_float = None #TODO
+        self._free_float = None
 
         # The amount of time that the activity can be delayed without
         # increasing the overall project's duration.
-        self._total_float = None #TODO
+        self._total_float = None
+
+        # Child containers, created by _add_children() when first needed.
+        self._nodes = None
+        self._name_to_node = None
 
-        self.nodes = []#set()
-        self.name_to_node = {}
         self.to_nodes = set()
         self.incoming_nodes = set()
 
-        self.forward_pending = set()
-        self.backward_pending = []
+        # How many links join this node to other child nodes of its parent.
+        self._in_degree = 0
+        self._out_degree = 0
+
+        # Child nodes without links from, and without links to, other child
+        # nodes, kept up to date as nodes and links come and go, as
+        # dictionaries with no values.
+        self._sources = None
+        self._sinks = None
+
+        # Child nodes whose earliest and latest times must be recalculated,
+        # along with everything downstream or upstream of them, respectively.
+        self._forward_pending = None
+        self._backward_pending = None
+
+        # Child nodes with children of their own that have changed since
+        # update_tree() last visited them.
+        self._dirty_subprojects = None
+
+        # In strict mode, the child nodes in a topological order kept up to
+        # date as links are added, and this node's position in its parent's order.
+        self._order = None
+        self._order_index = None
+
+        # True once update_all() has scheduled every child node, so later
+        # calls only need to recalculate the pending nodes.
+        self._scheduled = False
+
+        # The longest path ending at this node, and the node preceding it on
+        # that path, among the parent's child nodes. Paths are measured in
+        # durations and lags, so the longest path ending at a node is how
+        # long after the project starts it can finish.
+        self._path_length = None
+        self._path_prior = None
+
+        # The longest path starting at this node, including its own lag.
+        self._path_tail = None
+
+        # True when the drag of the child nodes is out of date.
+        self._drag_pending = False
+
+        # Bumped by every change to the child nodes, their links or their
+        # times, and the (generation, values) of queries answered since.
+        self._generation = 0
+        self._memo = None
+
+        # The same for changes to the child nodes and their links only, for
+        # queries that do not depend on any times.
+        self._structure_generation = 0
+        self._structure_memo = None
 
         self._critical_path = None
 
         self.exit_node = None
 
+        if strict:
+            self.strict = True
+
+    def _add_children(self):
+        self._nodes = []
+        self._name_to_node = {}
+        self._forward_pending = set()
+        self._backward_pending = set()
+        self._dirty_subprojects = set()
+        self._sources = {}
+        self._sinks = {}
+
+    @property
+    def nodes(self):
+        if self._nodes is None:
+            self._add_children()
+        return self._nodes
+
+    @property
+    def name_to_node(self):
+        if self._nodes is None:
+            self._add_children()
+        return self._name_to_node
+
+    @property
+    def forward_pending(self):
+        if self._nodes is None:
+            self._add_children()
+        return self._forward_pending
+
+    @property
+    def backward_pending(self):
+        if self._nodes is None:
+            self._add_children()
+        return self._backward_pending
+
     def lookup_node(self, name):
         return self.name_to_node[name]
 
@@ -146,7 +357,14 @@ class Node(object):
 
     @lag.setter
     def lag(self, v):
+        if v == self._lag:
+            return
         self._lag = v
+        # Our start, and the latest finish of our predecessors, depend on the lag.
+        self._mark_dirty()
+        if self._scheduled:
+            # The start of our own first nodes depends on it too.
+            self.forward_pending.update(self.first_nodes)
 
     @property
     def duration(self):
@@ -158,7 +376,10 @@ class Node(object):
         This should only be set by update_all() after calculating
         the critical path of all child nodes.
         """
+        if v == self._duration:
+            return
         self._duration = v
+        self._mark_dirty()
 
     @property
     def es(self):
@@ -168,7 +389,10 @@ class Node(object):
     def es(self, v):
         self._es = v
         if self.parent:
+            # The times this subproject has in its parent's network are
+            # recalculated by the parent, earliest and latest alike.
             self.parent.forward_pending.add(self)
+            self.parent.backward_pending.add(self)
 
     @property
     def ef(self):
@@ -194,6 +418,245 @@ class Node(object):
     def lf(self, v):
         self._lf = v
 
+    @property
+    def total_float(self):
+        """
+        The amount of time this task can be delayed without delaying the project.
+        """
+        return self._total_float
+
+    @property
+    def free_float(self):
+        """
+        The amount of time this task can be delayed without delaying any successor.
+        """
+        return self._free_float
+
+    @property
+    def drag(self):
+        """
+        How much earlier the project would finish if this task took no time.
+
+        Only tasks on the critical path have any drag. It is worked out for
+        every task at once, the first time it is read after each update,
+        updating the network first if it has changed.
+        """
+        parent = self.parent
+        if parent is None:
+            return None
+        if parent._needs_update():
+            parent.update_all()
+        if parent._drag_pending:
+            parent._update_drag()
+        return self._drag
+
+    @property
+    def strict(self):
+        """
+        True if links between child nodes that would create a cycle are
+        rejected by link() as soon as they are made.
+
+        A topological order of the child nodes is then kept up to date as
+        links are added, so update_all() can use it without checking the
+        whole network for cycles.
+        """
+        return self._order is not None
+
+    @strict.setter
+    def strict(self, v):
+        if not v:
+            self._order = None
+            return
+        if self._order is not None:
+            return
+        order = self.topological_order()
+        if len(order) < len(self.nodes):
+            raise CycleError(self._find_cycle(order))
+        for i, node in enumerate(order):
+            node._order_index = i
+        self._order = order
+
+    def _find_cycle(self, order):
+        """
+        Returns a cycle among the child nodes missing from an incomplete topological order.
+        """
+        # Every node left out has a predecessor that was also left out,
+        # so walking back through them must come round to a node again.
+        remaining = set(self.nodes).difference(order)
+        path = [next(iter(remaining))]
+        seen = {path[0]: 0}
+        while True:
+            node = next(_ for _ in path[-1].incoming_nodes if _ in remaining and _.parent is self)
+            if node in seen:
+                cycle = path[seen[node]:] + [node]
+                cycle.reverse()
+                return cycle
+            seen[node] = len(path)
+            path.append(node)
+
+    def _insert_link(self, from_node, to_node):
+        """
+        Keeps the stored topological order valid for a new link between two
+        child nodes, raising CycleError if the link would close a loop.
+
+        Following Pearce and Kelly, only the nodes placed between the two
+        nodes are searched, and only those that must move are reordered.
+        """
+        if from_node is to_node:
+            raise CycleError([from_node, to_node])
+        lower = to_node._order_index
+        upper = from_node._order_index
+        if lower > upper:
+            return
+
+        # Nodes between them reachable from to_node, which must follow from_node.
+        prior = {to_node: None}
+        stack = [to_node]
+        while stack:
+            node = stack.pop()
+            for next_node in node.to_nodes:
+                if next_node.parent is not self or next_node in prior:
+                    continue
+                if next_node is from_node:
+                    cycle = [from_node]
+                    while node is not None:
+                        cycle.append(node)
+                        node = prior[node]
+                    cycle.append(from_node)
+                    cycle.reverse()
+                    raise CycleError(cycle)
+                if next_node._order_index < upper:
+                    prior[next_node] = node
+                    stack.append(next_node)
+
+        # Nodes between them that reach from_node, which must precede to_node.
+        before = set([from_node])
+        stack = [from_node]
+        while stack:
+            node = stack.pop()
+            for next_node in node.incoming_nodes:
+                if next_node.parent is self and next_node not in before and next_node._order_index > lower:
+                    before.add(next_node)
+                    stack.append(next_node)
+
+        key = operator.attrgetter('_order_index')
+        moved = sorted(before, key=key) + sorted(prior, key=key)
+        positions = sorted(_._order_index for _ in moved)
+        order = self._order
+        for i, node in zip(positions, moved):
+            order[i] = node
+            node._order_index = i
+
+    @property
+    def schedule_index(self):
+        """
+        A ScheduleIndex for time and float queries over the child nodes,
+        built when first used after each update.
+
+        The network is updated first if it has changed.
+        """
+        if self._needs_update():
+            self.update_all()
+        return self._memoized('schedule_index', lambda: index.ScheduleIndex(self))
+
+    @property
+    def generation(self):
+        """
+        A number that changes whenever the child nodes, their links or their
+        times change, so derived results can be checked for staleness.
+        """
+        return self._generation
+
+    def _touch(self, structure=False):
+        """
+        Records that the child nodes, their links or their times have changed,
+        so memoized queries are recalculated when next asked for.
+
+        structure is set if child nodes or links were added or removed.
+        """
+        self._generation += 1
+        if structure:
+            self._structure_generation += 1
+
+    def _memoized(self, key, calculate, structure=False):
+        """
+        Returns the value of a query over the child nodes, calculating it
+        only if it has not been asked for since the last change.
+
+        structure is set for queries that only depend on the child nodes and
+        their links, which are kept when only times change.
+        """
+        if structure:
+            memo = self._structure_memo
+            if memo is None or memo[0] != self._structure_generation:
+                memo = self._structure_memo = self._structure_generation, {}
+        else:
+            memo = self._memo
+            if memo is None or memo[0] != self._generation:
+                memo = self._memo = self._generation, {}
+        values = memo[1]
+        if key not in values:
+            values[key] = calculate()
+        return values[key]
+
+    def float_table(self):
+        """
+        Returns a dictionary mapping each child node's name to its
+        (total float, free float), updating the network first if it has changed.
+
+        The dictionary is shared until the next change, so should not be modified.
+        """
+        if self._needs_update():
+            self.update_all()
+        return self._memoized('float_table', lambda: dict(
+            (node.name, (node._total_float, node._free_float)) for node in self.nodes))
+
+    def _update_floats(self):
+        """
+        Calculates the total and free float from the current times.
+        """
+        start = None
+        for to_node in self.to_nodes:
+            if to_node.parent is self.parent and (start is None or to_node._es - to_node.lag < start):
+                start = to_node._es - to_node.lag
+        self._total_float = self._ls - self._es
+        self._free_float = (self._lf if start is None else start) - self._ef
+
+    def _mark_dirty(self, forward=True, backward=True):
+        """
+        Queues this node to be recalculated by the parent's next update_all().
+        """
+        parent = self.parent
+        if parent is None:
+            return
+        parent._critical_path = None
+        parent._touch()
+        parent._mark_tree_dirty()
+        if not parent._scheduled:
+            # The first update_all() recalculates every node anyway.
+            return
+        if forward:
+            parent.forward_pending.add(self)
+        if backward:
+            parent.backward_pending.add(self)
+
+    def _mark_tree_dirty(self):
+        """
+        Records with each ancestor that this node's children have changed, so
+        update_tree() can find it without visiting unchanged subprojects.
+        """
+        node = self
+        while node.parent is not None and node not in node.parent._dirty_subprojects:
+            node.parent._dirty_subprojects.add(node)
+            node = node.parent
+
+    def _needs_update(self):
+        """
+        Returns true if the child nodes have changed since they were last scheduled.
+        """
+        return bool(self._nodes) and (
+            not self._scheduled or self._critical_path is None or bool(self._forward_pending) or bool(self._backward_pending))
+
     def __repr__(self):
         return str(self.name)
 
@@ -218,20 +681,155 @@ class Node(object):
         Includes the given node as a child node.
         """
         assert isinstance(node, Node), 'Only Node instances can be added, not %s.' % (type(node).__name__,)
-        assert node.duration is not None, 'Duration must be specified.'
-        if node in self.nodes:
+        assert node.duration is not None or node._nodes, 'Duration must be specified.'
+        if node.name in self.name_to_node:
             return
         #self.nodes.add(node)
+        if self._order is not None:
+            self._place(node)
         self.nodes.append(node)
         self.name_to_node[node.name] = node
         node.parent = self
-        self.forward_pending.add(node)
+        self._count_links(node)
+        node._mark_dirty()
+        self._touch(structure=True)
+        if node._needs_update():
+            node._mark_tree_dirty()
+        return node
+
+    def remove(self, node):
+        """
+        Removes the given child node, or the child node with the given name,
+        along with every link to or from it, and returns it.
+
+        Its successors and predecessors are queued for the next update_all().
+        """
+        if not isinstance(node, Node):
+            node = self.name_to_node[node]
+        assert self.name_to_node.get(node.name) is node, 'Node %s is not a child node.' % (node,)
+        for to_node in list(node.to_nodes):
+            self._disconnect(node, to_node)
+            to_node._mark_dirty(backward=False)
+        for from_node in list(node.incoming_nodes):
+            self._disconnect(from_node, node)
+            from_node._mark_dirty(forward=False)
+
+        self.nodes.remove(node)
+        del self.name_to_node[node.name]
+        self._sources.pop(node, None)
+        self._sinks.pop(node, None)
+        if self._order is not None:
+            # The order of the nodes left is still valid once it is closed up.
+            i = node._order_index
+            del self._order[i]
+            for other in self._order[i:]:
+                other._order_index -= 1
+            node._order_index = None
+        self._forward_pending.discard(node)
+        self._backward_pending.discard(node)
+        self._dirty_subprojects.discard(node)
+        if node is self.exit_node:
+            self.exit_node = None
+        node.parent = None
         self._critical_path = None
+        self._touch(structure=True)
+        self._mark_tree_dirty()
+        if not self._nodes:
+            # With nothing left to schedule, the next task added starts afresh.
+            self._scheduled = False
         return node
 
+    def _place(self, node):
+        """
+        Puts a child node about to be added into the stored topological order,
+        after any other child nodes linked to it before it was added, raising
+        CycleError and leaving the order as it was if those links close a loop.
+        """
+        order = self._order
+        parent, node.parent = node.parent, self
+        node._order_index = len(order)
+        order.append(node)
+        try:
+            # Links into the node are kept by putting it last, and each link
+            # out of it is then inserted as if it had just been made.
+            for to_node in list(node.to_nodes):
+                if to_node.parent is self:
+                    self._insert_link(node, to_node)
+        except CycleError:
+            i = node._order_index
+            del order[i]
+            for other in order[i:]:
+                other._order_index -= 1
+            node._order_index = None
+            raise
+        finally:
+            node.parent = parent
+
+    def _count_links(self, node):
+        """
+        Counts the links between a newly added child node and the other child
+        nodes, which can be made before the node is added.
+        """
+        node._in_degree = node._out_degree = 0
+        for to_node in node.to_nodes:
+            if to_node.parent is self:
+                node._out_degree += 1
+                if not to_node._in_degree:
+                    self._sources.pop(to_node, None)
+                to_node._in_degree += 1
+        for from_node in node.incoming_nodes:
+            if from_node.parent is self and from_node is not node:
+                node._in_degree += 1
+                if not from_node._out_degree:
+                    self._sinks.pop(from_node, None)
+                from_node._out_degree += 1
+        if not node._in_degree:
+            self._sources[node] = None
+        if not node._out_degree:
+            self._sinks[node] = None
+
+    @staticmethod
+    def _connect(from_node, to_node):
+        """
+        Adds a link, keeping the parent's counts and sources and sinks up to date.
+        """
+        if to_node in from_node.to_nodes:
+            return
+        from_node.to_nodes.add(to_node)
+        to_node.incoming_nodes.add(from_node)
+        parent = from_node.parent
+        if parent is not None and to_node.parent is parent:
+            if not from_node._out_degree:
+                del parent._sinks[from_node]
+            from_node._out_degree += 1
+            if not to_node._in_degree:
+                del parent._sources[to_node]
+            to_node._in_degree += 1
+            parent._touch(structure=True)
+
+    @staticmethod
+    def _disconnect(from_node, to_node):
+        """
+        Removes a link, keeping the parent's counts and sources and sinks up to date.
+        """
+        from_node.to_nodes.discard(to_node)
+        to_node.incoming_nodes.discard(from_node)
+        parent = from_node.parent
+        if parent is not None and to_node.parent is parent:
+            from_node._out_degree -= 1
+            if not from_node._out_degree:
+                parent._sinks[from_node] = None
+            to_node._in_degree -= 1
+            if not to_node._in_degree:
+                parent._sources[to_node] = None
+            parent._touch(structure=True)
+
     def link(self, from_node, to_node=None):
         """
         Links together two child nodes in a directed graph.
+
+        If the parent is in strict mode, a link that would create a cycle
+        raises CycleError and is not made.
         """
         #print 'from_node:',from_node
         if not isinstance(from_node, Node):
@@ -244,29 +842,166 @@ class Node(object):
                 # print('self.name_to_node:', self.name_to_node)
                 to_node = self.name_to_node[to_node]
             assert isinstance(to_node, Node)
-            from_node.to_nodes.add(to_node)
-            to_node.incoming_nodes.add(from_node)
         else:
-            self.to_nodes.add(from_node)
-            from_node.incoming_nodes.add(self)
+            from_node, to_node = self, from_node
+        parent = from_node.parent
+        if parent is not None and parent._order is not None and to_node.parent is parent:
+            parent._insert_link(from_node, to_node)
+        self._connect(from_node, to_node)
+        # The new link can only delay the successor and the nodes after it,
+        # and hurry the predecessor and the nodes before it.
+        to_node._mark_dirty(backward=False)
+        from_node._mark_dirty(forward=False)
         return self
 
+    def unlink(self, from_node, to_node=None):
+        """
+        Removes a link made by link(), taking the same arguments.
+
+        Removing a link that does not exist does nothing.
+        """
+        if not isinstance(from_node, Node):
+            from_node = self.name_to_node[from_node]
+        if to_node is not None:
+            if not isinstance(to_node, Node):
+                to_node = self.name_to_node[to_node]
+        else:
+            from_node, to_node = self, from_node
+        if to_node not in from_node.to_nodes:
+            return self
+        # A strict parent's order stays valid with fewer links.
+        self._disconnect(from_node, to_node)
+        # The successor may now start sooner, and the predecessor finish later.
+        to_node._mark_dirty(backward=False)
+        from_node._mark_dirty(forward=False)
+        return self
+
+    def add_many(self, nodes):
+        """
+        Includes each of the given nodes as a child node, like add(), but
+        without checking the type of each one.
+
+        Nodes whose name is already taken are ignored.
+        """
+        children = self.nodes
+        name_to_node = self.name_to_node
+        scheduled = self._scheduled
+        order = self._order
+        try:
+            for node in nodes:
+                assert node.duration is not None or node._nodes, 'Duration must be specified.'
+                if node.name in name_to_node:
+                    continue
+                if order is not None:
+                    self._place(node)
+                children.append(node)
+                name_to_node[node.name] = node
+                node.parent = self
+                self._count_links(node)
+                if scheduled:
+                    node._mark_dirty()
+                if node._needs_update():
+                    node._mark_tree_dirty()
+        finally:
+            # Even if a node was refused, those before it were added.
+            self._critical_path = None
+            self._touch(structure=True)
+
+    def link_many(self, links, missing='error'):
+        """
+        Links together each of the given (from, to) pairs of child node names,
+        like link(), but without checking the type of each one.
+
+        If a name has no child node, missing decides what happens:
+        'error' raises a KeyError, 'skip' ignores the link, and 'create_zero'
+        adds a new child node with that name and zero duration.
+        """
+        assert missing in ('error', 'skip', 'create_zero'), 'Unknown missing option: %s' % (missing,)
+        name_to_node = self.name_to_node
+        scheduled = self._scheduled
+        try:
+            for from_name, to_name in links:
+                try:
+                    from_node = name_to_node[from_name]
+                    to_node = name_to_node[to_name]
+                except KeyError:
+                    if missing == 'error':
+                        raise
+                    if missing == 'skip':
+                        continue
+                    from_node = name_to_node.get(from_name)
+                    if from_node is None:
+                        from_node = self.add(type(self)(from_name, duration=0))
+                    to_node = name_to_node.get(to_name)
+                    if to_node is None:
+                        to_node = self.add(type(self)(to_name, duration=0))
+                if self._order is not None:
+                    self._insert_link(from_node, to_node)
+                self._connect(from_node, to_node)
+                if scheduled:
+                    to_node._mark_dirty(backward=False)
+                    from_node._mark_dirty(forward=False)
+        finally:
+            # Even if a link was refused, those before it were made.
+            self._critical_path = None
+            self._touch(structure=True)
+
+    @classmethod
+    def from_dsv(cls, timings, deps=None, name='project', delimiter='|', missing='error',
+                 name_column=0, duration_column=1, from_column=0, to_column=1, strict=False):
+        """
+        Returns a new parent node whose child nodes are read from delimiter-separated files.
+
+        Each row of timings gives the name and duration of a task, and each row
+        of deps gives the names of a task and a task that depends on it. Columns
+        can be chosen by header name or index. The files are read one line at a
+        time, so pandas is not needed. See link_many() for the missing option,
+        and strict for the strict option.
+
+        For example, to load the fixtures shipped with this package:
+
+            Node.from_dsv('timings.dsv', 'deps_small.dsv', missing='create_zero',
+                          from_column='PARENT_ID', to_column='UPROC_ID')
+
+        """
+        parent = cls(name, strict=strict)
+        parent.add_many(
+            cls(intern(task_name), duration=parse_number(duration))
+            for task_name, duration in iter_dsv(timings, (name_column, duration_column), delimiter=delimiter))
+        if deps is not None:
+            parent.link_many(
+                ((intern(from_name), intern(to_name))
+                 for from_name, to_name in iter_dsv(deps, (from_column, to_column), delimiter=delimiter)),
+                missing=missing)
+        return parent
+
     @property
     def first_nodes(self):
         """
-        Returns all child nodes that have no in-bound dependencies.
+        Returns all child nodes that have no in-bound dependencies on other child nodes.
+
+        The set is kept up to date as nodes and links change, so this only
+        costs a copy of it.
         """
-        first = set(self.nodes)
-        for node in self.nodes:
-            first.difference_update(node.to_nodes)
-        return first
+        if self._nodes is None:
+            self._add_children()
+        return set(self._sources)
 
     @property
     def last_nodes(self):
         """
-        Returns all child nodes that have to out-bound dependencies.
+        Returns all child nodes that have no out-bound dependencies on other
+        child nodes, in the order they were added.
         """
-        return [_ for _ in self.nodes if not _.to_nodes]
+        if self._nodes is None:
+            self._add_children()
+        return list(self._memoized('last_nodes', self._find_last_nodes, structure=True))
+
+    def _find_last_nodes(self):
+        # Unlinking a node puts it back among the sinks out of order, so they
+        # are picked out of the child nodes instead.
+        sinks = self._sinks
+        return [_ for _ in self.nodes if _ in sinks]
 
     def update_forward(self):
         """
@@ -298,7 +1033,7 @@ class Node(object):
                     self.parent.forward_pending.add(to_node)
 
             if self.parent:
-                self.parent.backward_pending.append(self)
+                self.parent.backward_pending.add(self)
 
     def update_backward(self):
         """
@@ -324,87 +1059,605 @@ class Node(object):
         if self.exit_node is None:
             self.exit_node = Node('EXIT', duration=0)
             self.add(self.exit_node)
-        for node in self.nodes:
-            if node is self.exit_node:
-                continue
-            if not node.to_nodes:
+        for node in self.last_nodes:
+            if node is not self.exit_node:
                 self.link(from_node=node, to_node=self.exit_node)
 
-    def update_all(self):
+    def update_all(self, incremental=True, stats=None, components=False, workers=None):
         """
         Updates timing calculations for all children nodes.
-        """
-        assert self.is_acyclic(), 'Network must not contain any cycles.'
 
-        for node in list(self.forward_pending.intersection(self.first_nodes)):
-            node.es = self.lag + node.lag
-            node.update_forward()
-            self.forward_pending.remove(node)
+        Makes one forward sweep over the nodes in topological order and one
+        backward sweep in the reverse order. Each sweep reads every link
+        exactly once, so the whole update is O(V+E) regardless of the order
+        in which nodes were added or linked.
 
-        i = 0
-        forward_priors = set()
-        while self.forward_pending:
-            i += 1
-#            print '\rCalculating forward paths %i...' % (i,),
-#            sys.stdout.flush()
-            q = set(self.forward_pending)
-            self.forward_pending.clear()
-            while q:
-                node = q.pop()
-                if node in forward_priors:
+        Every last node may finish as late as the project does, so only the
+        tasks on a path to the project's finish have no total float.
+
+        Once the network has been scheduled, later calls are incremental:
+        only the nodes downstream of forward_pending have their earliest
+        times recalculated, and only the nodes upstream of backward_pending
+        have their latest times recalculated, each sweep stopping wherever
+        the recalculated times come out the same as before. Changing a
+        node's duration or lag, adding a node or linking two nodes queues
+        the nodes affected. Pass incremental=False to recalculate every node.
+
+        In strict mode, the full sweep uses the topological order kept by
+        link() instead of finding one and checking it for cycles.
+
+        If stats is given, the time spent in each phase and the work done
+        are added to it. See stats.Stats.
+
+        If components is set, every node is recalculated one weakly connected
+        component at a time, with each large component in one of workers
+        worker processes if given, and the critical path is the longest of
+        theirs. See components.update().
+        """
+        if not self._nodes:
+            # Nothing to schedule.
+            return
+        for node in self._dirty_subprojects:
+            assert node.duration is not None, \
+                'Duration must be specified. Subproject %s has not been updated; call update_tree() instead.' % (node,)
+        if stats is not None:
+            t = _stats.timer()
+        if components:
+            if stats is not None:
+                stats.queued(self.nodes)
+            _components.update(self, workers)
+            if stats is not None:
+                stats.relaxed(self.nodes, sum(len(_.incoming_nodes) for _ in self.nodes))
+                stats.phase('update', t)
+                stats.done()
+            return
+        if incremental and self._scheduled:
+            if stats is not None:
+                stats.queued(self.forward_pending)
+            position = self._topological_position()
+            # Nodes are only swept while the nodes before them keep moving.
+            forward_moved = set()
+            forward_order = []
+            forward_nodes = self._sweep(self.forward_pending, position, forward_moved, forward_order)
+        else:
+            if stats is not None:
+                stats.queued(self.nodes)
+            forward_order = forward_nodes = self.topological_order()
+            forward_moved = None
+            assert len(forward_order) == len(self.nodes), 'Network must not contain any cycles.'
+        if stats is not None:
+            t = stats.phase('order', t)
+
+        # Forward sweep. All predecessors of a node are finished before it is reached.
+        backward_seeds = set(self.backward_pending)
+        for node in forward_nodes:
+            es = None
+            prior = None
+            for from_node in node.incoming_nodes:
+                if from_node.parent is not self:
+                    continue
+                if es is None or from_node._ef > es:
+                    es = from_node._ef
+                if prior is None or from_node._path_length > prior._path_length:
+                    prior = from_node
+            # Earliest start of the succeeding activity is the earliest finish
+            # of the preceding activity plus possible lag.
+            es = (self.lag if es is None else es) + node.lag
+            ef = es + node.duration
+            path_length = node.lag + node.duration + (0 if prior is None else prior._path_length)
+            if forward_moved is not None and (ef != node._ef or path_length != node._path_length):
+                forward_moved.add(node)
+            node._es = es
+            node._ef = ef
+            node._path_prior = prior
+            node._path_length = path_length
+        if stats is not None:
+            stats.relaxed(forward_order, sum(len(_.incoming_nodes) for _ in forward_order))
+            t = stats.phase('forward', t)
+
+        # Every last node may finish as late as the project does, so if the
+        # project's finish moved, so do their latest times.
+        finish = max(node._ef for node in self._sinks)
+        if incremental and self._scheduled:
+            backward_seeds.update(node for node in self._sinks if node._lf != finish)
+
+        if incremental and self._scheduled:
+            if stats is not None:
+                stats.queued(backward_seeds)
+            backward_moved = set()
+            backward_order = []
+            backward_nodes = self._sweep(backward_seeds, position, backward_moved, backward_order, downstream=False)
+        else:
+            backward_moved = None
+            # Walked back to front in place, as a reversed copy of a long
+            # order would cost as much memory as the order itself.
+            backward_order = forward_order
+            backward_nodes = reversed(forward_order)
+
+        # Backward sweep. All successors of a node are finished before it is reached.
+        floated = set() if incremental and self._scheduled else None
+        for node in backward_nodes:
+            lf = None
+            start = None
+            tail = None
+            for to_node in node.to_nodes:
+                if to_node.parent is not self:
                     continue
-                #forward_priors.add(node)
-                node.update_forward()
-#        print
+                if lf is None or to_node._ls - to_node.lag < lf:
+                    lf = to_node._ls - to_node.lag
+                if start is None or to_node._es - to_node.lag < start:
+                    start = to_node._es - to_node.lag
+                if tail is None or to_node._path_tail > tail:
+                    tail = to_node._path_tail
+            lf = finish if lf is None else lf
+            ls = lf - node.duration
+            path_tail = node.lag + node.duration + (0 if tail is None else tail)
+            if backward_moved is not None and (ls != node._ls or path_tail != node._path_tail):
+                backward_moved.add(node)
+            node._lf = lf
+            node._ls = ls
+            node._path_tail = path_tail
+            node._total_float = ls - node._es
+            node._free_float = (lf if start is None else start) - node._ef
+            if floated is not None:
+                floated.add(node)
+        if stats is not None:
+            stats.relaxed(backward_order, sum(len(_.to_nodes) for _ in backward_order))
+            t = stats.phase('backward', t)
+
+        if floated is not None:
+            # Nodes whose earliest times moved, and their predecessors, have
+            # new floats even if their latest times did not change.
+            for node in forward_order:
+                if node not in floated:
+                    floated.add(node)
+                    node._update_floats()
+                for from_node in node.incoming_nodes:
+                    if from_node.parent is self and from_node not in floated:
+                        floated.add(from_node)
+                        from_node._update_floats()
+            if stats is not None:
+                t = stats.phase('floats', t)
+
+        self._finish_update(self._longest_path_item(stats)[1])
+        if stats is not None:
+            stats.phase('path', t)
+            stats.done()
+
+    def _finish_update(self, path, tree=False, times=True):
+        """
+        Marks the child nodes as scheduled, once all their times have been
+        calculated, with the given critical path.
 
+        This node's duration and times are then taken from the path, unless
+        times is false. If tree is set, every subproject below was updated too.
+        """
+        self.forward_pending.clear()
+        self.backward_pending.clear()
+        if tree:
+            self._dirty_subprojects.clear()
+        self._scheduled = True
+        self._drag_pending = True
+        self._touch()
+
+        self._critical_path = path[-1]._path_length, path, set(path)
+        if times:
+            self.duration = path[-1]._path_length
+            self.es = path[0].es
+            self.ls = path[0].ls
+            self.ef = path[-1].ef
+            self.lf = path[-1].lf
+
+    def update_tree(self, workers=None):
+        """
+        Updates timing calculations for every subproject nested below this
+        node, from the bottom up, and then for this node's own children.
+
+        Only subprojects with changes somewhere below them are visited, and a
+        subproject's rolled-up duration and times are kept until one of its
+        tasks changes. If workers is given, this node's changed subprojects
+        are recalculated side by side in that many processes.
+        """
+        if self._dirty_subprojects:
+            subprojects = list(self._dirty_subprojects)
+            if workers and len(subprojects) > 1:
+                parallel.update_subprojects(subprojects, workers)
+            else:
+                for node in subprojects:
+                    node.update_tree()
+            # Updating a subproject marks us dirty again, which is already in hand.
+            self._dirty_subprojects.difference_update(subprojects)
+        if self._needs_update():
+            self.update_all()
+
+    def topological_order(self):
+        """
+        Returns the child nodes ordered so that every node comes after all of
+        its predecessors, using Kahn's algorithm in O(V+E).
+
+        If the network contains a cycle, the nodes on or after the cycle are
+        omitted, so the result will be shorter than the list of child nodes.
+
+        In strict mode, the order kept up to date by link() is returned instead.
+        Otherwise the order is only found again after the network changes.
+        """
+        if self._order is not None:
+            return list(self._order)
+        return list(self._memoized('topological_order', self._find_topological_order, structure=True))
+
+    def components(self):
+        """
+        Returns the child nodes split into weakly connected components, each
+        a list of nodes in the order they were added, largest first.
+
+        Nodes in different components have no links between them, direct or
+        indirect, so cannot affect each other's times. The list is shared
+        until the next change, so should not be modified.
+        """
+        return self._memoized('components', lambda: _components.find(self), structure=True)
+
+    def _find_topological_order(self):
+        indegree = {}
+        for node in self.nodes:
+            for to_node in node.to_nodes:
+                if to_node.parent is self:
+                    indegree[to_node] = indegree.get(to_node, 0) + 1
+        order = [_ for _ in self.nodes if _ not in indegree]
         i = 0
-        backward_priors = set()
-        while self.backward_pending:
+        while i < len(order):
+            for to_node in order[i].to_nodes:
+                if to_node.parent is not self:
+                    continue
+                indegree[to_node] -= 1
+                if not indegree[to_node]:
+                    order.append(to_node)
             i += 1
-#            print '\rCalculating backward paths %i...' % (i,),
-#            sys.stdout.flush()
-            node = self.backward_pending.pop()
-            if node in backward_priors:
+        return order
+
+    def _topological_position(self):
+        """
+        Returns a function giving each child node's place in a topological order,
+        kept until the child nodes or their links change.
+        """
+        if self._order is not None:
+            return operator.attrgetter('_order_index')
+        return self._memoized('topological_position', self._find_topological_position, structure=True).__getitem__
+
+    def _find_topological_position(self):
+        order = self._memoized('topological_order', self._find_topological_order, structure=True)
+        assert len(order) == len(self.nodes), 'Network must not contain any cycles.'
+        return dict((node, i) for i, node in enumerate(order))
+
+    def _sweep(self, seeds, position, moved, visited, downstream=True):
+        """
+        Yields the given child nodes and those reachable from them, following
+        links downstream or upstream, in the order they must be recalculated.
+
+        The caller adds each node whose recalculated times its neighbours
+        depend on to moved, and only the neighbours of those are visited, so
+        a change stops spreading as soon as it has no effect. Every node
+        yielded is also appended to visited.
+        """
+        sign = 1 if downstream else -1
+        queued = set(_ for _ in seeds if _.parent is self)
+        heap = [(sign * position(_), _) for _ in queued]
+        heapq.heapify(heap)
+        while heap:
+            node = heapq.heappop(heap)[1]
+            visited.append(node)
+            yield node
+            if node not in moved:
                 continue
-            #backward_priors.add(node)
-            node.update_backward()
-#        print
+            for next_node in (node.to_nodes if downstream else node.incoming_nodes):
+                if next_node.parent is self and next_node not in queued:
+                    queued.add(next_node)
+                    heapq.heappush(heap, (sign * position(next_node), next_node))
 
-        self._critical_path = duration, path, priors = self.get_critical_path(as_item=True)
-        self.duration = duration
-        self.es = path[0].es
-        self.ls = path[0].ls
-        self.ef = path[-1].ef
-        self.lf = path[-1].lf
+    def _cone_order(self, seeds, downstream=True):
+        """
+        Returns the child nodes reachable from the given nodes, following links
+        downstream or upstream, in the order they must be recalculated.
 
-    def get_critical_path(self, as_item=False):
+        Only the nodes and links inside the cone are visited.
         """
-        Finds the longest path in among the child nodes.
+        cone = set()
+        stack = [_ for _ in seeds if _.parent is self]
+        while stack:
+            node = stack.pop()
+            if node in cone:
+                continue
+            cone.add(node)
+            for next_node in (node.to_nodes if downstream else node.incoming_nodes):
+                if next_node.parent is self and next_node not in cone:
+                    stack.append(next_node)
+
+        indegree = dict.fromkeys(cone, 0)
+        for node in cone:
+            for next_node in (node.to_nodes if downstream else node.incoming_nodes):
+                if next_node in indegree:
+                    indegree[next_node] += 1
+        order = [_ for _ in cone if not indegree[_]]
+        i = 0
+        while i < len(order):
+            for next_node in (order[i].to_nodes if downstream else order[i].incoming_nodes):
+                if next_node not in indegree:
+                    continue
+                indegree[next_node] -= 1
+                if not indegree[next_node]:
+                    order.append(next_node)
+            i += 1
+        # Any new cycle passes through a pending node, so it would be inside the cone.
+        assert len(order) == len(cone), 'Network must not contain any cycles.'
+        return order
+
+    def _update_drag(self):
         """
-        if self._critical_path is not None:
-            # Returned cached path.
-            return self._critical_path[1]
-        longest = None
-        q = [(_.duration, [_], set([_])) for _ in self.first_nodes]
-        while q:
-            item = length, path, priors = q.pop(0)
-            if longest is None:
-                longest = item
-            else:
-                try:
-                    longest = max(longest, item)
-                except TypeError:
-                    longest = longest
-            for to_node in path[-1].to_nodes:
-                if to_node in priors:
+        Calculates the drag of every child node in O((V+E) log E).
+
+        Taking a critical node's duration away shortens every path through
+        it by that much, lag and all, so its drag is the smaller of its
+        duration and how much longer the critical path is than the longest
+        path from a first node to a last node avoiding it. In topological
+        order, such a path either lies wholly before the node, wholly after
+        it, or has one link that jumps over it, so one sweep over the links
+        finds the longest such path for every critical node at once. Only
+        whole paths count, as with negative lags part of a path can be
+        longer than all of it.
+        """
+        self._drag_pending = False
+        for node in self.nodes:
+            node._drag = 0
+        item = self.get_critical_path(as_item=True)
+        if item is None:
+            return
+        length, path, priors = item
+
+        order = self.topological_order()
+        position = dict((id(node), i) for i, node in enumerate(order))
+        critical = [position[id(node)] for node in path]
+
+        # The longest path ending at a last node before, and starting at a
+        # first node after, each position, if there is one.
+        none = float('-inf')
+        sinks, sources = self._sinks, self._sources
+        before = [none] * (len(order) + 1)
+        for i, node in enumerate(order):
+            before[i + 1] = max(before[i], node._path_length) if node in sinks else before[i]
+        after = [none] * (len(order) + 1)
+        for i in range(len(order) - 1, -1, -1):
+            after[i] = max(after[i + 1], order[i]._path_tail) if order[i] in sources else after[i + 1]
+
+        # Links that jump over critical nodes i to j, grouped by i.
+        jumps = [[] for _ in path]
+        for node in order:
+            start = position[id(node)]
+            i = bisect.bisect_right(critical, start)
+            for to_node in node.to_nodes:
+                if to_node.parent is not self:
                     continue
-                q.append((length+to_node.duration, path+[to_node], priors.union([to_node])))
+                j = bisect.bisect_left(critical, position[id(to_node)]) - 1
+                if i <= j:
+                    jumps[i].append((-(node._path_length + to_node._path_tail), j))
+
+        heap = []
+        for i, node in enumerate(path):
+            for jump in jumps[i]:
+                heapq.heappush(heap, jump)
+            while heap and heap[0][1] < i:
+                heapq.heappop(heap)
+            longest = max(before[critical[i]], after[critical[i] + 1], -heap[0][0] if heap else none)
+            node._drag = min(node.duration, length - longest)
+
+    def _longest_path_item(self, stats=None):
+        """
+        Returns the (duration, path, priors) item for the longest path, from the
+        path lengths already calculated for each child node.
+        """
+        # The project finishes when the last of its leaf nodes does, and the
+        # longest path ending at a node is how long after the start it finishes.
+        longest = None
+        last_nodes = self.last_nodes
+        for node in last_nodes:
+            if longest is None or node._path_length > longest._path_length:
+                longest = node
         if longest is None:
             return
+
+        path = []
+        node = longest
+        while node is not None:
+            path.append(node)
+            node = node._path_prior
+        path.reverse()
+        if stats is not None:
+            stats.expansions += len(last_nodes) + len(path)
+        return longest._path_length, path, set(path)
+
+    def compile(self, reduce=False):
+        """
+        Returns the child nodes compiled into integer-indexed arrays.
+
+        The compiled network can be scheduled with vectorized passes and its
+        results read as arrays or written back onto these nodes.
+
+        If reduce is set, redundant links are dropped and serial chains
+        merged first, which gives the same times and critical path once
+        written back. See reduction.ReducedNetwork.
+        """
+        if reduce:
+            return reduction.ReducedNetwork(self)
+        return CompiledNetwork(self)
+
+    def freeze(self):
+        """
+        Returns the child nodes compiled and scheduled once, for quickly
+        evaluating many scenarios of changed durations and lags.
+
+        See scenarios.FrozenNetwork.
+        """
+        return scenarios.FrozenNetwork(self)
+
+    def schedule_resources(self, rule='total_float', scheme='serial'):
+        """
+        Returns a schedule of the child nodes that keeps within this node's
+        resource capacities, given each task's resource demands.
+
+        See resources.schedule().
+        """
+        return resources.schedule(self, rule=rule, scheme=scheme)
+
+    def schedule_dates(self):
+        """
+        Returns the earliest and latest start and finish of each child node
+        as datetimes, on this node's calendar and each task's own calendar
+        where it has one.
+
+        See calendars.schedule().
+        """
+        return calendars.schedule(self)
+
+    def save_snapshot(self, f):
+        """
+        Writes the scheduled child nodes to a path or open binary file, to be
+        read back with snapshot.load_snapshot() without rebuilding any nodes.
+
+        See snapshot.save_snapshot().
+        """
+        snapshot.save_snapshot(self, f)
+
+    def iter_schedule(self, topological=False):
+        """
+        Yields a (name, duration, es, ef, ls, lf, total_float, free_float,
+        critical) tuple for each child node, one at a time, in the order
+        they were added or in topological order if set.
+
+        See export.iter_schedule().
+        """
+        return export.iter_schedule(self, topological=topological)
+
+    def to_csv(self, f, topological=False, **kwargs):
+        """
+        Streams the schedule of the child nodes to a path or open text file as CSV.
+
+        See export.to_csv().
+        """
+        return export.to_csv(self, f, topological=topological, **kwargs)
+
+    def to_jsonl(self, f, topological=False, **kwargs):
+        """
+        Streams the schedule of the child nodes to a path or open text file as JSON Lines.
+
+        See export.to_jsonl().
+        """
+        return export.to_jsonl(self, f, topological=topological, **kwargs)
+
+    def simulate(self, n_samples, distributions, **kwargs):
+        """
+        Schedules the child nodes many times over with sampled durations, and
+        returns statistics on the project finish and each task's criticality.
+
+        See simulation.simulate().
+        """
+        return simulation.simulate(self, n_samples, distributions, **kwargs)
+
+    def get_critical_path(self, as_item=False, stats=None):
+        """
+        Finds the longest path in among the child nodes.
+
+        A path's length counts each task's lag as well as its duration, so
+        the longest path is the one that finishes last.
+
+        Uses dynamic programming over a topological order, so each node and
+        link is visited once, instead of enumerating every path.
+
+        If stats is given, the time spent and nodes visited are added to it.
+        See stats.Stats.
+        """
+        if stats is not None:
+            t = _stats.timer()
+        if self._critical_path is None:
+            order = self.topological_order()
+            assert len(order) == len(self.nodes), 'Network must not contain any cycles.'
+            if stats is not None:
+                t = stats.phase('order', t)
+                stats.expansions += len(order)
+            for node in order:
+                prior = None
+                for from_node in node.incoming_nodes:
+                    if from_node.parent is not self:
+                        continue
+                    if prior is None or from_node._path_length > prior._path_length:
+                        prior = from_node
+                node._path_prior = prior
+                node._path_length = node.lag + node.duration + (0 if prior is None else prior._path_length)
+            self._critical_path = self._longest_path_item(stats)
+        if stats is not None:
+            stats.phase('path', t)
+            stats.done()
+        if self._critical_path is None:
+            return
         elif as_item:
-            return longest
+            return self._critical_path
         else:
-            return longest[1]
+            return self._critical_path[1]
+
+    def get_critical_paths(self, k=None, within=None):
+        """
+        Yields (length, path) for the paths through the child nodes from a
+        first node to a last node, longest first, stopping after k paths or
+        once paths are more than within shorter than the critical path.
+
+        Paths are grown from the first nodes in best-first order, ranked by
+        their length so far plus the longest path on from their last node,
+        which update_all() has already calculated. That ranking is exact, so
+        every partial path taken off the heap leads to a complete path, and
+        ties go to the longest partial path, so paths of equal length are
+        finished one at a time instead of all grown side by side. Each path
+        yielded costs O(L * D * log(H)) for paths of L nodes with at most D
+        successors each, and a heap of H partial paths. The network is
+        updated first if it has changed.
+        """
+        if self._needs_update():
+            self.update_all()
+        if self._critical_path is None:
+            return
+        threshold = None if within is None else self._critical_path[0] - within
+
+        # Each entry holds a partial path as (node, (prior node, (...))), so
+        # extending a path never copies it, ranked by its bound and then by
+        # its number of nodes, deepest first.
+        heap = []
+        count = 0
+        for node in self.nodes:
+            if any(_.parent is self for _ in node.incoming_nodes):
+                continue
+            if threshold is None or node._path_tail >= threshold:
+                heap.append((-node._path_tail, -1, count, node.lag + node.duration, (node, None)))
+                count += 1
+        heapq.heapify(heap)
+
+        found = 0
+        while heap and (k is None or found < k):
+            _, depth, _, length, path = heapq.heappop(heap)
+            node = path[0]
+            extended = False
+            for to_node in node.to_nodes:
+                if to_node.parent is not self:
+                    continue
+                extended = True
+                bound = length + to_node._path_tail
+                if threshold is None or bound >= threshold:
+                    heapq.heappush(heap, (
+                        -bound, depth - 1, count, length + (to_node.lag + to_node.duration), (to_node, path)))
+                    count += 1
+            if not extended:
+                nodes = []
+                while path is not None:
+                    nodes.append(path[0])
+                    path = path[1]
+                nodes.reverse()
+                found += 1
+                yield length, nodes
 
     def print_times(self):
         w = 7
@@ -461,5 +1714,11 @@ class Node(object):
         # return True
 
     def is_acyclic(self):
+        if self._order is not None:
+            # Links that would close a loop are never made in strict mode.
+            return True
+        return self._memoized('is_acyclic', self._find_acyclic, structure=True)
+
+    def _find_acyclic(self):
         g = dict((node.name, tuple(child.name for child in node.to_nodes))for node in self.nodes)
         return not cyclic(g)
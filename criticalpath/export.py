@@ -0,0 +1,97 @@
+"""
+Streaming export of a scheduled network to CSV or JSON Lines.
+
+Rows are produced one task at a time and written out a chunk at a time,
+so exporting millions of tasks never holds more than one chunk of
+formatted rows in memory, however large the network.
+"""
+from __future__ import print_function
+
+import csv
+import json
+import sys
+from itertools import islice
+
+PY3 = sys.version_info[0] >= 3
+
+COLUMNS = ('name', 'duration', 'es', 'ef', 'ls', 'lf', 'total_float', 'free_float', 'critical')
+
+# How many rows are formatted before each write.
+CHUNKSIZE = 10000
+
+
+def iter_schedule(parent, topological=False):
+    """
+    Yields a tuple of the values in COLUMNS for each of the parent's child
+    nodes, in the order they were added, or in topological order if set.
+
+    critical is True for the tasks on the critical path.
+    """
+    if parent._needs_update():
+        parent.update_all()
+    item = parent.get_critical_path(as_item=True)
+    critical = item[2] if item is not None else ()
+    nodes = parent.topological_order() if topological else parent.nodes
+    for node in nodes:
+        yield (
+            node.name, node.duration, node._es, node._ef, node._ls, node._lf,
+            node._total_float, node._free_float, node in critical)
+
+
+def _chunks(rows, chunksize):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _write(f, write):
+    """
+    Calls write with an open text file, opening the path f first if need be.
+
+    A path is written as UTF-8, with lines ended as the writer ends them.
+    """
+    if hasattr(f, 'write'):
+        return write(f)
+    # csv and json write native strings, which are bytes on Python 2.
+    with (open(f, 'w', newline='', encoding='utf-8') if PY3 else open(f, 'wb')) as fout:
+        return write(fout)
+
+
+def to_csv(parent, f, topological=False, delimiter=',', header=True, chunksize=CHUNKSIZE):
+    """
+    Writes the schedule as CSV to a path, in UTF-8, or an open text file,
+    with a header line of COLUMNS unless header is unset, and critical
+    written as 1 or 0.
+
+    Returns the number of tasks written.
+    """
+    def write(fout):
+        writer = csv.writer(fout, delimiter=delimiter, lineterminator='\n')
+        if header:
+            writer.writerow(COLUMNS)
+        count = 0
+        for chunk in _chunks(iter_schedule(parent, topological), chunksize):
+            writer.writerows(row[:-1] + (int(row[-1]),) for row in chunk)
+            count += len(chunk)
+        return count
+    return _write(f, write)
+
+
+def to_jsonl(parent, f, topological=False, chunksize=CHUNKSIZE):
+    """
+    Writes the schedule as JSON Lines to a path, in UTF-8, or an open text
+    file, one object with the keys in COLUMNS for each task.
+
+    Returns the number of tasks written.
+    """
+    def write(fout):
+        encode = json.JSONEncoder(separators=(',', ':')).encode
+        count = 0
+        for chunk in _chunks(iter_schedule(parent, topological), chunksize):
+            fout.write(''.join(encode(dict(zip(COLUMNS, row))) + '\n' for row in chunk))
+            count += len(chunk)
+        return count
+    return _write(f, write)
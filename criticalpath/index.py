@@ -0,0 +1,139 @@
+"""
+Queries over a scheduled network by time and float.
+
+A ScheduleIndex answers each query in O(log n + k) for k matching tasks,
+from sorted arrays searched with bisect and from interval trees over the
+time each task may be running. Each structure is built the first time a
+query needs it, and the parent drops the whole index whenever it is
+rescheduled.
+"""
+from __future__ import print_function
+
+from bisect import bisect_left, bisect_right
+
+
+class IntervalTree(object):
+    """
+    A static centered interval tree of half-open [start, end) intervals.
+    """
+
+    def __init__(self, intervals):
+        self._root = self._build([_ for _ in intervals if _[0] < _[1]])
+
+    def _build(self, intervals):
+        if not intervals:
+            return None
+        starts = sorted(_[0] for _ in intervals)
+        center = starts[len(starts) // 2]
+        here = []
+        left = []
+        right = []
+        for interval in intervals:
+            if interval[1] <= center:
+                left.append(interval)
+            elif interval[0] > center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        by_start = sorted(here, key=lambda _: _[0])
+        by_end = sorted(here, key=lambda _: _[1], reverse=True)
+        return center, by_start, by_end, self._build(left), self._build(right)
+
+    def stab(self, point):
+        """
+        Returns the items of the intervals containing the point.
+        """
+        found = []
+        node = self._root
+        while node is not None:
+            center, by_start, by_end, left, right = node
+            if point < center:
+                for start, _, item in by_start:
+                    if start > point:
+                        break
+                    found.append(item)
+                node = left
+            else:
+                for _, end, item in by_end:
+                    if end <= point:
+                        break
+                    found.append(item)
+                node = right
+        return found
+
+
+class ScheduleIndex(object):
+    """
+    Time and float queries over the child nodes of a scheduled parent.
+
+    Get one from the parent's schedule_index property rather than building
+    it directly, so it is rebuilt after the schedule changes.
+    """
+
+    def __init__(self, parent):
+        self.parent = parent
+        self._sorted = {}
+        self._trees = {}
+
+    def _by(self, attr):
+        """
+        Returns the child nodes sorted by an attribute, and the sorted values.
+        """
+        if attr not in self._sorted:
+            nodes = sorted(self.parent.nodes, key=lambda node: getattr(node, attr))
+            self._sorted[attr] = nodes, [getattr(_, attr) for _ in nodes]
+        return self._sorted[attr]
+
+    def _between(self, attr, low, high):
+        nodes, values = self._by(attr)
+        return nodes[bisect_left(values, low):bisect_right(values, high)]
+
+    def _tree(self, start, end):
+        key = start, end
+        if key not in self._trees:
+            self._trees[key] = IntervalTree([
+                (getattr(node, start), getattr(node, end), node) for node in self.parent.nodes])
+        return self._trees[key]
+
+    def running_at(self, time):
+        """
+        Returns the tasks that are running at the given time if every task
+        starts at its earliest start.
+        """
+        return self._tree('es', 'ef').stab(time)
+
+    def possibly_running_at(self, time):
+        """
+        Returns the tasks that could be running at the given time, between
+        their earliest start and latest finish.
+        """
+        return self._tree('es', 'lf').stab(time)
+
+    def starting_between(self, low, high, late=False):
+        """
+        Returns the tasks whose earliest start, or latest start if late is
+        set, is from low to high inclusive, in order of that start.
+        """
+        return self._between('ls' if late else 'es', low, high)
+
+    def finishing_between(self, low, high, late=False):
+        """
+        Returns the tasks whose earliest finish, or latest finish if late is
+        set, is from low to high inclusive, in order of that finish.
+        """
+        return self._between('lf' if late else 'ef', low, high)
+
+    def float_below(self, threshold, free=False):
+        """
+        Returns the tasks whose total float, or free float if free is set,
+        is less than the threshold, least float first.
+        """
+        nodes, values = self._by('free_float' if free else 'total_float')
+        return nodes[:bisect_left(values, threshold)]
+
+    def float_between(self, low, high, free=False):
+        """
+        Returns the tasks whose total float, or free float if free is set,
+        is from low to high inclusive, least float first.
+        """
+        return self._between('free_float' if free else 'total_float', low, high)
@@ -0,0 +1,235 @@
+"""
+Scheduling of independent task networks in worker processes.
+
+Networks are sent to workers as compact nested tuples of names, numbers and
+link indexes instead of pickled Node trees, and the calculated times come
+back the same way to be copied onto the original nodes.
+"""
+from __future__ import print_function
+
+try:
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+except ImportError:
+    ProcessPoolExecutor = None
+
+from .compiled import CompiledNetwork
+
+
+def describe(parent, dirty_only=False):
+    """
+    Returns a compact description of the parent's child network as
+    (name, lag, tasks, links), where each task is (name, duration, lag, network)
+    and each link is a pair of task indexes.
+
+    network describes the task's own children, or is None for a plain task.
+    If dirty_only is set, subprojects with no changes since update_tree() last
+    visited them are described as plain tasks with their rolled-up duration.
+    """
+    nodes = parent.nodes
+    index = dict((id(node), i) for i, node in enumerate(nodes))
+    tasks = []
+    links = []
+    for i, node in enumerate(nodes):
+        network = None
+        if node._nodes and (not dirty_only or node in parent._dirty_subprojects or node._needs_update()):
+            network = describe(node, dirty_only=dirty_only)
+        tasks.append((node.name, node.duration, node.lag, network))
+        for to_node in node.to_nodes:
+            j = index.get(id(to_node))
+            if j is not None:
+                links.append((i, j))
+    return parent.name, parent.lag, tasks, links
+
+
+def build(description, cls):
+    """
+    Returns a new parent node of the given class from a description made by describe().
+    """
+    name, lag, tasks, links = description
+    parent = cls(name, lag=lag)
+    children = []
+    for task_name, duration, task_lag, network in tasks:
+        if network is None:
+            children.append(cls(task_name, duration=duration, lag=task_lag))
+        else:
+            node = build(network, cls)
+            node._duration = duration
+            children.append(node)
+    parent.add_many(children)
+    for i, j in links:
+        cls._connect(children[i], children[j])
+    return parent
+
+
+def results(parent):
+    """
+    Returns the calculated times of the parent and its described child networks,
+    in the same order as describe().
+    """
+    nodes = parent.nodes
+    index = dict((id(node), i) for i, node in enumerate(nodes))
+    times = []
+    for node in nodes:
+        prior = -1 if node._path_prior is None else index[id(node._path_prior)]
+        times.append((
+            node._es, node._ef, node._ls, node._lf, node._total_float, node._free_float,
+            node._path_length, prior, node._path_tail,
+            results(node) if node._nodes else None,
+        ))
+    path = [index[id(_)] for _ in parent.get_critical_path()]
+    return parent.duration, times, path
+
+
+def apply(parent, result, times=True):
+    """
+    Copies times returned by results() onto the parent and its child nodes,
+    leaving the parent's own times alone if times is false.
+    """
+    nodes = parent.nodes
+    apply_times(nodes, result[1])
+    # The results are from update_tree(), so every subproject below is up to date.
+    parent._finish_update([nodes[_] for _ in result[2]], tree=True, times=times)
+
+
+def apply_times(nodes, times):
+    """
+    Copies the times of each task returned by results() onto the described nodes.
+    """
+    for node, node_times in zip(nodes, times):
+        node._es, node._ef, node._ls, node._lf, node._total_float, node._free_float = node_times[:6]
+        node._path_length, prior, node._path_tail, network = node_times[6:]
+        node._path_prior = None if prior < 0 else nodes[prior]
+        if network is not None:
+            # A subproject's times above are relative to its own parent,
+            # and must not be replaced by those of its critical path.
+            node._duration = network[0]
+            apply(node, network, times=False)
+
+
+def _update_description(description, cls):
+    parent = build(description, cls)
+    parent.update_tree()
+    return results(parent)
+
+
+def update_subprojects(subprojects, workers):
+    """
+    Runs update_tree() on each of the given independent subprojects in a pool
+    of worker processes, copying the results back as each one finishes.
+    """
+    assert ProcessPoolExecutor is not None, 'Workers require concurrent.futures.'
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = dict(
+            (executor.submit(_update_description, describe(node, dirty_only=True), type(node)), node)
+            for node in subprojects)
+        for future in as_completed(futures):
+            apply(futures[future], future.result())
+
+
+def size(parent):
+    """
+    Returns the number of tasks and links in the parent's network, counting
+    those of nested subprojects, as a measure of the work to schedule it.
+    """
+    total = 0
+    for node in parent.nodes:
+        total += 1 + len(node.to_nodes)
+        if node._nodes:
+            total += size(node)
+    return total
+
+
+def _schedule_description(description, cls):
+    """
+    Returns results() for a description, scheduling a network without
+    subprojects straight from its arrays instead of building any nodes.
+    """
+    name, lag, tasks, links = description
+    if any(_[3] is not None for _ in tasks):
+        return _update_description(description, cls)
+    successors = [[] for _ in tasks]
+    predecessors = [[] for _ in tasks]
+    for i, j in links:
+        successors[i].append(j)
+        predecessors[j].append(i)
+    network = CompiledNetwork.from_lists(
+        successors, predecessors, [_[1] for _ in tasks], [_[2] for _ in tasks], lag)
+    network.update()
+
+    positions = _tolist(network.positions)
+    es, ef, ls, lf, total_float, free_float, path_length, path_prior, path_tail = [_tolist(_) for _ in (
+        network.es, network.ef, network.ls, network.lf, network.total_float, network.free_float,
+        network.path_length, network.path_prior, network.path_tail)]
+    times = [None] * len(tasks)
+    for i, position in enumerate(positions):
+        times[position] = (
+            es[i], ef[i], ls[i], lf[i], total_float[i], free_float[i],
+            path_length[i], positions[path_prior[i]] if path_prior[i] >= 0 else -1, path_tail[i], None)
+    return path_length[network.critical_path[-1]], times, [positions[_] for _ in network.critical_path]
+
+
+def _tolist(values):
+    return values.tolist() if hasattr(values, 'tolist') else list(values)
+
+
+def _update_descriptions(descriptions, cls):
+    return [_schedule_description(_, cls) for _ in descriptions]
+
+
+def batch_update(projects, workers=None, chunks_per_worker=4):
+    """
+    Runs update_tree() on each of the given independent projects, yielding
+    each project as soon as its times have been copied back onto it.
+
+    With workers, projects are described and scheduled in that many worker
+    processes. The largest are sent first, so one huge project starts at
+    once instead of holding up the end of the batch, and small projects are
+    sent together, in chunks of roughly the same amount of work, so each
+    worker gets about chunks_per_worker of them. Only a few chunks per
+    worker are described at a time, to keep memory down. Projects are
+    yielded in the order they finish.
+    """
+    if not workers:
+        for project in projects:
+            project.update_tree()
+            yield project
+        return
+    assert ProcessPoolExecutor is not None, 'Workers require concurrent.futures.'
+
+    sized = []
+    for project in projects:
+        if project._nodes:
+            sized.append((size(project), project))
+        else:
+            # Nothing to schedule.
+            yield project
+    sized.sort(key=lambda _: _[0], reverse=True)
+
+    # Largest first, each chunk holding projects until it reaches its share of the work.
+    target = sum(_[0] for _ in sized) / float(workers * chunks_per_worker) if sized else 0
+    chunks = []
+    chunk = []
+    chunk_size = 0
+    for project_size, project in sized:
+        chunk.append(project)
+        chunk_size += project_size
+        if chunk_size >= target:
+            chunks.append(chunk)
+            chunk = []
+            chunk_size = 0
+    if chunk:
+        chunks.append(chunk)
+    chunks.reverse()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        running = {}
+        while chunks or running:
+            while chunks and len(running) < workers * 2:
+                chunk = chunks.pop()
+                descriptions = [describe(_) for _ in chunk]
+                running[executor.submit(_update_descriptions, descriptions, type(chunk[0]))] = chunk
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                for project, result in zip(running.pop(future), future.result()):
+                    apply(project, result)
+                    yield project
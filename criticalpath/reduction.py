@@ -0,0 +1,238 @@
+"""
+Shrinking a task network before scheduling it, without changing the result.
+
+Exported dependency lists often hold links that another path already
+implies, such as A -> C beside A -> B -> C, and long runs of tasks that
+each have one predecessor and one successor. A ReducedNetwork drops the
+first and merges the second into single composite tasks, repeating until
+neither finds anything more, then schedules what is left as a
+CompiledNetwork and spreads the times back over the original tasks.
+
+A link from A to C is only dropped when it is dominated by a path through
+some B whose lag is not negative and whose duration is positive. Then C
+can never start earlier, nor A finish later, because of that link than
+because of B, and B's path to C is strictly longer, so the critical path
+found is the same too. A run of tasks is only merged if every task after
+the first has no lag, and only when all durations and lags are integers,
+so the times added up along the run are exactly those the passes over
+the original tasks would find.
+"""
+from __future__ import print_function
+
+from collections import deque
+
+from .compiled import CompiledNetwork, integral, np
+
+
+class ReducedNetwork(object):
+    """
+    The child nodes of a parent node, with redundant links dropped and
+    serial chains merged, ready to be scheduled like a CompiledNetwork.
+
+    Each remaining task is a chain of one or more child nodes, known by
+    the position of its last node in parent.nodes.
+
+    Reducing a network reads every link in Python, as update_all() does,
+    so it costs more than one update saves. It pays off when the smaller
+    network is updated again and again, or kept or handed on: len() and
+    removed_links show how much of an exported network is redundant.
+    """
+
+    def __init__(self, parent, reduce_links=True, collapse_chains=True):
+        self.parent = parent
+        nodes = parent.nodes
+        get = dict((id(node), i) for i, node in enumerate(nodes)).get
+        # Indexed by position in parent.nodes, with None for the links of a
+        # task merged into the next. Predecessors are kept in the order of
+        # each node's incoming_nodes, in dictionaries with no values, so ties
+        # between equally long paths are broken just as update_all() breaks them.
+        successors = [set(_ for _ in map(get, map(id, node.to_nodes)) if _ is not None) for node in nodes]
+        predecessors = [
+            dict.fromkeys(_ for _ in map(get, map(id, node.incoming_nodes)) if _ is not None) for node in nodes]
+        durations = [node.duration for node in nodes]
+        lags = [node.lag for node in nodes]
+        links = sum(len(_) for _ in successors)
+
+        self.successors = successors
+        self.predecessors = predecessors
+        self.durations = durations
+        self.lags = lags
+        # The chains of merged tasks only, as every other task is a chain of one.
+        self.merged = {}
+
+        collapse_chains = collapse_chains and integral([parent.lag] + durations + lags)
+        # Without a task that has two predecessors, there is no link to drop.
+        reduce_links = reduce_links and any(len(_) > 1 for _ in predecessors)
+
+        # Each pass can open the way for the other, so they take turns on the
+        # tasks the last pass touched until neither changes anything.
+        pending = range(len(nodes))
+        while pending:
+            touched = set()
+            if reduce_links:
+                touched.update(self._drop_dominated(pending))
+            if collapse_chains:
+                touched.update(self._collapse_chains(touched.union(pending)))
+            pending = [_ for _ in touched if successors[_] is not None]
+
+        self.removed_links = links - sum(len(_) for _ in successors if _ is not None) - sum(
+            len(_) - 1 for _ in self.merged.values())
+
+        # Compile what is left, numbering tasks from 0.
+        tasks = [task for task, _ in enumerate(successors) if _ is not None]
+        number = dict((task, i) for i, task in enumerate(tasks))
+        self.tasks = tasks
+        self.network = CompiledNetwork.from_lists(
+            [[number[_] for _ in successors[task]] for task in tasks],
+            [[number[_] for _ in predecessors[task]] for task in tasks],
+            [durations[_] for _ in tasks],
+            [lags[_] for _ in tasks],
+            parent.lag,
+            tasks)
+
+    def __len__(self):
+        return len(self.tasks)
+
+    @property
+    def chains(self):
+        """
+        A dictionary mapping each remaining task to the positions of the child
+        nodes it is made of, in order.
+        """
+        merged = self.merged
+        return dict((task, merged.get(task) or deque([task])) for task in self.tasks)
+
+    def _drop_dominated(self, tasks):
+        """
+        Drops each link into the given tasks that is implied by a path
+        u -> w -> v, returning the tasks whose links changed.
+        """
+        successors, predecessors = self.successors, self.predecessors
+        durations, lags = self.durations, self.lags
+        touched = []
+        for v in tasks:
+            before = predecessors[v]
+            if before is None or len(before) < 2:
+                continue
+            dominated = set()
+            for w in before:
+                if durations[w] > 0 and lags[w] >= 0:
+                    dominated.update(u for u in predecessors[w] if u in before and u != w)
+            for u in dominated:
+                del before[u]
+                successors[u].discard(v)
+                touched.append(u)
+            if dominated:
+                # v may now be merged with its one remaining predecessor.
+                touched.extend(before)
+        return touched
+
+    def _collapse_chains(self, tasks):
+        """
+        Merges each of the given tasks with its only successor, where that
+        successor has no other predecessor and no lag, and so on along the
+        chain, returning the merged tasks and their successors.
+        """
+        successors, predecessors = self.successors, self.predecessors
+        durations, lags, merged = self.durations, self.lags, self.merged
+        touched = []
+        # In topological order would be ideal, but any order merges every
+        # chain, since a merged task is tried again under its new name.
+        stack = list(tasks)
+        while stack:
+            u = stack.pop()
+            if successors[u] is None or len(successors[u]) != 1:
+                continue
+            v = next(iter(successors[u]))
+            if v == u or len(predecessors[v]) != 1 or lags[v] != 0:
+                continue
+            # The merged task takes v's place, keeping u's predecessors and lag.
+            for p in predecessors[u]:
+                successors[p].discard(u)
+                successors[p].add(v)
+            predecessors[v] = predecessors[u]
+            predecessors[u] = successors[u] = None
+            # The shorter chain is copied onto the longer, so a long chain
+            # costs O(n log n) to build whichever end it is merged from.
+            first, second = merged.pop(u, None) or deque([u]), merged.get(v) or deque([v])
+            if len(first) < len(second):
+                second.extendleft(reversed(first))
+                merged[v] = second
+            else:
+                first.extend(second)
+                merged[v] = first
+            durations[v] += durations[u]
+            lags[v] = lags[u]
+            stack.append(v)
+            # v's successors now have a longer predecessor, which may dominate more links.
+            touched.append(v)
+            touched.extend(successors[v])
+        return touched
+
+    def update(self):
+        """
+        Calculates the earliest and latest times and the critical path of the remaining tasks.
+        """
+        self.network.update()
+
+    def write_back(self):
+        """
+        Copies the calculated times onto every child node, spreading those of
+        each merged chain along it, and onto the parent.
+        """
+        network = self.network
+        if not len(network):
+            # Nothing to schedule, as in the parent's update_all().
+            return
+        if network.es is None:
+            network.update()
+        parent = self.parent
+        nodes = parent.nodes
+        merged = self.merged
+        values = [
+            network.es, network.ef, network.ls, network.lf, network.free_float,
+            network.path_length, network.path_prior, network.path_tail]
+        if np is not None:
+            values = [_.tolist() for _ in values]
+        es, ef, ls, lf, free_float, path_length, path_prior, path_tail = values
+        positions = network.positions.tolist() if np is not None else list(network.positions)
+
+        for i, task in enumerate(positions):
+            prior = nodes[positions[path_prior[i]]] if path_prior[i] >= 0 else None
+            chain = merged.get(task)
+            if chain is None:
+                node = nodes[task]
+                node._es, node._ef, node._ls, node._lf = es[i], ef[i], ls[i], lf[i]
+                node._total_float = ls[i] - es[i]
+                node._free_float = free_float[i]
+                node._path_prior = prior
+                node._path_length = path_length[i]
+                node._path_tail = path_tail[i]
+                continue
+            # Integer times, added up forward along the chain from the first
+            # node's earliest start, and backward from the last node's latest
+            # finish. Only the first node can have a lag.
+            chain = [nodes[_] for _ in chain]
+            start = es[i]
+            length = 0 if prior is None else prior._path_length
+            for node in chain:
+                node._es = start
+                node._ef = start = start + node.duration
+                node._path_prior = prior
+                node._path_length = length = length + node.lag + node.duration
+                node._free_float = 0
+                prior = node
+            chain[-1]._free_float = free_float[i]
+            finish = lf[i]
+            tail = path_tail[i] - sum(node.lag + node.duration for node in chain)
+            for node in reversed(chain):
+                node._lf = finish
+                node._ls = finish = finish - node.duration
+                node._path_tail = tail = tail + node.lag + node.duration
+                node._total_float = node._ls - node._es
+
+        path = []
+        for i in network.critical_path:
+            task = positions[i]
+            path.extend(nodes[_] for _ in merged.get(task, (task,)))
+        parent._finish_update(path)
@@ -0,0 +1,477 @@
+"""
+Resource-constrained scheduling.
+
+The parent node's capacities map each resource to how much of it is
+available, either a fixed amount or a list of (time, amount) steps, and
+each child node's demands map resources to how much the task uses while
+it runs. Tasks are then started no earlier than their links allow and
+only when every resource they need is free for their whole duration.
+
+Tasks are taken from a heap in the order of a priority rule based on the
+unconstrained times from update_all(). Free capacity is held as a step
+function of time, its breakpoints split into blocks that each know the
+least and most free within them, so finding where a task fits skips whole
+blocks that are too full, or too free to stop it, rather than stepping
+through every breakpoint, and a reservation only rewrites the breakpoints
+of the blocks at its ends.
+"""
+from __future__ import print_function
+
+import heapq
+from bisect import bisect_right
+from functools import partial
+from itertools import compress, count, islice
+from operator import gt, le, sub
+
+# Priority rules: the task with the smallest key is scheduled first.
+RULES = {
+    'total_float': lambda node: (node.total_float, node.es),
+    'latest_finish': lambda node: (node.lf, node.es),
+    'latest_start': lambda node: (node.ls, node.es),
+    'earliest_start': lambda node: (node.es, node.total_float),
+}
+
+# How many breakpoints a block holds before it is split in two, and how
+# many blocks are summed up together.
+BLOCK_SIZE = 16
+CHUNK_SIZE = 32
+
+
+def _below(values, start, threshold):
+    """
+    Returns the indexes from start of the values less than threshold, without a loop in Python.
+    """
+    # map() is only given the one finite iterable, as on Python 2 it runs
+    # until the longest of several does.
+    return list(compress(count(start), map(partial(gt, threshold), islice(values, start, None))))
+
+
+def _fit(run, ends, starts, duration):
+    """
+    Returns the start of the first run of enough free lasting duration, given
+    when the current run started and when each later shortage ends and starts,
+    or None, without a loop in Python.
+    """
+    heads = [run]
+    heads.extend(starts[:-1])
+    return next(compress(heads, map(partial(le, duration), map(sub, ends, heads))), None)
+
+
+class CapacityProfile(object):
+    """
+    The free amount of one resource over time, as a step function.
+
+    Its breakpoints are kept in blocks of up to 2 * BLOCK_SIZE. In block b,
+    free[b][i] + shift[b] is available from times[b][i] until the next
+    breakpoint, and the last amount for ever after. low[b] is the least
+    available anywhere in block b.
+
+    Where a task fits is found from summaries of where each block, and each
+    chunk of CHUNK_SIZE blocks, runs short of an amount: when the first
+    shortage starts, the longest run of enough free between shortages, and
+    when the run after the last shortage starts. A search steps over whole
+    chunks, then whole blocks, until one holds a run long enough.
+    """
+
+    def __init__(self, capacity, start=0):
+        if isinstance(capacity, (list, tuple)):
+            steps = sorted(capacity)
+            if steps[0][0] > start:
+                steps.insert(0, (start, 0))
+        else:
+            steps = [(start, capacity)]
+        blocks = range(0, len(steps), BLOCK_SIZE)
+        self.times = [[time for time, _ in steps[i:i + BLOCK_SIZE]] for i in blocks]
+        self.free = [[amount for _, amount in steps[i:i + BLOCK_SIZE]] for i in blocks]
+        self.shift = [0] * len(self.times)
+        self.firsts = [_[0] for _ in self.times]
+        self.low = [min(_) for _ in self.free]
+        # Summaries of each block by the amount before shifting, and of each
+        # chunk by the amount, as found by _summary() and _chunk_summary().
+        self._block_memo = [{} for _ in self.times]
+        self._chunk_memo = [{} for _ in range(0, len(self.times), CHUNK_SIZE)]
+        # Reservations all end, so this never changes.
+        self.last = steps[-1][1]
+
+    def _locate(self, time):
+        b = max(bisect_right(self.firsts, time) - 1, 0)
+        return b, max(bisect_right(self.times[b], time) - 1, 0)
+
+    def amount(self, time):
+        """
+        Returns the amount free at the given time.
+        """
+        b, i = self._locate(time)
+        return self.free[b][i] + self.shift[b]
+
+    def _runs(self, b, demand, start=0):
+        """
+        Returns (ends, starts) for block b from index start, where ends are
+        the times at which the free amount falls below demand, and starts
+        the times after each at which there is enough again.
+        """
+        times = self.times[b]
+        short = _below(self.free[b], start, demand - self.shift[b])
+        if not short:
+            return short, short
+        ends = [times[_] for _ in short]
+        starts = [times[_ + 1] for _ in short[:-1]]
+        # The last amount is always enough, so only the last block cannot run short at its end.
+        starts.append(times[short[-1] + 1] if short[-1] + 1 < len(times) else self.firsts[b + 1])
+        return ends, starts
+
+    def _summary(self, b, demand):
+        """
+        Returns (ends, starts, longest) for the whole of block b as _runs()
+        does, where longest is the longest time in between with enough free.
+        """
+        threshold = demand - self.shift[b]
+        memo = self._block_memo[b]
+        summary = memo.get(threshold)
+        if summary is None:
+            ends, starts = self._runs(b, demand)
+            longest = max(map(sub, ends[1:], starts[:-1])) if len(ends) > 1 else 0
+            summary = memo[threshold] = ends, starts, longest
+        return summary
+
+    def _chunk_summary(self, c, demand):
+        """
+        Returns (first, longest, last) for chunk c, where first is when the
+        first shortage starts, longest is the longest run of enough free
+        between shortages, and last is when the run after the last starts,
+        or None if the chunk never runs short.
+        """
+        memo = self._chunk_memo[c]
+        if demand in memo:
+            return memo[demand]
+        first = last = None
+        longest = 0
+        low = self.low
+        for b in range(c * CHUNK_SIZE, min(c * CHUNK_SIZE + CHUNK_SIZE, len(low))):
+            if low[b] >= demand:
+                continue
+            ends, starts, block_longest = self._summary(b, demand)
+            if first is None:
+                first = ends[0]
+            else:
+                longest = max(longest, ends[0] - last)
+            longest = max(longest, block_longest)
+            last = starts[-1]
+        summary = memo[demand] = None if first is None else (first, longest, last)
+        return summary
+
+    def earliest(self, start, duration, demand):
+        """
+        Returns the earliest time from start at which demand is free for duration.
+
+        demand must be no more than the last amount free.
+        """
+        if not duration or demand <= 0:
+            return start
+        low = self.low
+        b, i = self._locate(start)
+        # When the run of enough free being followed started.
+        run = start
+        if low[b] < demand:
+            # The first block is only searched from start.
+            ends, starts = self._runs(b, demand, i)
+            if ends:
+                fit = _fit(run, ends, starts, duration)
+                if fit is not None:
+                    return fit
+                run = starts[-1]
+        b += 1
+        while b < len(low):
+            if not b % CHUNK_SIZE:
+                summary = self._chunk_summary(b // CHUNK_SIZE, demand)
+                if summary is None:
+                    # Never short, so the run goes on through the whole chunk.
+                    b += CHUNK_SIZE
+                    continue
+                first, longest, last = summary
+                if first - run >= duration:
+                    return run
+                if longest < duration:
+                    run = last
+                    b += CHUNK_SIZE
+                    continue
+            # This chunk holds a run long enough, so each block is looked at.
+            for b in range(b, min(b // CHUNK_SIZE * CHUNK_SIZE + CHUNK_SIZE, len(low))):
+                if low[b] >= demand:
+                    continue
+                ends, starts, longest = self._summary(b, demand)
+                if ends[0] - run >= duration:
+                    return run
+                if longest >= duration:
+                    return _fit(run, ends, starts, duration)
+                run = starts[-1]
+            b += 1
+        return run
+
+    def _changed(self, b):
+        self._block_memo[b].clear()
+        self._chunk_memo[b // CHUNK_SIZE].clear()
+
+    def _split(self, time):
+        """
+        Adds a breakpoint at the given time if there is none.
+        """
+        b, i = self._locate(time)
+        times, free = self.times[b], self.free[b]
+        if times[i] == time:
+            return
+        times.insert(i + 1, time)
+        free.insert(i + 1, free[i])
+        self._changed(b)
+        if len(times) > 2 * BLOCK_SIZE:
+            self.times.insert(b + 1, times[BLOCK_SIZE:])
+            self.free.insert(b + 1, free[BLOCK_SIZE:])
+            del times[BLOCK_SIZE:], free[BLOCK_SIZE:]
+            self.shift.insert(b + 1, self.shift[b])
+            self.firsts.insert(b + 1, self.times[b + 1][0])
+            self.low.insert(b + 1, min(self.free[b + 1]) + self.shift[b])
+            self.low[b] = min(free) + self.shift[b]
+            self._block_memo.insert(b + 1, {})
+            # Every chunk from here on now holds other blocks.
+            chunks = self._chunk_memo
+            for c in range(b // CHUNK_SIZE, len(chunks)):
+                chunks[c].clear()
+            if len(self.times) > len(chunks) * CHUNK_SIZE:
+                chunks.append({})
+
+    def _subtract(self, b, i, j, demand):
+        free = self.free[b]
+        free[i:j] = [_ - demand for _ in free[i:j]]
+        self.low[b] = min(free) + self.shift[b]
+        self._changed(b)
+
+    def reserve(self, start, duration, demand):
+        """
+        Takes demand from the free amount from start for duration.
+        """
+        if not duration or not demand:
+            return
+        end = start + duration
+        self._split(start)
+        self._split(end)
+        b, i = self._locate(start)
+        c, j = self._locate(end)
+        if b == c:
+            self._subtract(b, i, j, demand)
+            return
+        self._subtract(b, i, len(self.free[b]), demand)
+        # Whole blocks in between are only shifted, which their own summaries
+        # are kept through, as they are by the amount before shifting.
+        shift, low, chunks = self.shift, self.low, self._chunk_memo
+        for k in range(b + 1, c):
+            shift[k] -= demand
+            low[k] -= demand
+            chunks[k // CHUNK_SIZE].clear()
+        if j:
+            self._subtract(c, 0, j, demand)
+
+
+class ResourceSchedule(object):
+    """
+    The start and finish of each task in a resource-constrained schedule.
+    """
+
+    def __init__(self, parent, starts, finishes):
+        self.parent = parent
+        self.starts = starts
+        self.finishes = finishes
+
+    @property
+    def finish(self):
+        """
+        When the last task finishes.
+        """
+        return max(self.finishes.values()) if self.finishes else None
+
+    @property
+    def duration(self):
+        """
+        How long the tasks take from the parent's start.
+        """
+        return None if not self.finishes else self.finish - self.parent.lag
+
+    def delay(self, node):
+        """
+        How much later the task starts than its unconstrained earliest start.
+        """
+        return self.starts[node] - node.es
+
+    def profile(self, resource):
+        """
+        Returns the amount of a resource in use over time, as a list of
+        (time, amount) steps, each lasting until the next.
+        """
+        changes = {}
+        for node, start in self.starts.items():
+            demand = (node.demands or {}).get(resource, 0)
+            finish = self.finishes[node]
+            if demand and finish > start:
+                changes[start] = changes.get(start, 0) + demand
+                changes[finish] = changes.get(finish, 0) - demand
+        steps = []
+        used = 0
+        for time in sorted(changes):
+            used += changes[time]
+            if steps and steps[-1][1] == used:
+                continue
+            steps.append((time, used))
+        return steps
+
+
+def schedule(parent, rule='total_float', scheme='serial'):
+    """
+    Returns a ResourceSchedule of the parent's child nodes, within the
+    parent's capacities and each task's demands.
+
+    rule names one of RULES, or is a function returning a sort key for a
+    task. With the serial scheme, tasks are placed one at a time in order
+    of priority among those whose predecessors are placed, each as early as
+    the links and free resources allow. With the parallel scheme, time moves
+    forward from one event to the next, starting as many of the waiting
+    tasks as fit at each one, in order of priority.
+    """
+    assert scheme in ('serial', 'parallel'), 'Unknown scheme: %s' % (scheme,)
+    if parent._needs_update():
+        parent.update_all()
+    if callable(rule):
+        key = rule
+    elif rule in RULES:
+        key = RULES[rule]
+    else:
+        raise ValueError('Unknown rule: %s' % (rule,))
+    start = parent.lag
+    capacities = parent.capacities or {}
+    profiles = dict((resource, CapacityProfile(capacity, start)) for resource, capacity in capacities.items())
+
+    nodes = parent.nodes
+    waiting = {}
+    eligible = []
+    for i, node in enumerate(nodes):
+        count = sum(1 for _ in node.incoming_nodes if _.parent is parent)
+        if count:
+            waiting[node] = count
+        else:
+            eligible.append((key(node), i, node))
+        for resource, demand in (node.demands or {}).items():
+            assert resource in profiles, 'Task %s needs %s, which the parent has no capacity for.' % (node.name, resource)
+            assert demand <= profiles[resource].last, \
+                'Task %s needs more %s than will ever be free.' % (node.name, resource)
+    heapq.heapify(eligible)
+
+    # Keyed by id() to save hashing nodes by name.
+    position = dict((id(node), i) for i, node in enumerate(nodes))
+    starts = {}
+    finishes = {}
+    released = []
+
+    def ready(node):
+        es = None
+        for from_node in node.incoming_nodes:
+            if from_node.parent is parent and (es is None or finishes[id(from_node)] > es):
+                es = finishes[id(from_node)]
+        return (start if es is None else es) + node.lag
+
+    def earliest(node, time):
+        # Each resource may put the start off, until none of them does.
+        demands = node.demands
+        while demands:
+            later = time
+            for resource, demand in demands.items():
+                later = profiles[resource].earliest(later, node.duration, demand)
+            if later == time:
+                break
+            time = later
+        return time
+
+    def place(node, time):
+        starts[id(node)] = time
+        finishes[id(node)] = time + node.duration
+        for resource, demand in (node.demands or {}).items():
+            profiles[resource].reserve(time, node.duration, demand)
+        for to_node in node.to_nodes:
+            if to_node.parent is not parent:
+                continue
+            waiting[to_node] -= 1
+            if not waiting[to_node]:
+                released.append(to_node)
+
+    if scheme == 'serial':
+        while eligible:
+            _, _, node = heapq.heappop(eligible)
+            place(node, earliest(node, ready(node)))
+            for to_node in released:
+                heapq.heappush(eligible, (key(to_node), position[id(to_node)], to_node))
+            del released[:]
+    else:
+        # Tasks whose predecessors are placed, by when their links let them
+        # start, or by when a shortage that turned them away ends.
+        future = [(ready(node), i, node) for _, i, node in eligible]
+        heapq.heapify(future)
+        eligible = []
+        # Tasks turned away for want of a resource, kept in order of
+        # priority by resource and amount, so at each event only those
+        # there is now enough of the resource for are looked at again.
+        short = dict((resource, {}) for resource in profiles)
+        # When more of a resource comes free.
+        events = [time for profile in profiles.values() for block in profile.times for time in block]
+        heapq.heapify(events)
+        while future or any(short.values()):
+            time = min(future[0][0] if future else events[0], events[0] if events else future[0][0])
+            while events and events[0] <= time:
+                heapq.heappop(events)
+            while future and future[0][0] <= time:
+                _, i, node = heapq.heappop(future)
+                heapq.heappush(eligible, (key(node), i, node))
+            available = dict((resource, profile.amount(time)) for resource, profile in profiles.items())
+            while True:
+                # The task with the highest priority among those that might fit.
+                best, lacking = (eligible[0], None) if eligible else (None, None)
+                for resource, waiting_for in short.items():
+                    for demand, tasks in waiting_for.items():
+                        if demand <= available[resource] and (best is None or tasks[0] < best):
+                            best, lacking = tasks[0], (resource, demand)
+                if best is None:
+                    break
+                if lacking is None:
+                    heapq.heappop(eligible)
+                else:
+                    resource, demand = lacking
+                    heapq.heappop(short[resource][demand])
+                    if not short[resource][demand]:
+                        del short[resource][demand]
+                node = best[2]
+                # A task taking no time needs nothing free.
+                demands = (node.demands or {}) if node.duration else {}
+                lacking = next(((_, demand) for _, demand in demands.items() if demand > available[_]), None)
+                if lacking is not None:
+                    resource, demand = lacking
+                    heapq.heappush(short[resource].setdefault(demand, []), best)
+                    continue
+                later = earliest(node, time)
+                if later > time:
+                    # Enough is free now, but not for long enough.
+                    heapq.heappush(future, (later, best[1], node))
+                    continue
+                place(node, time)
+                if demands:
+                    heapq.heappush(events, time + node.duration)
+                    for resource, demand in demands.items():
+                        available[resource] -= demand
+                for to_node in released:
+                    # Successors of a task taking no time may start at once.
+                    later = ready(to_node)
+                    if later <= time:
+                        heapq.heappush(eligible, (key(to_node), position[id(to_node)], to_node))
+                    else:
+                        heapq.heappush(future, (later, position[id(to_node)], to_node))
+                del released[:]
+
+    return ResourceSchedule(
+        parent,
+        dict((node, starts[id(node)]) for node in nodes),
+        dict((node, finishes[id(node)]) for node in nodes))
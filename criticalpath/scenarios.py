@@ -0,0 +1,141 @@
+"""
+What-if analysis of many duration and lag changes against one network.
+
+The network is compiled and scheduled once. Each scenario copies only the
+durations and lags, applies its changes and reschedules the shared arrays,
+so no Node is built or touched. Scenarios can be spread over threads, or
+over processes that each receive the frozen arrays once when they start.
+"""
+from __future__ import print_function
+
+import sys
+from collections import namedtuple
+from numbers import Integral
+
+try:
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+except ImportError:
+    ProcessPoolExecutor = ThreadPoolExecutor = None
+
+# Process pools take an initializer from Python 3.7 on.
+POOL_INITIALIZER = sys.version_info >= (3, 7)
+
+
+class ScenarioResult(namedtuple('ScenarioResult', ('duration', 'critical_path', 'critical_path_changed', 'floats'))):
+    """
+    The outcome of one scenario: the project duration, lags included, the
+    names of the tasks on the critical path, whether that path differs from
+    the unchanged network's, and a dictionary of the tasks whose
+    (total float, free float) differ from the unchanged network's.
+    """
+    __slots__ = ()
+
+
+def _tolist(values):
+    # A network with no tasks is left without times by update().
+    return [] if values is None else values.tolist()
+
+
+class FrozenNetwork(object):
+    """
+    A parent node's child nodes, compiled and scheduled once, for evaluating scenarios.
+
+    Later changes to the nodes are not seen. Only names and arrays are
+    held, so it is cheap to send to worker processes.
+    """
+
+    def __init__(self, parent):
+        network = parent.compile()
+        network.update()
+        self.names = [_.name for _ in network.nodes]
+        self.index = dict((name, i) for i, name in enumerate(self.names))
+        # The arrays are all that is needed from here on.
+        network.parent = None
+        network.nodes = None
+        self.network = network
+        self.durations = _tolist(network.durations)
+        self.lags = _tolist(network.lags)
+        self.duration = network.duration
+        # With no tasks there is no critical path, as in the parent's update_all().
+        self.critical_path = [self.names[_] for _ in network.critical_path or ()]
+        self.total_float = _tolist(network.total_float)
+        self.free_float = _tolist(network.free_float)
+
+    def __len__(self):
+        return len(self.names)
+
+    def evaluate(self, scenario):
+        """
+        Returns a ScenarioResult for one scenario, a dictionary mapping task
+        names to a new duration, or to a (duration, lag) pair where either
+        may be None to keep the current value.
+        """
+        durations = list(self.durations)
+        lags = list(self.lags)
+        typecode = self.network.typecode
+        for name, value in scenario.items():
+            i = self.index[name]
+            duration, lag = value if isinstance(value, tuple) else (value, None)
+            if duration is not None:
+                durations[i] = duration
+                if not isinstance(duration, Integral):
+                    typecode = 'd'
+            if lag is not None:
+                lags[i] = lag
+                if not isinstance(lag, Integral):
+                    typecode = 'd'
+        network = self.network.copy(durations, lags, typecode)
+        network.update()
+
+        names = self.names
+        total_float = _tolist(network.total_float)
+        free_float = _tolist(network.free_float)
+        base_total_float, base_free_float = self.total_float, self.free_float
+        floats = dict(
+            (names[i], (total_float[i], free_float[i]))
+            for i in range(len(names))
+            if total_float[i] != base_total_float[i] or free_float[i] != base_free_float[i])
+        path = [names[_] for _ in network.critical_path or ()]
+        duration = network.duration
+        return ScenarioResult(
+            duration.item() if hasattr(duration, 'item') else duration, path, path != self.critical_path, floats)
+
+    def evaluate_many(self, scenarios, workers=None, processes=False, chunksize=16):
+        """
+        Returns a list of ScenarioResults, one for each of the given scenarios, in order.
+
+        If workers is given, scenarios are evaluated by that many threads, or
+        with processes set, by that many processes, each sent this network
+        once when it starts and then chunksize scenarios at a time. Before
+        Python 3.7, the network is sent along with each chunk instead.
+        """
+        if workers is None:
+            return [self.evaluate(_) for _ in scenarios]
+        assert ThreadPoolExecutor is not None, 'Workers require concurrent.futures.'
+        if not processes:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(self.evaluate, scenarios))
+        if POOL_INITIALIZER:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self,)) as executor:
+                return list(executor.map(_evaluate, scenarios, chunksize=chunksize))
+        scenarios = list(scenarios)
+        chunks = [scenarios[i:i + chunksize] for i in range(0, len(scenarios), chunksize)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return [_ for results in executor.map(_evaluate_chunk, [self] * len(chunks), chunks) for _ in results]
+
+
+# The network each worker process evaluates scenarios against, sent once when the worker starts.
+_worker_network = None
+
+
+def _init_worker(network):
+    global _worker_network # pylint: disable=global-statement
+    _worker_network = network
+
+
+def _evaluate(scenario):
+    return _worker_network.evaluate(scenario)
+
+
+def _evaluate_chunk(network, scenarios):
+    return [network.evaluate(_) for _ in scenarios]
@@ -0,0 +1,220 @@
+"""
+Monte Carlo schedule risk analysis.
+
+Task durations are sampled many times over and the whole batch of samples is
+scheduled at once, one level of the compiled network at a time, so the cost
+per sample is a handful of vectorized operations rather than a Node update.
+
+Requires NumPy.
+"""
+from __future__ import print_function
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    ProcessPoolExecutor = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# SeedSequence and Generator came in NumPy 1.17, after the last release for Python 2.
+SEED_SEQUENCE = np is not None and hasattr(np.random, 'SeedSequence')
+
+# Roughly how many sampled durations to hold in memory at once per chunk.
+CHUNK_CELLS = 2**22
+
+
+class SimulationPlan(object):
+    """
+    The parts of a compiled network needed to schedule sampled durations.
+
+    It holds only arrays, so it is cheap to send to worker processes.
+    """
+
+    def __init__(self, network, distributions):
+        self.names = [_.name for _ in network.nodes]
+        self.durations = np.asarray(network.durations, dtype=np.float64)
+        self.lags = np.asarray(network.lags, dtype=np.float64)
+        self.start = network.start
+        self.offsets = np.asarray(network.offsets)
+        self.targets = np.asarray(network.targets)
+        self.in_offsets = np.asarray(network.in_offsets)
+        self.sources = np.asarray(network.sources)
+        self.level_offsets = network.level_offsets
+
+        index = dict((name, i) for i, name in enumerate(self.names))
+        self.distributions = [(index[name], spec) for name, spec in distributions.items()]
+
+    def sample(self, rng, size):
+        """
+        Returns a (size, tasks) array of durations drawn from the distributions.
+        """
+        durations = np.tile(self.durations, (size, 1))
+        for i, spec in self.distributions:
+            durations[:, i] = draw(spec, rng, size)
+        return durations
+
+    def schedule(self, durations):
+        """
+        Returns the project finish of each row of durations, and a boolean
+        array marking the tasks with no total float in each row.
+        """
+        lags = self.lags
+        offsets, targets = self.offsets, self.targets
+        in_offsets, sources = self.in_offsets, self.sources
+        levels = self.level_offsets
+
+        es = np.empty_like(durations)
+        ef = np.empty_like(durations)
+        a, b = levels[0], levels[1]
+        es[:, a:b] = self.start + lags[a:b]
+        ef[:, a:b] = es[:, a:b] + durations[:, a:b]
+        for k in range(1, len(levels) - 1):
+            a, b = levels[k], levels[k + 1]
+            s, e = in_offsets[a], in_offsets[b]
+            es[:, a:b] = np.maximum.reduceat(ef[:, sources[s:e]], in_offsets[a:b] - s, axis=1) + lags[a:b]
+            ef[:, a:b] = es[:, a:b] + durations[:, a:b]
+        finish = ef.max(axis=1)
+
+        # Every last task may finish as late as the project does, so a task
+        # is critical only if it is on a path to the project's finish.
+        lf = np.empty_like(durations)
+        lf[:] = finish[:, None]
+        ls = np.empty_like(durations)
+        for k in range(len(levels) - 2, -1, -1):
+            a, b = levels[k], levels[k + 1]
+            s, e = offsets[a], offsets[b]
+            if e > s:
+                rows = np.flatnonzero(offsets[a + 1:b + 1] > offsets[a:b]) + a
+                successors = targets[s:e]
+                lf[:, rows] = np.minimum.reduceat(ls[:, successors] - lags[successors], offsets[rows] - s, axis=1)
+            ls[:, a:b] = lf[:, a:b] - durations[:, a:b]
+
+        # Allow for rounding in the sums of float durations.
+        tolerance = 1e-9 * np.maximum(1, np.abs(finish))[:, None]
+        return finish, ls - es <= tolerance
+
+
+def draw(spec, rng, size):
+    """
+    Returns size durations drawn from a distribution.
+
+    The distribution is either a function called with a NumPy random
+    generator and the size, or a tuple naming a method of the generator
+    followed by its parameters, e.g. ('triangular', 2, 3, 7). The tuple
+    ('pert', low, mode, high) gives a Beta-PERT distribution.
+    """
+    if callable(spec):
+        return spec(rng, size)
+    name, params = spec[0], spec[1:]
+    if name == 'pert':
+        low, mode, high = params
+        if high == low:
+            return np.full(size, float(low))
+        alpha = 1 + 4. * (mode - low) / (high - low)
+        beta = 1 + 4. * (high - mode) / (high - low)
+        return low + (high - low) * rng.beta(alpha, beta, size=size)
+    return getattr(rng, name)(*params, size=size)
+
+
+class SimulationResult(object):
+    """
+    Statistics gathered over all simulated samples.
+
+    Only each sample's project finish and a running count of how often each
+    task was critical are kept, never the sampled durations themselves.
+    """
+
+    def __init__(self, names):
+        self.names = names
+        self.n_samples = 0
+        self._finishes = []
+        self._critical_counts = np.zeros(len(names), dtype=np.int64)
+
+    def add(self, finish, critical_counts):
+        self.n_samples += len(finish)
+        self._finishes.append(finish)
+        self._critical_counts += critical_counts
+
+    @property
+    def finish(self):
+        """
+        The project finish of every sample.
+        """
+        if len(self._finishes) > 1:
+            self._finishes = [np.concatenate(self._finishes)]
+        return self._finishes[0] if self._finishes else np.empty(0)
+
+    @property
+    def mean(self):
+        return self.finish.mean()
+
+    @property
+    def std(self):
+        return self.finish.std()
+
+    def percentile(self, q):
+        """
+        Returns the project finish not exceeded by q percent of the samples, e.g. 80 for P80.
+        """
+        return np.percentile(self.finish, q)
+
+    @property
+    def criticality(self):
+        """
+        A dictionary of each task name and the fraction of samples in which it was critical.
+        """
+        fractions = self._critical_counts / float(max(self.n_samples, 1))
+        return dict(zip(self.names, fractions.tolist()))
+
+
+def _run_chunk(seed, size, plan):
+    rng = np.random.default_rng(seed) if SEED_SEQUENCE else np.random.RandomState(seed)
+    durations = plan.sample(rng, size)
+    finish, critical = plan.schedule(durations)
+    return finish, critical.sum(axis=0)
+
+
+def simulate(parent, n_samples, distributions, seed=None, chunk_size=None, workers=None, callback=None):
+    """
+    Schedules the parent's child nodes n_samples times with durations drawn
+    from the given distributions, and returns a SimulationResult.
+
+    distributions maps task names to distributions, as accepted by draw().
+    Other tasks keep their fixed duration. Samples are scheduled in chunks
+    of chunk_size, each with its own random stream derived from seed, so the
+    results do not depend on how many workers are used. If workers is given,
+    chunks are spread over that many processes, each sent along with the
+    plan, and any distribution functions must be picklable. If callback is
+    given, it is called with the result so far after each chunk.
+    """
+    assert np is not None, 'NumPy is required for simulation.'
+    assert parent.nodes, 'Network must contain at least one task to simulate.'
+    plan = SimulationPlan(parent.compile(), distributions)
+    if chunk_size is None:
+        chunk_size = max(1, CHUNK_CELLS // max(1, len(plan.names)))
+    sizes = [min(chunk_size, n_samples - _) for _ in range(0, n_samples, chunk_size)]
+    if SEED_SEQUENCE:
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    else:
+        # Each chunk gets a RandomState of its own, seeded from one seeded with seed.
+        seeds = np.random.RandomState(seed).randint(2**32, size=len(sizes)).tolist()
+
+    result = SimulationResult(plan.names)
+    if workers is None:
+        chunks = (_run_chunk(s, size, plan) for s, size in zip(seeds, sizes))
+        for finish, critical_counts in chunks:
+            result.add(finish, critical_counts)
+            if callback is not None:
+                callback(result)
+    else:
+        assert ProcessPoolExecutor is not None, 'Workers require concurrent.futures.'
+        # Chunks are large enough that sending the plan with each costs little.
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for finish, critical_counts in executor.map(_run_chunk, seeds, sizes, [plan] * len(sizes)):
+                result.add(finish, critical_counts)
+                if callback is not None:
+                    callback(result)
+    return result
@@ -0,0 +1,312 @@
+"""
+Compact binary snapshots of a scheduled network.
+
+A snapshot holds the names, links and calculated times of a parent node's
+child nodes in flat arrays. Loading one maps the file into memory and reads
+the arrays in place, so a process that only needs to look up a schedule
+can start without building or updating a Node for every task.
+
+The file starts with a fixed header, followed by these sections, each
+padded to a multiple of 8 bytes:
+
+    names          the name of each task: int64 values, or the end offset
+                   of each UTF-8 encoded name in the name data that follows
+    name data      the encoded names, if the names are strings
+    name order     task indexes sorted by name, for binary search
+    offsets        CSR offsets and targets of each task's successors
+    targets
+    in_offsets     CSR offsets and sources of each task's predecessors
+    sources
+    columns        one array per schedule column in COLUMNS
+    critical path  the indexes of the tasks on the critical path
+    project        the parent's duration, es, ef, ls and lf, which are NaN
+                   for a network with no tasks
+
+Arrays are int64 or float64 in the byte order of the machine that wrote
+them. Tasks keep the order of parent.nodes. Task names must be all integers
+or all strings.
+"""
+from __future__ import print_function
+
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from math import isnan
+
+from .compiled import integral
+
+MAGIC = b'CPSNAP01'
+
+# Magic, byte order, name kind ('i' or 's'), value typecode ('q' or 'd'),
+# then the number of tasks, links, critical tasks and bytes of name data.
+HEADER = struct.Struct('=8sccc5xqqqq')
+
+COLUMNS = ('duration', 'lag', 'es', 'ef', 'ls', 'lf', 'total_float', 'free_float')
+
+PROJECT = ('duration', 'es', 'ef', 'ls', 'lf')
+
+Task = namedtuple('Task', ('index', 'name') + COLUMNS)
+
+# Python 2 memoryviews cannot be cast, or even taken of an mmap, so there the
+# sections are copied out into arrays, which have no 'q' typecode either.
+_CAST = hasattr(memoryview, 'cast')
+_ARRAY_TYPECODES = {'q': 'l', 'd': 'd'}
+
+_TEXT = (str, type(u''))
+
+
+def _padding(size):
+    return -size % 8
+
+
+def _pack(typecode, values):
+    return struct.pack('=%i%s' % (len(values), typecode), *values)
+
+
+def _pack_integers(values):
+    """
+    Returns the values packed as int64 if they are all integers, or else None.
+    """
+    return _pack('q', values) if integral(values) else None
+
+
+def save_snapshot(parent, f):
+    """
+    Writes the parent's scheduled child nodes to a path or open binary file.
+    """
+    assert not parent._needs_update(), 'Network must be updated before saving a snapshot.'
+    if not hasattr(f, 'write'):
+        with open(f, 'wb') as fout:
+            return save_snapshot(parent, fout)
+
+    nodes = parent.nodes
+    position = dict((id(node), i) for i, node in enumerate(nodes))
+    offsets = [0]
+    targets = []
+    in_offsets = [0]
+    sources = []
+    for node in nodes:
+        targets.extend(sorted(_ for _ in (position.get(id(to_node)) for to_node in node.to_nodes) if _ is not None))
+        offsets.append(len(targets))
+        sources.extend(sorted(_ for _ in (position.get(id(from_node)) for from_node in node.incoming_nodes) if _ is not None))
+        in_offsets.append(len(sources))
+
+    columns = [[getattr(node, column) for node in nodes] for column in COLUMNS]
+    # A network with no tasks has no times of its own.
+    project = [getattr(parent, _) for _ in PROJECT]
+    columns.append([float('nan') if _ is None else _ for _ in project])
+    packed = [_pack_integers(_) for _ in columns]
+    if all(_ is not None for _ in packed):
+        typecode = b'q'
+    else:
+        typecode = b'd'
+        packed = [_pack('d', _) for _ in columns]
+    path = [position[id(_)] for _ in (parent.get_critical_path() or ())]
+
+    names = [node.name for node in nodes]
+    packed_names = _pack_integers(names)
+    if packed_names is not None:
+        kind = b'i'
+        name_order = sorted(range(len(names)), key=names.__getitem__)
+        name_sections = [packed_names]
+        data_size = 0
+    else:
+        kind = b's'
+        for name in names:
+            assert isinstance(name, _TEXT), 'Task names must be all integers or all strings, not %r.' % (name,)
+        encoded = [(_ if isinstance(_, bytes) else _.encode('utf-8')) for _ in names]
+        name_order = sorted(range(len(names)), key=encoded.__getitem__)
+        ends = []
+        size = 0
+        for name in encoded:
+            size += len(name)
+            ends.append(size)
+        data = b''.join(encoded)
+        name_sections = [_pack('q', ends), data + b'\0' * _padding(len(data))]
+        data_size = len(data)
+
+    byteorder = b'L' if sys.byteorder == 'little' else b'B'
+    f.write(HEADER.pack(MAGIC, byteorder, kind, typecode, len(nodes), len(targets), len(path), data_size))
+    for section in name_sections:
+        f.write(section)
+    f.write(_pack('q', name_order))
+    for section in (offsets, targets, in_offsets, sources):
+        f.write(_pack('q', section))
+    for column in packed[:-1]:
+        f.write(column)
+    f.write(_pack('q', path))
+    f.write(packed[-1])
+
+
+class Snapshot(object):
+    """
+    Read-only access to a schedule saved by save_snapshot(), by task index or name.
+
+    Each schedule column, and the offsets, targets, in_offsets and sources
+    of the links, is a memoryview onto the mapped file, so nothing is copied
+    until it is read. Python 2 copies them into arrays when loading instead.
+    The parent's own times are in the project dictionary.
+    """
+
+    def __init__(self, buf):
+        self._buf = buf
+        self._view = memoryview(buf) if _CAST else None
+        magic, byteorder, kind, typecode, n, m, k, data_size = HEADER.unpack_from(buf, 0)
+        assert magic == MAGIC, 'Not a snapshot file.'
+        assert byteorder == (b'L' if sys.byteorder == 'little' else b'B'), 'Snapshot was saved with another byte order.'
+        self._kind = kind
+        self.typecode = typecode = typecode.decode('ascii')
+        self._pos = HEADER.size
+
+        if kind == b'i':
+            self._names = self._section('q', n)
+        else:
+            self._name_ends = self._section('q', n)
+            self._name_data = self._section('B', data_size + _padding(data_size))
+        self._name_order = self._section('q', n)
+        self.offsets = self._section('q', n + 1)
+        self.targets = self._section('q', m)
+        self.in_offsets = self._section('q', n + 1)
+        self.sources = self._section('q', m)
+        for column in COLUMNS:
+            setattr(self, column, self._section(typecode, n))
+        self._critical_path = self._section('q', k)
+        project = self._section(typecode, len(PROJECT))
+        self.project = dict((key, None if isnan(value) else value) for key, value in zip(PROJECT, project.tolist()))
+
+    def _section(self, typecode, count):
+        size = struct.calcsize(typecode) * count
+        if self._view is not None:
+            section = self._view[self._pos:self._pos + size].cast(typecode)
+        elif typecode == 'B':
+            section = self._buf[self._pos:self._pos + size]
+        else:
+            section = array(_ARRAY_TYPECODES[typecode])
+            assert section.itemsize == struct.calcsize(typecode), \
+                'Snapshots cannot be loaded on this platform before Python 3.'
+            section.fromstring(self._buf[self._pos:self._pos + size])
+        self._pos += size
+        return section
+
+    def close(self):
+        """
+        Releases the mapped file. Views taken from the snapshot must not be used afterwards.
+        """
+        if self._view is not None:
+            for name in ('offsets', 'targets', 'in_offsets', 'sources', '_name_order', '_critical_path') + COLUMNS:
+                getattr(self, name).release()
+            for name in ('_names', '_name_ends', '_name_data'):
+                if hasattr(self, name):
+                    getattr(self, name).release()
+            self._view.release()
+        if isinstance(self._buf, mmap.mmap):
+            self._buf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self._name_order)
+
+    def name(self, i):
+        """
+        Returns the name of task i.
+        """
+        if self._kind == b'i':
+            return self._names[i]
+        start = self._name_ends[i - 1] if i else 0
+        return bytes(self._name_data[start:self._name_ends[i]]).decode('utf-8')
+
+    @property
+    def names(self):
+        return [self.name(i) for i in range(len(self))]
+
+    def _key(self, i):
+        if self._kind == b'i':
+            return self._names[i]
+        start = self._name_ends[i - 1] if i else 0
+        return bytes(self._name_data[start:self._name_ends[i]])
+
+    def index(self, name):
+        """
+        Returns the index of the task with the given name, found by binary
+        search, or raises KeyError.
+        """
+        if self._kind == b's' and not isinstance(name, bytes):
+            if not isinstance(name, _TEXT):
+                raise KeyError(name)
+            name = name.encode('utf-8')
+        order = self._name_order
+        keys = _Keys(self, order)
+        i = bisect_left(keys, name)
+        if i == len(order) or keys[i] != name:
+            raise KeyError(name)
+        return order[i]
+
+    def __contains__(self, name):
+        try:
+            self.index(name)
+        except (KeyError, TypeError):
+            return False
+        return True
+
+    def task(self, i):
+        """
+        Returns the name and times of task i.
+        """
+        return Task(i, self.name(i), *[getattr(self, _)[i] for _ in COLUMNS])
+
+    def __getitem__(self, name):
+        """
+        Returns the name and times of the task with the given name.
+        """
+        return self.task(self.index(name))
+
+    def successors(self, i):
+        return self.targets[self.offsets[i]:self.offsets[i + 1]].tolist()
+
+    def predecessors(self, i):
+        return self.sources[self.in_offsets[i]:self.in_offsets[i + 1]].tolist()
+
+    def get_critical_path(self):
+        """
+        Returns the names of the tasks on the critical path.
+        """
+        return [self.name(_) for _ in self._critical_path]
+
+
+class _Keys(object):
+    """
+    The snapshot's task names in sorted order, as a sequence for bisect.
+    """
+
+    def __init__(self, snapshot, order):
+        self.snapshot = snapshot
+        self.order = order
+
+    def __len__(self):
+        return len(self.order)
+
+    def __getitem__(self, i):
+        return self.snapshot._key(self.order[i])
+
+
+def load_snapshot(f):
+    """
+    Returns a Snapshot of a file saved by save_snapshot(), given its path or
+    an open binary file. The file is memory-mapped and read in place.
+
+    The mapping keeps its own handle on the file, so a file opened from a
+    path is closed again at once, and an open file given is left for the
+    caller to close. Either way, close() only releases the mapping.
+    """
+    if hasattr(f, 'fileno'):
+        return Snapshot(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    with open(f, 'rb') as fp:
+        return Snapshot(mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ))
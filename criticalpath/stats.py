@@ -0,0 +1,77 @@
+"""
+Counters and timings for profiling the scheduling passes.
+
+Pass a Stats object to Node.update_all() or Node.get_critical_path() to
+find out where the time goes. Without one, the passes only check once per
+phase whether to record anything, so there is next to no cost.
+"""
+from __future__ import print_function
+
+import time
+
+timer = getattr(time, 'perf_counter', time.time)
+
+
+class Stats(object):
+    """
+    Totals gathered over every update_all() and get_critical_path() call it was passed to.
+
+    phases maps each phase to the wall time in seconds spent on it:
+    'order' finds the order to visit nodes in, checking for cycles,
+    'forward' and 'backward' calculate the earliest and latest times,
+    'floats' corrects the floats of nodes an incremental update skipped,
+    and 'path' traces the critical path.
+
+    relaxations counts the links read while calculating times, and
+    expansions the nodes visited while searching for the critical path.
+    requeues maps each node's name to the number of times it was
+    recalculated, and peak_queue is the largest number of nodes that were
+    pending at the start of an update. If callback is given, it is called
+    with these stats at the end of each call.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.phases = {}
+        self.relaxations = 0
+        self.expansions = 0
+        self.requeues = {}
+        self.peak_queue = 0
+
+    def phase(self, name, start):
+        """
+        Adds the time since start to the named phase, and returns the current time.
+        """
+        now = timer()
+        self.phases[name] = self.phases.get(name, 0) + now - start
+        return now
+
+    def queued(self, pending):
+        """
+        Records the size of a pending queue about to be processed.
+        """
+        self.peak_queue = max(self.peak_queue, len(pending))
+
+    def relaxed(self, nodes, links):
+        """
+        Records that each of the given nodes was recalculated from the given number of links.
+        """
+        requeues = self.requeues
+        for node in nodes:
+            requeues[node.name] = requeues.get(node.name, 0) + 1
+        self.relaxations += links
+
+    def done(self):
+        self.calls += 1
+        if self.callback is not None:
+            self.callback(self)
+
+    def __repr__(self):
+        return '<Stats calls=%i %s relaxations=%i expansions=%i peak_queue=%i>' % (
+            self.calls,
+            ' '.join('%s=%.6fs' % (name, seconds) for name, seconds in sorted(self.phases.items())),
+            self.relaxations, self.expansions, self.peak_queue)
@@ -0,0 +1,214 @@
+"""
+Live rescheduling from a stream of progress events, with asyncio.
+
+Events report that a task started or finished at some time, or that its
+expected duration changed. Bursts of events are gathered into one
+incremental update_all(), timed so that each event is reflected in a
+published revision within the latency budget, and every subscriber gets
+each revision.
+
+Started tasks are pinned to their actual start, by setting their lag, and
+finished tasks to their actual finish, by setting their duration, so later
+revisions only move the work that is still to be done. The lags tasks had
+before they were pinned are kept, and restore() puts them back.
+
+Requires Python 3.5 or later, so it is not imported by the package itself:
+
+    from criticalpath.streaming import StreamingUpdater
+
+"""
+import asyncio
+import time
+from collections import namedtuple
+
+from .stats import Stats
+
+Event = namedtuple('Event', ('kind', 'name', 'value'))
+Event.__doc__ = """
+A progress report: kind is 'start' or 'finish' with value the time it
+happened, or 'duration' with value the new expected duration.
+"""
+
+Revision = namedtuple('Revision', ('version', 'finish', 'critical_path', 'times', 'events', 'latency'))
+Revision.__doc__ = """
+The schedule after a batch of events: the project's earliest finish, the
+names on the critical path, and a dictionary of (es, ef, ls, lf) for each
+task recalculated in this batch, or every task in the first revision.
+events is how many events the batch held, and latency how long in
+seconds the oldest of them waited to be published.
+"""
+
+
+class StreamingUpdater(object):
+    """
+    Keeps a parent node's schedule up to date from a stream of events.
+    """
+
+    def __init__(self, parent, latency=0.1):
+        self.parent = parent
+        self.latency = latency
+        self.version = 0
+        self.max_latency = 0
+        self.started = {}
+        self.finished = {}
+        self.original_lags = {}
+        self._subscribers = []
+        self._pending = []
+        self._first_arrival = None
+        self._arrived = None
+        # A running estimate of how long one batch takes to recalculate.
+        self._update_time = 0
+
+    def subscribe(self):
+        """
+        Returns a queue that receives every revision published from now on,
+        starting with the current schedule.
+        """
+        queue = asyncio.Queue()
+        self._subscribers.append(queue)
+        queue.put_nowait(self._revision(None, 0, 0))
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.remove(queue)
+
+    def submit(self, kind, name, value):
+        """
+        Queues an event, to be applied in the next batch.
+        """
+        assert kind in ('start', 'finish', 'duration'), 'Unknown event: %s' % (kind,)
+        if self._first_arrival is None:
+            self._first_arrival = time.monotonic()
+        self._pending.append(Event(kind, name, value))
+        if self._arrived is not None:
+            self._arrived.set()
+
+    async def run(self, events):
+        """
+        Reads events from an async iterable until it ends, publishing a
+        revision after each batch, and returns once the last is published.
+        """
+        self._arrived = asyncio.Event()
+        done = False
+
+        async def read():
+            async for event in events:
+                self.submit(*event)
+            self._arrived.set()
+
+        reader = asyncio.ensure_future(read())
+        try:
+            while not done:
+                await self._arrived.wait()
+                self._arrived.clear()
+                done = reader.done()
+                if not self._pending:
+                    continue
+                # Gather more events for as long as the budget allows,
+                # leaving time to recalculate before it runs out.
+                wait = self._first_arrival + self.latency - self._update_time - time.monotonic()
+                if wait > 0 and not done:
+                    try:
+                        await asyncio.wait_for(asyncio.shield(reader), wait)
+                    except asyncio.TimeoutError:
+                        pass
+                    done = reader.done()
+                self.flush()
+            reader.result()
+        finally:
+            reader.cancel()
+            self._arrived = None
+
+    def flush(self):
+        """
+        Applies the queued events and publishes a revision now.
+        """
+        if not self._pending:
+            return
+        events, self._pending = self._pending, []
+        first_arrival, self._first_arrival = self._first_arrival, None
+
+        t = time.monotonic()
+        stats = self._apply(events)
+        now = time.monotonic()
+        self._update_time = 0.8 * self._update_time + 0.2 * (now - t) if self.version else now - t
+
+        latency = now - first_arrival
+        self.max_latency = max(self.max_latency, latency)
+        self.version += 1
+        revision = self._revision(stats, len(events), latency)
+        for queue in self._subscribers:
+            queue.put_nowait(revision)
+
+    def restore(self):
+        """
+        Puts back the lags that started tasks had before they were pinned.
+        """
+        name_to_node = self.parent.name_to_node
+        for name, lag in self.original_lags.items():
+            name_to_node[name].lag = lag
+        self.original_lags.clear()
+
+    def _apply(self, events):
+        parent = self.parent
+        if parent._needs_update():
+            parent.update_all()
+        name_to_node = parent.name_to_node
+        started = self.started
+        touched = set()
+        for kind, name, value in events:
+            node = name_to_node[name]
+            if kind == 'start':
+                started[name] = value
+            elif kind == 'finish':
+                if name not in started:
+                    started[name] = min(node.es, value)
+                self.finished[name] = value
+                node.duration = value - started[name]
+            elif name not in self.finished:
+                node.duration = value
+            touched.add(node)
+
+        # Only tasks downstream of this batch's events can have a predecessor
+        # finishing at a new time, so only started tasks among them are pinned
+        # again. Their earliest times are worked out along the way, upstream
+        # tasks first, so one update_all() then leaves each started task
+        # starting when it did.
+        ef = {}
+        for node in parent._cone_order(touched):
+            base = None
+            for from_node in node.incoming_nodes:
+                if from_node.parent is not parent:
+                    continue
+                from_ef = ef.get(from_node, from_node.ef)
+                if base is None or from_ef > base:
+                    base = from_ef
+            base = parent.lag if base is None else base
+            if node.name in started:
+                es = started[node.name]
+                if es - base != node.lag:
+                    self.original_lags.setdefault(node.name, node.lag)
+                    node.lag = es - base
+            else:
+                es = base + node.lag
+            ef[node] = es + node.duration
+        stats = Stats()
+        parent.update_all(stats=stats)
+        return stats
+
+    def _revision(self, stats, events, latency):
+        parent = self.parent
+        if parent._needs_update():
+            parent.update_all()
+        if stats is None:
+            nodes = parent.nodes
+        else:
+            nodes = [parent.name_to_node[_] for _ in stats.requeues]
+        return Revision(
+            self.version,
+            parent.ef,
+            [_.name for _ in parent.get_critical_path()],
+            dict((node.name, (node.es, node.ef, node.ls, node.lf)) for node in nodes),
+            events,
+            latency,
+        )
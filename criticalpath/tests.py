@@ -5,19 +5,43 @@ To run a unittest:
     python criticalpath.py Test.test_model
 
 """
-from __future__ import print_function
+from __future__ import absolute_import, print_function
 
+import io
+import json
 import os
+import random
+import sys
+import tempfile
 import unittest
+from array import array
+from datetime import date, datetime
 from timeit import timeit
 
 import pandas as pd
 
-from criticalpath import Node
+try:
+    # Files of native strings, as opened by open(path, 'w') on Python 2.
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+from criticalpath import Node, CycleError, Snapshot, Stats, batch_update, load_snapshot
+from criticalpath import benchmarks
+from criticalpath import compiled
+from criticalpath import components
+from criticalpath import simulation
+from criticalpath.calendars import Calendar
+
+if sys.version_info >= (3, 6):
+    from criticalpath.tests_streaming import StreamingTests
+else:
+    class StreamingTests(object):
+        pass
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-class Test(unittest.TestCase):
+class Test(StreamingTests, unittest.TestCase):
 
     def test_nodes(self):
         # Confirm nodes work with set operations.
@@ -43,6 +67,51 @@ class Test(unittest.TestCase):
         self.assertTrue(n1 in parent.nodes)
         self.assertTrue(n2 in parent.nodes)
 
+    def test_node_memory(self):
+        p = Node('project')
+        a = p.add(Node('A', duration=3))
+        b = p.add(Node('B', duration=3))
+        p.link(a, b)
+        p.update_all()
+
+        # Leaf tasks never create the containers only a parent needs.
+        self.assertFalse(hasattr(a, '__dict__'))
+        self.assertIsNone(a._nodes)
+        self.assertIsNone(b._forward_pending)
+        self.assertEqual(len(p.nodes), 2)
+
+        if benchmarks.tracemalloc is not None:
+            slotted = benchmarks.measure_node_memory(Node, count=1000)
+            unslotted = benchmarks.measure_node_memory(benchmarks.UnslottedNode, count=1000)
+            print('bytes per leaf task: %.1f, was %.1f' % (slotted, unslotted))
+            self.assertLess(slotted, unslotted)
+
+    def test_benchmarks(self):
+        results = benchmarks.run(sizes=(30, 300))
+        steps = ['add/link', 'is_acyclic', 'update_all', 'get_critical_path']
+        for name in benchmarks.GENERATORS:
+            runs = [_ for _ in results if _['generator'] == name]
+            self.assertEqual([_['step'] for _ in runs], steps * (1 if name in benchmarks.FIXED_GENERATORS else 2))
+            for result in runs:
+                self.assertTrue(result['tasks'] > 0)
+                self.assertTrue(result['seconds'] >= 0)
+                if benchmarks.tracemalloc is not None:
+                    self.assertTrue(result['peak_bytes'] >= 0)
+
+        # Generated networks schedule like the same network built by hand.
+        p = benchmarks.build(benchmarks.ladder(30, random.Random(0)))
+        p.update_all()
+        self.assertEqual(p.duration, 3 * 10 + 1)
+        p = benchmarks.build(benchmarks.fan(5, random.Random(0)))
+        self.assertEqual(len(p.get_critical_path()), 3)
+
+        fp = StringIO()
+        benchmarks.save(results, fp)
+        fp.seek(0)
+        saved = json.load(fp)
+        self.assertEqual(saved['results'], results)
+        self.assertEqual(len(benchmarks.compare(saved, saved)), len(results))
+
     def test_cycles(self):
 
         p = Node('project')
@@ -80,6 +149,182 @@ class Test(unittest.TestCase):
 
         self.assertEqual(p.is_acyclic(), False)
 
+    def test_remove(self):
+        rng = random.Random(0)
+        for strict in (False, True):
+            p = Node('project', strict=strict)
+            for name in range(60):
+                p.add(Node(name, duration=rng.randint(0, 10)))
+            for _ in range(150):
+                p.link(*sorted(rng.sample(range(60), 2)))
+            p.update_all()
+            names = list(range(60, 260))
+            for _ in range(200):
+                action = rng.random()
+                children = [node.name for node in p.nodes]
+                if action < 0.3:
+                    a, b = sorted(rng.sample(children, 2))
+                    p.link(a, b)
+                elif action < 0.6:
+                    node = p.name_to_node[rng.choice(children)]
+                    if node.to_nodes:
+                        p.unlink(node, rng.choice(list(node.to_nodes)))
+                elif action < 0.8:
+                    removed = p.remove(rng.choice(children))
+                    self.assertIsNone(removed.parent)
+                    self.assertFalse(removed.to_nodes or removed.incoming_nodes)
+                    self.assertNotIn(removed.name, p.name_to_node)
+                else:
+                    p.add(Node(names.pop(0), duration=rng.randint(0, 10)))
+                self.assertEqual(p.first_nodes, set(_ for _ in p.nodes if not _.incoming_nodes))
+                self.assertEqual(p.last_nodes, [_ for _ in p.nodes if not _.to_nodes])
+                if strict:
+                    position = dict((node, i) for i, node in enumerate(p.topological_order()))
+                    self.assertEqual(sorted(position.values()), list(range(len(p.nodes))))
+                    for node in p.nodes:
+                        self.assertEqual(position[node], node._order_index)
+                        for to_node in node.to_nodes:
+                            self.assertLess(position[node], position[to_node])
+                if rng.random() < 0.3:
+                    p.update_all()
+
+                    # The same network built from scratch.
+                    expected = Node('project')
+                    for node in p.nodes:
+                        expected.add(Node(node.name, duration=node.duration))
+                    for node in p.nodes:
+                        for to_node in node.to_nodes:
+                            expected.link(node.name, to_node.name)
+                    expected.update_all()
+                    self.assertEqual(p.duration, expected.duration)
+                    for node in expected.nodes:
+                        other = p.name_to_node[node.name]
+                        self.assertEqual(
+                            (other.es, other.ef, other.ls, other.lf, other.total_float, other.free_float),
+                            (node.es, node.ef, node.ls, node.lf, node.total_float, node.free_float))
+
+        # Removing the last node unlinks it from its predecessor.
+        p = Node('project')
+        p.add(Node('A', duration=3))
+        p.add(Node('B', duration=4))
+        p.link('A', 'B')
+        p.update_all()
+        self.assertEqual(p.duration, 7)
+        p.remove('B')
+        self.assertEqual(p.last_nodes, [p.name_to_node['A']])
+        p.update_all()
+        self.assertEqual(p.duration, 3)
+        self.assertEqual(p.get_critical_path(), [p.name_to_node['A']])
+
+        # An unlinked node is still a last node in the order it was added,
+        # so the parent and its compiled network break ties the same way.
+        p = Node('project')
+        a, b, c = [p.add(Node(_, duration=2)) for _ in 'ABC']
+        p.link(a, b)
+        p.unlink(a, b)
+        self.assertEqual(p.last_nodes, [a, b, c])
+        p.update_all()
+        self.assertEqual(p.get_critical_path(), [a])
+        network = p.compile()
+        network.update()
+        self.assertEqual([network.nodes[_] for _ in network.critical_path], [a])
+
+    def test_strict(self):
+
+        p = Node('project', strict=True)
+        a = p.add(Node('A', duration=3))
+        b = p.add(Node('B', duration=3))
+        c = p.add(Node('C', duration=4))
+        d = p.add(Node('D', duration=6))
+        e = p.add(Node('E', duration=5))
+
+        # Links against the insertion order reorder the nodes between them.
+        p.link(e, a).link(d, e).link(b, d).link(c, b)
+        self.assertEqual(p.topological_order(), [c, b, d, e, a])
+        self.assertTrue(p.is_acyclic())
+
+        # A link closing a loop is rejected and reported, and not made.
+        with self.assertRaises(CycleError) as cm:
+            p.link(a, b)
+        self.assertEqual(cm.exception.cycle, [a, b, d, e, a])
+        self.assertTrue(b not in a.to_nodes)
+        self.assertRaises(CycleError, p.link, c, c)
+
+        p.update_all()
+        self.assertEqual(p.get_critical_path(), [c, b, d, e, a])
+        self.assertEqual(p.duration, 21)
+
+        # The maintained order always agrees with the links.
+        rng = random.Random(0)
+        p = Node('project', strict=True)
+        p.add_many(Node(i, duration=rng.randint(0, 10)) for i in range(200))
+        links = 0
+        for _ in range(1000):
+            from_id, to_id = rng.sample(range(200), 2)
+            try:
+                p.link(from_id, to_id)
+                links += 1
+            except CycleError as e:
+                self.assertEqual(e.cycle[:2], [p.nodes[from_id], p.nodes[to_id]])
+                self.assertEqual(e.cycle[-1], e.cycle[0])
+                for x, y in zip(e.cycle[1:], e.cycle[2:]):
+                    self.assertTrue(y in x.to_nodes)
+        self.assertTrue(links > 200)
+        order = p.topological_order()
+        position = dict((node, i) for i, node in enumerate(order))
+        self.assertEqual(len(order), 200)
+        for node in p.nodes:
+            for to_node in node.to_nodes:
+                self.assertLess(position[node], position[to_node])
+
+        expected = Node('project')
+        expected.add_many(Node(node.name, duration=node.duration) for node in p.nodes)
+        expected.link_many((node.name, to_node.name) for node in p.nodes for to_node in node.to_nodes)
+        p.update_all()
+        expected.update_all()
+        self.assertEqual([(_.es, _.lf) for _ in p.nodes], [(_.es, _.lf) for _ in expected.nodes])
+
+        # Switching on strict mode checks the existing links.
+        p = Node('project')
+        a = p.add(Node('A', duration=1))
+        b = p.add(Node('B', duration=1))
+        c = p.add(Node('C', duration=1))
+        p.link(a, b).link(b, c).link(c, b)
+        with self.assertRaises(CycleError) as cm:
+            p.strict = True
+        self.assertEqual(sorted(_.name for _ in cm.exception.cycle[1:]), ['B', 'C'])
+
+        # Links made to a node before it is added still order it.
+        p = Node('project', strict=True)
+        a = p.add(Node('A', duration=3))
+        x = Node('X', duration=5)
+        p.link(x, a)
+        p.add(x)
+        self.assertEqual(p.topological_order(), [x, a])
+        p.update_all()
+        self.assertEqual(p.duration, 8)
+        y = Node('Y', duration=1)
+        z = Node('Z', duration=1)
+        p.link(a, y).link(y, z)
+        p.add_many([z, y])
+        self.assertEqual(p.topological_order(), [x, a, y, z])
+
+        # And one closing a loop is rejected, leaving the node out.
+        p = Node('project', strict=True)
+        a = p.add(Node('A', duration=1))
+        b = p.add(Node('B', duration=1))
+        p.link(a, b)
+        y = Node('Y', duration=1)
+        p.link(b, y).link(y, a)
+        with self.assertRaises(CycleError) as cm:
+            p.add(y)
+        self.assertEqual(cm.exception.cycle, [y, a, b, y])
+        self.assertRaises(CycleError, p.add_many, [y])
+        self.assertEqual(p.nodes, [a, b])
+        self.assertEqual(p.topological_order(), [a, b])
+        self.assertIsNone(y.parent)
+        self.assertTrue(p.is_acyclic())
+
     def test_project(self):
 
         p = Node('project')
@@ -132,6 +377,967 @@ class Test(unittest.TestCase):
         self.assertEqual(p.ls, 0)
         self.assertEqual(p.lf, 14)
 
+    def test_project_lag(self):
+
+        p = Node('project')
+
+        a = p.add(Node('A', duration=3))
+        b = p.add(Node('B', duration=2, lag=4))
+        c = p.add(Node('C', duration=5))
+        d = p.add(Node('D', duration=1, lag=1))
+
+        p.link(a, b).link(a, c).link(b, d).link(c, d)
+
+        p.update_all()
+
+        self.assertEqual((a.es, a.ef, a.ls, a.lf), (0, 3, 0, 3))
+        self.assertEqual((b.es, b.ef, b.ls, b.lf), (7, 9, 7, 9))
+        self.assertEqual((c.es, c.ef, c.ls, c.lf), (3, 8, 4, 9))
+        self.assertEqual((d.es, d.ef, d.ls, d.lf), (10, 11, 10, 11))
+
+    def test_incremental(self):
+
+        def build(durations, lags, links):
+            p = Node('project')
+            for name, duration in enumerate(durations):
+                p.add(Node(name, duration=duration, lag=lags[name]))
+            for from_id, to_id in links:
+                p.link(from_id, to_id)
+            return p
+
+        def times(p):
+            return [(n.name, n.es, n.ef, n.ls, n.lf, n.total_float, n.free_float, n.drag) for n in p.nodes] \
+                + [(p.duration, p.get_critical_path())]
+
+        rng = random.Random(0)
+        n = 200
+        durations = [rng.randint(0, 10) for _ in range(n)]
+        lags = [0] * n
+        links = set()
+        for _ in range(3 * n):
+            from_id, to_id = sorted(rng.sample(range(n), 2))
+            links.add((from_id, to_id))
+        p = build(durations, lags, links)
+        p.update_all()
+
+        for _ in range(60):
+            i = rng.randrange(n)
+            change = rng.random()
+            if change < 0.4:
+                durations[i] = rng.randint(0, 10)
+                p.nodes[i].duration = durations[i]
+            elif change < 0.6:
+                lags[i] = rng.randint(0, 3)
+                p.nodes[i].lag = lags[i]
+            else:
+                from_id, to_id = sorted(rng.sample(range(n), 2))
+                links.add((from_id, to_id))
+                p.link(from_id, to_id)
+            p.update_all()
+            expected = build(durations, lags, links)
+            expected.update_all()
+            self.assertEqual(times(p), times(expected))
+
+        # A new link that closes a loop is still caught.
+        p.link(n - 1, 0)
+        self.assertRaises(AssertionError, p.update_all)
+
+    def test_memo(self):
+        p = Node('project')
+        a = p.add(Node('A', duration=3))
+        b = p.add(Node('B', duration=3))
+        c = p.add(Node('C', duration=4))
+        d = p.add(Node('D', duration=1))
+        p.link(a, b).link(a, c).link(b, d).link(c, d)
+
+        # Every change moves the generation on.
+        generations = [p.generation]
+        for change in (
+                lambda: p.link(b, c),
+                lambda: p.unlink(b, c),
+                lambda: setattr(b, 'duration', 5),
+                lambda: setattr(c, 'lag', 1),
+                lambda: p.add(Node('E', duration=1)),
+                lambda: p.remove('E'),
+                lambda: p.update_all()):
+            change()
+            self.assertNotEqual(p.generation, generations[-1])
+            generations.append(p.generation)
+
+        # Repeated queries are answered from the memo until the next change.
+        order = p.topological_order()
+        self.assertEqual(order[0], a)
+        memo = p._structure_memo
+        self.assertEqual(p.topological_order(), order)
+        self.assertTrue(p.is_acyclic())
+        self.assertIs(p._structure_memo, memo)
+        index = p.schedule_index
+        table = p.float_table()
+        self.assertEqual(table, {'A': (0, 0), 'B': (0, 0), 'C': (0, 0), 'D': (0, 0)})
+        self.assertIs(p.schedule_index, index)
+        self.assertIs(p.float_table(), table)
+
+        # And are never stale.
+        c.duration = 1
+        self.assertIsNot(p.schedule_index, index)
+        self.assertEqual(p.float_table(), {'A': (0, 0), 'B': (0, 0), 'C': (3, 3), 'D': (0, 0)})
+        self.assertEqual(p.get_critical_path(), [a, b, d])
+        p.link(c, a)
+        self.assertFalse(p.is_acyclic())
+        self.assertEqual(p.topological_order(), [])
+        p.unlink(c, a)
+        self.assertTrue(p.is_acyclic())
+
+        # Changing times keeps what only depends on the links.
+        p.topological_order()
+        order = p._structure_memo[1]['topological_order']
+        b.duration = 7
+        p.update_all()
+        self.assertIs(p._structure_memo[1]['topological_order'], order)
+        self.assertEqual(p.float_table()['C'], (5, 5))
+
+        # A batch of links that fails partway still drops the memos, as the
+        # links before the failure were made.
+        q = Node('q')
+        x, y, z = q.add(Node('X', duration=1)), q.add(Node('Y', duration=1)), q.add(Node('Z', duration=1))
+        self.assertEqual(q.topological_order(), [x, y, z])
+        with self.assertRaises(KeyError):
+            q.link_many([('Z', 'X'), ('missing', 'Y')])
+        order = q.topological_order()
+        self.assertLess(order.index(z), order.index(x))
+        with self.assertRaises(AssertionError):
+            q.add_many([Node('W', duration=1), Node('V')])
+        self.assertEqual(len(q.topological_order()), 4)
+
+    def test_stats(self):
+
+        p = Node('project')
+        a = p.add(Node('A', duration=3))
+        b = p.add(Node('B', duration=3))
+        c = p.add(Node('C', duration=4))
+        d = p.add(Node('D', duration=6))
+        e = p.add(Node('E', duration=5))
+        p.link(a, b).link(a, c).link(a, d).link(b, e).link(c, e).link(d, e)
+
+        seen = []
+        stats = Stats(callback=lambda s: seen.append(s.calls))
+        p.update_all(stats=stats)
+        self.assertEqual(seen, [1])
+        self.assertEqual(sorted(stats.phases), ['backward', 'forward', 'order', 'path'])
+        self.assertEqual(stats.relaxations, 12)
+        self.assertEqual(stats.requeues, {'A': 2, 'B': 2, 'C': 2, 'D': 2, 'E': 2})
+        self.assertEqual(stats.peak_queue, 5)
+        self.assertEqual(stats.expansions, 1 + 3)
+
+        # An incremental update only recalculates the nodes affected. The
+        # project still finishes at 14, so E's latest times are unchanged.
+        stats.reset()
+        c.duration = 5
+        p.update_all(stats=stats)
+        self.assertEqual(stats.requeues, {'A': 1, 'C': 2, 'E': 1})
+        self.assertEqual(stats.peak_queue, 1)
+        self.assertTrue('floats' in stats.phases)
+
+        # A change that its float absorbs stops at the first node it leaves
+        # unchanged, instead of sweeping everything after it.
+        q = Node('chain')
+        x = q.add(Node('X', duration=10))
+        y = q.add(Node('Y', duration=1))
+        chain = [q.add(Node(i, duration=1)) for i in range(50)]
+        q.link(x, chain[0]).link(y, chain[0])
+        for i in range(49):
+            q.link(chain[i], chain[i + 1])
+        q.update_all()
+        stats.reset()
+        y.duration = 5
+        q.update_all(stats=stats)
+        self.assertEqual(stats.requeues, {'Y': 2, 0: 1})
+        self.assertEqual((y.total_float, y.free_float), (5, 5))
+        self.assertEqual(q.duration, 10 + 50)
+
+        stats.reset()
+        p._critical_path = None
+        self.assertEqual(p.get_critical_path(stats=stats), [a, d, e])
+        self.assertEqual(sorted(stats.phases), ['order', 'path'])
+        self.assertEqual(stats.expansions, 5 + 1 + 3)
+        self.assertEqual(stats.calls, 1)
+
+    def test_compiled(self):
+
+        def build(seed):
+            rng = random.Random(seed)
+            p = Node('project')
+            for name in range(300):
+                p.add(Node(name, duration=rng.randint(0, 10), lag=rng.choice([0, 0, 1, 2])))
+            for _ in range(900):
+                from_id, to_id = sorted(rng.sample(range(300), 2))
+                p.link(from_id, to_id)
+            return p
+
+        def times(p):
+            return [(n.name, n.es, n.ef, n.ls, n.lf, n.total_float, n.free_float, n.drag) for n in p.nodes] \
+                + [(p.duration, p.get_critical_path())]
+
+        expected = build(0)
+        expected.update_all()
+
+        p = build(0)
+        network = p.compile()
+        self.assertEqual(len(network), 300)
+        network.write_back()
+        self.assertEqual(times(p), times(expected))
+
+        # Without NumPy the same arrays are scheduled with plain loops.
+        numpy = compiled.np
+        compiled.np = None
+        try:
+            p = build(0)
+            network = p.compile()
+            self.assertTrue(isinstance(network.durations, array))
+            network.write_back()
+            self.assertEqual(times(p), times(expected))
+        finally:
+            compiled.np = numpy
+
+        # The written back schedule can be updated incrementally.
+        p.nodes[0].duration += 5
+        expected.nodes[0].duration += 5
+        p.update_all()
+        expected.update_all(incremental=False)
+        self.assertEqual(times(p), times(expected))
+
+        # A network with no tasks has nothing to schedule.
+        p = Node('project')
+        p.compile().write_back()
+        p.compile(reduce=True).write_back()
+        p.update_all()
+        self.assertFalse(p._needs_update())
+        self.assertIsNone(p.get_critical_path())
+
+    def test_reduction(self):
+
+        def schedule(p):
+            return dict(
+                (_.name, (_.es, _.ef, _.ls, _.lf, _.total_float, _.free_float, _.drag, _._path_length, _._path_tail))
+                for _ in p.nodes)
+
+        for seed in range(100):
+
+            def build():
+                rng = random.Random(seed)
+                p = Node('project', lag=rng.choice([0, 2]))
+                fractional = rng.random() < 0.2
+                for name in range(rng.randint(1, 40)):
+                    p.add(Node(name, duration=rng.randint(0, 6) + (0.5 if fractional else 0),
+                               lag=rng.choice([0, 0, 0, 1, -1])))
+                for _ in range(rng.randint(0, 3 * len(p.nodes))):
+                    if len(p.nodes) > 1:
+                        p.link(*sorted(rng.sample(range(len(p.nodes)), 2)))
+                return p
+
+            expected = build()
+            expected.update_all()
+            p = build()
+            p.compile(reduce=True).write_back()
+            self.assertEqual(p.duration, expected.duration)
+            self.assertEqual(p.get_critical_path(), expected.get_critical_path())
+            self.assertEqual(schedule(p), schedule(expected))
+
+        # Redundant links are dropped and serial chains merged, leaving the links alone.
+        p = Node('project')
+        for name, duration in (('A', 1), ('B', 2), ('C', 3), ('D', 4), ('E', 4)):
+            p.add(Node(name, duration=duration))
+        p.link('A', 'B').link('B', 'C').link('C', 'D').link('A', 'C').link('A', 'E').link('E', 'D')
+        reduced = p.compile(reduce=True)
+        self.assertEqual(len(reduced), 4)
+        self.assertEqual(reduced.removed_links, 1)
+        self.assertEqual(sorted(list(_) for _ in reduced.chains.values()), [[0], [1, 2], [3], [4]])
+        self.assertTrue(p.name_to_node['C'] in p.name_to_node['A'].to_nodes)
+        reduced.write_back()
+        self.assertEqual([_.name for _ in p.get_critical_path()], ['A', 'B', 'C', 'D'])
+        self.assertEqual(p.duration, 10)
+
+        # The exported fixture shrinks by more than half.
+        p = Node.from_dsv(
+            os.path.join(BASE_DIR, 'fixtures/timings.dsv'), os.path.join(BASE_DIR, 'fixtures/deps_big.dsv'),
+            missing='create_zero', from_column='PARENT_ID', to_column='UPROC_ID')
+        reduced = p.compile(reduce=True)
+        self.assertLess(len(reduced) * 2, len(p.nodes))
+        p.update_all()
+        expected = schedule(p)
+        p.compile(reduce=True).write_back()
+        self.assertEqual(schedule(p), expected)
+
+    def test_floats(self):
+
+        p = Node('project')
+
+        a = p.add(Node('A', duration=3))
+        b = p.add(Node('B', duration=3, lag=0))
+        c = p.add(Node('C', duration=4, lag=0))
+        d = p.add(Node('D', duration=6, lag=0))
+        e = p.add(Node('E', duration=5, lag=0))
+
+        self.assertEqual(Node('F', duration=1).drag, None)
+
+        # Reading drag updates the network first if it has changed.
+        p.link(a, b).link(a, c).link(a, d).link(b, e).link(c, e).link(d, e)
+        self.assertEqual([_.drag for _ in (a, b, c, d, e)], [3, 0, 0, 2, 5])
+        self.assertEqual([_.total_float for _ in (a, b, c, d, e)], [0, 3, 2, 0, 0])
+        self.assertEqual([_.free_float for _ in (a, b, c, d, e)], [0, 3, 2, 0, 0])
+        d.duration = 3
+        self.assertEqual([_.drag for _ in (a, b, c, d, e)], [3, 0, 1, 0, 5])
+        d.duration = 6
+
+        # The drag of a task is how much the project shortens when the task takes no time.
+        rng = random.Random(0)
+        p = Node('project')
+        for name in range(100):
+            p.add(Node(name, duration=rng.randint(0, 10)))
+        for _ in range(200):
+            from_id, to_id = sorted(rng.sample(range(100), 2))
+            p.link(from_id, to_id)
+        p.update_all()
+        for node in p.get_critical_path():
+            duration = node.duration
+            node.duration = 0
+            expected = p.get_critical_path(as_item=True)[0]
+            node.duration = duration
+            p.get_critical_path()
+            self.assertEqual(node.drag, p.duration - expected)
+
+        # A negative lag takes the task's path back towards the start, but
+        # taking the task's duration away still shortens that path by all of it.
+        p = Node('project')
+        a = p.add(Node('A', duration=5, lag=-1))
+        b = p.add(Node('B', duration=3))
+        p.link(a, b)
+        self.assertEqual([_.drag for _ in (a, b)], [5, 3])
+        self.assertEqual(p.duration, 7)
+        for seed in range(50):
+            rng = random.Random(seed)
+            p = Node('project')
+            for name in range(rng.randint(1, 20)):
+                p.add(Node(name, duration=rng.randint(0, 8), lag=rng.choice([0, 0, 2, -3, -10])))
+            for _ in range(rng.randint(0, 2 * len(p.nodes))):
+                if len(p.nodes) > 1:
+                    p.link(*sorted(rng.sample(range(len(p.nodes)), 2)))
+            p.update_all()
+            length = p.duration
+            for node in p.nodes:
+                drag = node.drag
+                duration = node.duration
+                node.duration = 0
+                p.update_all()
+                self.assertEqual(drag, length - p.duration, (seed, node))
+                node.duration = duration
+                p.update_all()
+
+        # A short branch with a last node of its own can finish as late as the project.
+        p = Node('project')
+        a = p.add(Node('A', duration=3))
+        b = p.add(Node('B', duration=4))
+        c = p.add(Node('C', duration=1))
+        d = p.add(Node('D', duration=2))
+        p.link(a, b).link(c, d)
+        p.update_all()
+        self.assertEqual([_.lf for _ in (a, b, c, d)], [3, 7, 5, 7])
+        self.assertEqual([_.total_float for _ in (a, b, c, d)], [0, 0, 4, 4])
+        self.assertEqual([_.free_float for _ in (a, b, c, d)], [0, 0, 0, 4])
+        self.assertEqual(p.schedule_index.float_below(1), [a, b])
+
+        # Lags count towards the length of a path, and so towards drag.
+        p = Node('project')
+        a = p.add(Node('A', duration=2))
+        b = p.add(Node('B', duration=3, lag=5))
+        c = p.add(Node('C', duration=4))
+        p.link(a, b)
+        p.update_all()
+        self.assertEqual(p.duration, 10)
+        self.assertEqual(p.get_critical_path(), [a, b])
+        self.assertEqual([_.total_float for _ in (a, b, c)], [0, 0, 6])
+        self.assertEqual([_.drag for _ in (a, b, c)], [2, 3, 0])
+
+        # Delaying a task by its total float never delays the project, but
+        # any more does, and taking away its duration saves its drag.
+        for seed in range(20):
+            rng = random.Random(seed)
+            p = Node('project', lag=rng.choice([0, 2]))
+            for name in range(30):
+                p.add(Node(name, duration=rng.randint(0, 10), lag=rng.choice([0, 0, 1, 5])))
+            for _ in range(45):
+                p.link(*sorted(rng.sample(range(30), 2)))
+            p.update_all()
+            finish = p.ef
+            self.assertEqual(finish, p.lag + p.duration)
+            self.assertEqual(finish, max(_.ef for _ in p.nodes))
+            for node in p.nodes:
+                total_float, drag = node.total_float, node.drag
+                node.lag += total_float
+                p.update_all()
+                self.assertEqual(p.ef, finish)
+                node.lag += 1
+                p.update_all()
+                self.assertEqual(p.ef, finish + 1)
+                node.lag -= total_float + 1
+                duration = node.duration
+                node.duration = 0
+                p.update_all()
+                self.assertEqual(p.ef, finish - drag)
+                node.duration = duration
+                p.update_all()
+
+    def test_scenarios(self):
+
+        def build(seed):
+            rng = random.Random(seed)
+            p = Node('project')
+            for name in range(100):
+                p.add(Node(name, duration=rng.randint(0, 10), lag=rng.choice([0, 0, 1])))
+            for _ in range(300):
+                p.link(*sorted(rng.sample(range(100), 2)))
+            return p
+
+        frozen = build(0).freeze()
+        rng = random.Random(1)
+        scenarios = [{}]
+        for _ in range(20):
+            scenario = {}
+            for i in rng.sample(range(100), 3):
+                scenario[i] = rng.choice([rng.randint(0, 20), (None, rng.randint(0, 3)), (rng.randint(0, 20), 1), 2.5])
+            scenarios.append(scenario)
+
+        results = frozen.evaluate_many(scenarios)
+        self.assertEqual(results[0], (frozen.duration, frozen.critical_path, False, {}))
+        for scenario, result in zip(scenarios, results):
+            expected = build(0)
+            expected.update_all()
+            floats = dict((_.name, (_.total_float, _.free_float)) for _ in expected.nodes)
+            path = [_.name for _ in expected.get_critical_path()]
+            for name, value in scenario.items():
+                duration, lag = value if isinstance(value, tuple) else (value, None)
+                if duration is not None:
+                    expected.name_to_node[name].duration = duration
+                if lag is not None:
+                    expected.name_to_node[name].lag = lag
+            expected.update_all(incremental=False)
+            self.assertEqual(result.duration, expected.duration)
+            self.assertEqual(result.critical_path, [_.name for _ in expected.get_critical_path()])
+            self.assertEqual(result.critical_path_changed, result.critical_path != path)
+            self.assertEqual(result.floats, dict(
+                (_.name, (_.total_float, _.free_float)) for _ in expected.nodes
+                if (_.total_float, _.free_float) != floats[_.name]))
+
+        # Thread and process pools share the frozen network.
+        self.assertEqual(frozen.evaluate_many(scenarios, workers=2), results)
+        self.assertEqual(frozen.evaluate_many(scenarios, workers=2, processes=True, chunksize=4), results)
+
+        # A lag alone can move the critical path, and counts towards the duration.
+        p = Node('project')
+        a = p.add(Node('A', duration=2))
+        b = p.add(Node('B', duration=3))
+        c = p.add(Node('C', duration=4))
+        d = p.add(Node('D', duration=2))
+        p.link(a, b).link(c, d)
+        frozen = p.freeze()
+        self.assertEqual((frozen.duration, frozen.critical_path), (6, ['C', 'D']))
+        result = frozen.evaluate({'B': (None, 2)})
+        self.assertEqual(result.duration, 2 + 2 + 3)
+        self.assertEqual(result.critical_path, ['A', 'B'])
+        self.assertTrue(result.critical_path_changed)
+        self.assertEqual(result.floats['C'], (1, 0))
+        self.assertEqual(result.floats['A'], (0, 0))
+
+        # A network with no tasks has no duration or critical path.
+        frozen = Node('project').freeze()
+        self.assertEqual((frozen.duration, frozen.critical_path), (None, []))
+        self.assertEqual(frozen.evaluate({}), (None, [], False, {}))
+
+    def test_resources(self):
+
+        p = Node('project')
+        p.capacities = {'crew': 2}
+        a = p.add(Node('A', duration=3))
+        b = p.add(Node('B', duration=2))
+        c = p.add(Node('C', duration=4))
+        d = p.add(Node('D', duration=1))
+        for node in (a, b, c):
+            node.demands = {'crew': 1}
+        d.demands = {'crew': 2}
+        p.link(a, d)
+        p.update_all()
+        # B can finish as late as the project does, so it has the most float and goes last.
+        self.assertEqual([_.total_float for _ in (a, b, c, d)], [0, 2, 0, 0])
+        schedule = p.schedule_resources(scheme='serial')
+        self.assertEqual([schedule.starts[_] for _ in (a, b, c, d)], [0, 5, 0, 4])
+        self.assertEqual(schedule.finish, 7)
+        self.assertEqual(schedule.delay(d), 1)
+        self.assertEqual(schedule.profile('crew'), [(0, 2), (3, 1), (4, 2), (5, 1), (7, 0)])
+        # The parallel scheme starts B as soon as there is crew for it, rather than leave it idle.
+        schedule = p.schedule_resources(scheme='parallel')
+        self.assertEqual([schedule.starts[_] for _ in (a, b, c, d)], [0, 3, 0, 5])
+        self.assertEqual(schedule.finish, 6)
+        self.assertEqual(schedule.delay(d), 2)
+        self.assertEqual(schedule.profile('crew'), [(0, 2), (4, 1), (5, 2), (6, 0)])
+
+        # A different rule changes which task waits.
+        schedule = p.schedule_resources(rule=lambda node: -node.duration)
+        self.assertEqual([schedule.starts[_] for _ in (a, b, c, d)], [0, 3, 0, 5])
+        self.assertRaises(ValueError, p.schedule_resources, rule='shortest')
+
+        # A task taking no time needs nothing free, so it is not held up while the crew is busy.
+        e = p.add(Node('E', duration=0))
+        e.demands = {'crew': 2}
+        p.link(a, e)
+        for scheme in ('serial', 'parallel'):
+            schedule = p.schedule_resources(scheme=scheme)
+            self.assertEqual(schedule.starts[e], 3)
+
+        rng = random.Random(0)
+        p = Node('project', lag=2)
+        p.capacities = {'crew': 5, 'rig': [(0, 1), (20, 2), (40, 0), (60, 3)]}
+        for i in range(300):
+            node = p.add(Node(i, duration=rng.randint(0, 8), lag=rng.choice([0, 0, 1])))
+            node.demands = {'crew': rng.randint(0, 3)}
+            if rng.random() < 0.3:
+                node.demands['rig'] = 1
+        for _ in range(600):
+            p.link(*sorted(rng.sample(range(300), 2)))
+        p.update_all()
+        for rule in ('total_float', 'latest_finish', 'latest_start', 'earliest_start'):
+            for scheme in ('serial', 'parallel'):
+                schedule = p.schedule_resources(rule=rule, scheme=scheme)
+                for node in p.nodes:
+                    self.assertTrue(schedule.starts[node] >= node.es)
+                    self.assertEqual(schedule.finishes[node], schedule.starts[node] + node.duration)
+                    for to_node in node.to_nodes:
+                        self.assertTrue(schedule.starts[to_node] >= schedule.finishes[node] + to_node.lag)
+                for time, used in schedule.profile('crew'):
+                    self.assertTrue(used <= 5)
+                for time, used in schedule.profile('rig'):
+                    capacity = [amount for start, amount in p.capacities['rig'] if start <= time][-1]
+                    self.assertTrue(used <= capacity, (time, used))
+
+        # With enough of every resource, tasks start at their earliest start.
+        p.capacities = {'crew': 10**6, 'rig': 10**6}
+        schedule = p.schedule_resources()
+        self.assertEqual([schedule.starts[_] for _ in p.nodes], [_.es for _ in p.nodes])
+
+    def test_calendars(self):
+
+        # Monday 1 January 2024, 9 to 5 on weekdays, with the Wednesday off.
+        calendar = Calendar.weekly(date(2024, 1, 1), date(2025, 1, 1), holidays=[date(2024, 1, 3)])
+        self.assertEqual(calendar.moment(0), datetime(2024, 1, 1, 9))
+        self.assertEqual(calendar.moment(8), datetime(2024, 1, 2, 9))
+        self.assertEqual(calendar.moment(8, finish=True), datetime(2024, 1, 1, 17))
+        self.assertEqual(calendar.moment(20), datetime(2024, 1, 4, 13))
+        self.assertEqual(calendar.offset(datetime(2024, 1, 3, 12)), 16)
+        self.assertEqual(calendar.offset(datetime(2024, 1, 6)), 32)
+        self.assertEqual(calendar.add(datetime(2024, 1, 5, 15), 4), datetime(2024, 1, 8, 11))
+        self.assertEqual(calendar.subtract(datetime(2024, 1, 8, 11), 4), datetime(2024, 1, 5, 15))
+        self.assertEqual(calendar.between(datetime(2024, 1, 1), datetime(2024, 1, 8)), 32)
+        self.assertEqual(calendar.moment(0.25), datetime(2024, 1, 1, 9, 15))
+        self.assertRaises(ValueError, calendar.moment, calendar.work + 1)
+        self.assertEqual(
+            calendar.moments([0, 8, 8, 0.25], [False, False, True, False]),
+            [calendar.moment(0), calendar.moment(8), calendar.moment(8, finish=True), calendar.moment(0.25)])
+
+        p = Node('project')
+        p.calendar = calendar
+        for name, duration in (('A', 4), ('B', 6), ('C', 12), ('D', 0)):
+            p.add(Node(name, duration=duration))
+        p.link('A', 'B').link('A', 'C').link('B', 'D').link('C', 'D')
+        p.name_to_node['B'].lag = 2
+        dates = p.schedule_dates()
+        self.assertEqual(dates[p.name_to_node['A']], (
+            datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 13), datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 13)))
+        self.assertEqual(dates[p.name_to_node['B']], (
+            datetime(2024, 1, 1, 15), datetime(2024, 1, 2, 13), datetime(2024, 1, 2, 11), datetime(2024, 1, 2, 17)))
+        self.assertEqual(dates[p.name_to_node['C']].ef, datetime(2024, 1, 2, 17))
+        self.assertEqual(dates[p.name_to_node['D']].es, datetime(2024, 1, 4, 9))
+        self.assertEqual(dates.finish, datetime(2024, 1, 4, 9))
+
+        # Tasks on their own copies of the calendar are scheduled in dates, with the same result.
+        rng = random.Random(0)
+        p = Node('project', lag=3)
+        p.calendar = calendar
+        for name in range(30):
+            p.add(Node(name, duration=rng.randint(0, 20), lag=rng.choice([0, 0, 2])))
+        for _ in range(60):
+            p.link(*sorted(rng.sample(range(30), 2)))
+        expected = p.schedule_dates()
+        for node in p.nodes:
+            node.calendar = Calendar.weekly(date(2024, 1, 1), date(2025, 1, 1), holidays=[date(2024, 1, 3)])
+        dates = p.schedule_dates()
+        for node in p.nodes:
+            self.assertEqual(dates[node], expected[node])
+
+        # A crew that works Saturdays too finishes sooner.
+        p = Node('project')
+        p.calendar = Calendar.weekly(date(2024, 1, 1), date(2025, 1, 1))
+        a = p.add(Node('A', duration=48))
+        b = p.add(Node('B', duration=8))
+        p.link(a, b)
+        self.assertEqual(p.schedule_dates()[b].ef, datetime(2024, 1, 9, 17))
+        a.calendar = Calendar.weekly(date(2024, 1, 1), date(2025, 1, 1), weekdays=range(6))
+        dates = p.schedule_dates()
+        self.assertEqual(dates[a].ef, datetime(2024, 1, 6, 17))
+        self.assertEqual(dates[b], (
+            datetime(2024, 1, 8, 9), datetime(2024, 1, 8, 17), datetime(2024, 1, 8, 9), datetime(2024, 1, 8, 17)))
+        self.assertEqual(dates[a].lf, datetime(2024, 1, 6, 17))
+        self.assertEqual(dates[a].ls, datetime(2024, 1, 1, 9))
+
+    def test_schedule_index(self):
+        rng = random.Random(0)
+        p = Node('project')
+        for name in range(300):
+            p.add(Node(name, duration=rng.randint(0, 10), lag=rng.choice([0, 0, 1])))
+        for _ in range(600):
+            p.link(*sorted(rng.sample(range(300), 2)))
+
+        index = p.schedule_index
+        self.assertTrue(p.schedule_index is index)
+        names = lambda nodes: sorted(_.name for _ in nodes)
+        for time in range(-1, int(p.ef) + 2):
+            self.assertEqual(names(index.running_at(time)), names(_ for _ in p.nodes if _.es <= time < _.ef))
+            self.assertEqual(names(index.possibly_running_at(time)), names(_ for _ in p.nodes if _.es <= time < _.lf))
+            self.assertEqual(names(index.starting_between(time, time + 5)), names(_ for _ in p.nodes if time <= _.es <= time + 5))
+            self.assertEqual(names(index.starting_between(time, time + 5, late=True)), names(_ for _ in p.nodes if time <= _.ls <= time + 5))
+            self.assertEqual(names(index.finishing_between(time, time)), names(_ for _ in p.nodes if _.ef == time))
+        for threshold in range(0, 20, 3):
+            self.assertEqual(names(index.float_below(threshold)), names(_ for _ in p.nodes if _.total_float < threshold))
+            self.assertEqual(names(index.float_below(threshold, free=True)), names(_ for _ in p.nodes if _.free_float < threshold))
+            self.assertEqual(names(index.float_between(threshold, threshold + 2)), names(_ for _ in p.nodes if threshold <= _.total_float <= threshold + 2))
+        self.assertEqual([_.total_float for _ in index.float_below(1)], [0] * len(index.float_below(1)))
+
+        # The index is rebuilt once the schedule changes.
+        p.nodes[0].duration += 50
+        index = p.schedule_index
+        self.assertTrue(p.nodes[0] in index.running_at(p.nodes[0].es + 40))
+
+    def test_export(self):
+        p = Node('project')
+        for name, duration in (('E', 5), ('A', 3), ('B', 3), ('C', 4), ('D', 6.5)):
+            p.add(Node(name, duration=duration))
+        p.link('A', 'B').link('A', 'C').link('A', 'D').link('B', 'E').link('C', 'E').link('D', 'E')
+
+        rows = list(p.iter_schedule())
+        self.assertEqual([_[0] for _ in rows], ['E', 'A', 'B', 'C', 'D'])
+        self.assertEqual(rows[1], ('A', 3, 0, 3, 0, 3, 0, 0, True))
+        self.assertEqual(rows[2], ('B', 3, 3, 6, 6.5, 9.5, 3.5, 3.5, False))
+        topological = [_[0] for _ in p.iter_schedule(topological=True)]
+        self.assertEqual((topological[0], topological[-1]), ('A', 'E'))
+
+        fp = StringIO()
+        self.assertEqual(p.to_csv(fp, topological=True, chunksize=2), 5)
+        lines = fp.getvalue().splitlines()
+        self.assertEqual(lines[0], 'name,duration,es,ef,ls,lf,total_float,free_float,critical')
+        self.assertEqual(lines[1], 'A,3,0,3,0.0,3.0,0.0,0,1')
+        self.assertEqual(len(lines), 6)
+
+        path = os.path.join(tempfile.mkdtemp(), 'schedule.jsonl')
+        self.assertEqual(p.to_jsonl(path, chunksize=2), 5)
+        with open(path) as fin:
+            objects = [json.loads(_) for _ in fin]
+        self.assertEqual([_['name'] for _ in objects], ['E', 'A', 'B', 'C', 'D'])
+        self.assertEqual(objects[4], dict(
+            name='D', duration=6.5, es=3, ef=9.5, ls=3, lf=9.5, total_float=0, free_float=0, critical=True))
+
+        # Paths are written as UTF-8, with the writer's own line endings on every platform.
+        if sys.version_info[0] >= 3:
+            p.add(Node('\xc9tape', duration=1))
+        path = os.path.join(tempfile.mkdtemp(), 'schedule.csv')
+        p.to_csv(path)
+        with open(path, 'rb') as fin:
+            data = fin.read()
+        self.assertNotIn(b'\r', data)
+        self.assertEqual(data.count(b'\n'), len(p.nodes) + 1)
+        if sys.version_info[0] >= 3:
+            self.assertIn('\xc9tape,1,'.encode('utf-8'), data)
+
+    def test_snapshot(self):
+        p = Node.from_dsv(
+            os.path.join(BASE_DIR, 'fixtures/timings.dsv'), os.path.join(BASE_DIR, 'fixtures/deps_small.dsv'),
+            missing='create_zero', from_column='PARENT_ID', to_column='UPROC_ID')
+        p.update_all()
+        path = os.path.join(tempfile.mkdtemp(), 'schedule.snapshot')
+        p.save_snapshot(path)
+
+        with load_snapshot(path) as snapshot:
+            self.assertEqual(len(snapshot), len(p.nodes))
+            self.assertEqual(snapshot.project['duration'], p.duration)
+            self.assertEqual(snapshot.get_critical_path(), [_.name for _ in p.get_critical_path()])
+            self.assertEqual(snapshot.names, [_.name for _ in p.nodes])
+            for i, node in enumerate(p.nodes):
+                task = snapshot[node.name]
+                self.assertEqual(task.index, i)
+                self.assertEqual(task, snapshot.task(i))
+                self.assertEqual(
+                    (task.name, task.duration, task.es, task.ef, task.ls, task.lf, task.total_float, task.free_float),
+                    (node.name, node.duration, node.es, node.ef, node.ls, node.lf, node.total_float, node.free_float))
+                self.assertEqual([snapshot.name(_) for _ in snapshot.successors(i)], sorted(
+                    (_.name for _ in node.to_nodes), key=lambda name: snapshot.index(name)))
+                self.assertEqual(len(snapshot.predecessors(i)), len(node.incoming_nodes))
+            self.assertFalse('missing' in snapshot)
+            self.assertRaises(KeyError, snapshot.index, 'missing')
+
+        # An open file given is left open, for the caller to close.
+        with open(path, 'rb') as fin:
+            with load_snapshot(fin) as snapshot:
+                self.assertEqual(snapshot.project['duration'], p.duration)
+            self.assertFalse(fin.closed)
+
+        # Integer names and durations are kept as integers.
+        p = Node('project')
+        for i in range(10):
+            p.add(Node(i * 7 % 10, duration=i))
+        p.link(0, 1).link(1, 2).link(3, 2)
+        p.update_all()
+        fp = io.BytesIO()
+        p.save_snapshot(fp)
+        snapshot = Snapshot(fp.getvalue())
+        self.assertEqual(snapshot.typecode, 'q')
+        self.assertEqual(snapshot[2], (p.nodes.index(p.name_to_node[2]), 2, 6, 0) + tuple(
+            getattr(p.name_to_node[2], _) for _ in ('es', 'ef', 'ls', 'lf', 'total_float', 'free_float')))
+        self.assertEqual(snapshot.es.tolist(), [_.es for _ in p.nodes])
+        self.assertEqual(snapshot.get_critical_path(), [_.name for _ in p.get_critical_path()])
+
+        # A network with no tasks has no times.
+        p = Node('project')
+        p.update_all()
+        fp = io.BytesIO()
+        p.save_snapshot(fp)
+        snapshot = Snapshot(fp.getvalue())
+        self.assertEqual(len(snapshot), 0)
+        self.assertEqual(snapshot.project, dict.fromkeys(('duration', 'es', 'ef', 'ls', 'lf')))
+        self.assertEqual(snapshot.get_critical_path(), [])
+
+        # Names that are neither integers nor strings could not be read back.
+        p = Node('project')
+        p.add(Node(('A', 1), duration=1))
+        p.update_all()
+        self.assertRaises(AssertionError, p.save_snapshot, io.BytesIO())
+
+    @unittest.skipIf(simulation.np is None, 'NumPy is required for simulation.')
+    def test_simulate(self):
+
+        p = Node('project')
+        a = p.add(Node('A', duration=3))
+        b = p.add(Node('B', duration=3))
+        c = p.add(Node('C', duration=4))
+        d = p.add(Node('D', duration=6))
+        e = p.add(Node('E', duration=5))
+        p.link(a, b).link(a, c).link(a, d).link(b, e).link(c, e).link(d, e)
+
+        # Without uncertainty every sample is the deterministic schedule.
+        result = p.simulate(100, {'B': ('uniform', 3, 3)}, seed=0, chunk_size=30)
+        self.assertEqual(result.n_samples, 100)
+        self.assertEqual(result.percentile(50), 14)
+        self.assertEqual(result.criticality, {'A': 1, 'B': 0, 'C': 0, 'D': 1, 'E': 1})
+
+        # B and D share the critical path about equally often.
+        distributions = {'B': ('triangular', 2, 6, 10), 'D': ('pert', 4, 6, 8)}
+        seen = []
+        result = p.simulate(2000, distributions, seed=1, chunk_size=500, callback=lambda r: seen.append(r.n_samples))
+        self.assertEqual(seen, [500, 1000, 1500, 2000])
+        self.assertTrue(result.percentile(50) <= result.percentile(80) <= result.percentile(95))
+        self.assertTrue(0.3 < result.criticality['B'] < 0.7)
+        self.assertEqual(result.criticality['A'], 1)
+        self.assertEqual(result.criticality['C'], 0)
+
+        # Spreading the chunks over processes gives the same samples.
+        pooled = p.simulate(2000, distributions, seed=1, chunk_size=500, workers=2)
+        self.assertEqual(pooled.finish.tolist(), result.finish.tolist())
+        self.assertEqual(pooled.criticality, result.criticality)
+
+        # A network with no tasks has nothing to simulate.
+        self.assertRaises(AssertionError, Node('project').simulate, 10, {})
+
+    def test_update_tree(self):
+
+        def build():
+            portfolio = Node('portfolio')
+            projects = []
+            for i in range(3):
+                project = Node('P%i' % i, lag=i)
+                tasks = [project.add(Node('P%i.T%i' % (i, j), duration=j + i + 1)) for j in range(4)]
+                project.link(tasks[0], tasks[1]).link(tasks[0], tasks[2]).link(tasks[1], tasks[3]).link(tasks[2], tasks[3])
+                projects.append(portfolio.add(project))
+            portfolio.link(projects[0], projects[2]).link(projects[1], projects[2])
+            return portfolio, projects
+
+        # Subprojects have no duration until their own tasks are scheduled.
+        portfolio, projects = build()
+        self.assertEqual(projects[0].duration, None)
+        self.assertRaises(AssertionError, portfolio.update_all)
+        portfolio.update_tree()
+        self.assertEqual([_.duration for _ in projects], [8, 11, 14])
+        self.assertEqual(portfolio.duration, 1 + 11 + 2 + 14)
+        self.assertEqual(projects[2].es, 1 + 11 + 2)
+
+        # Only the changed branch is recalculated.
+        clean = projects[0].get_critical_path(as_item=True)
+        projects[1].lookup_node('P1.T2').duration = 10
+        self.assertEqual(portfolio._dirty_subprojects, set([projects[1]]))
+        portfolio.update_tree()
+        self.assertTrue(projects[0].get_critical_path(as_item=True) is clean)
+        self.assertEqual(projects[1].duration, 17)
+        self.assertEqual(portfolio.duration, 1 + 17 + 2 + 14)
+        self.assertEqual(portfolio.get_critical_path(), [projects[1], projects[2]])
+        self.assertEqual(projects[0].total_float, 10)
+
+        # Subprojects updated in worker processes get the same times.
+        pooled, pooled_projects = build()
+        pooled.update_tree(workers=2)
+        serial, serial_projects = build()
+        serial.update_tree()
+        for a, b in zip(pooled_projects, serial_projects):
+            self.assertEqual([_.name for _ in a.get_critical_path()], [_.name for _ in b.get_critical_path()])
+            for x, y in zip(a.nodes + [a], b.nodes + [b]):
+                self.assertEqual((x.es, x.ef, x.ls, x.lf, x.total_float, x.free_float),
+                                 (y.es, y.ef, y.ls, y.lf, y.total_float, y.free_float))
+        self.assertEqual(pooled.duration, serial.duration)
+
+        # Subprojects nested two deep keep the times of their own parent's network.
+        def build_nested():
+            root = Node('root')
+            programs = []
+            for i in range(2):
+                program = Node('G%i' % i, lag=1)
+                projects = []
+                for j in range(3):
+                    project = Node('G%i.P%i' % (i, j), lag=j)
+                    a = project.add(Node('G%i.P%i.A' % (i, j), duration=i + j + 1))
+                    b = project.add(Node('G%i.P%i.B' % (i, j), duration=3, lag=1))
+                    project.link(a, b)
+                    projects.append(program.add(project))
+                program.link(projects[0], projects[2]).link(projects[1], projects[2])
+                programs.append(root.add(program))
+            root.link(programs[0], programs[1])
+            return root
+
+        def walk(parent):
+            for node in parent.nodes:
+                yield node
+                for child in walk(node):
+                    yield child
+
+        pooled = build_nested()
+        pooled.update_tree(workers=2)
+        serial = build_nested()
+        serial.update_tree()
+        for x, y in zip(walk(pooled), walk(serial)):
+            self.assertEqual(x.name, y.name)
+            self.assertEqual((x.duration, x.es, x.ef, x.ls, x.lf, x.total_float, x.free_float),
+                             (y.duration, y.es, y.ef, y.ls, y.lf, y.total_float, y.free_float))
+        self.assertEqual(pooled.duration, serial.duration)
+        self.assertEqual(serial.lookup_node('G1').nodes[2].es, 1 + 1 + 7 + 2)
+
+    def test_batch_update(self):
+
+        def build():
+            rng = random.Random(0)
+            projects = []
+            for i, size in enumerate([300, 5, 40, 0, 12, 60, 7]):
+                project = Node('P%i' % i, lag=i % 2)
+                for j in range(size):
+                    project.add(Node(j, duration=rng.randint(0, 9), lag=rng.choice([0, 1])))
+                for _ in range(2 * size):
+                    project.link(*sorted(rng.sample(range(size), 2)))
+                projects.append(project)
+            # One project with subprojects of its own, nested two deep.
+            a = Node('A')
+            a.add(Node('A1', duration=2))
+            a.add(Node('A2', duration=4))
+            a.link('A1', 'A2')
+            c = Node('C', lag=2)
+            c.add(Node('C1', duration=1, lag=1))
+            d = Node('D', lag=1)
+            d.add(Node('D1', duration=5))
+            d.add(Node('D2', duration=2, lag=1))
+            d.link('D1', 'D2')
+            c.add(d)
+            c.link('C1', 'D')
+            portfolio = Node('portfolio')
+            portfolio.add(a)
+            portfolio.add(Node('B', duration=3))
+            portfolio.add(c)
+            portfolio.link('A', 'B').link('B', 'C')
+            projects.append(portfolio)
+            return projects
+
+        def walk(parent):
+            for node in parent.nodes:
+                yield node
+                for child in walk(node):
+                    yield child
+
+        expected = build()
+        for project in expected:
+            project.update_tree()
+        for workers in (None, 2):
+            projects = build()
+            finished = list(batch_update(projects, workers=workers, chunks_per_worker=2))
+            self.assertEqual(sorted(_.name for _ in finished), sorted(_.name for _ in projects))
+            for project, other in zip(projects, expected):
+                self.assertEqual(project.duration, other.duration)
+                self.assertFalse(project._needs_update())
+                for x, y in zip(walk(project), walk(other)):
+                    self.assertEqual(
+                        (x.duration, x.es, x.ef, x.ls, x.lf, x.total_float, x.free_float, x._path_length),
+                        (y.duration, y.es, y.ef, y.ls, y.lf, y.total_float, y.free_float, y._path_length))
+        self.assertEqual(projects[-1].nodes[0].nodes[1].ef, 6)
+        # D starts after C1 inside C, counting from C's lag.
+        self.assertEqual(projects[-1].nodes[2].nodes[1].es, 2 + 1 + 1 + 1)
+        self.assertEqual(projects[-1].duration, 6 + 3 + 2 + 11)
+
+    def test_components(self):
+
+        def build():
+            # Four separate networks, their nodes added in turn, and two lone tasks.
+            rng = random.Random(1)
+            p = Node('project', lag=2)
+            sizes = [120, 60, 30, 8]
+            for j in range(max(sizes)):
+                for i, size in enumerate(sizes):
+                    if j < size:
+                        p.add(Node((i, j), duration=rng.randint(0, 9), lag=rng.choice([0, 0, 1])))
+            for i, size in enumerate(sizes):
+                for j in range(1, size):
+                    p.link((i, rng.randrange(j)), (i, j))
+                for _ in range(size):
+                    p.link(*[(i, _) for _ in sorted(rng.sample(range(size), 2))])
+            p.add(Node('x', duration=3))
+            p.add(Node('y', duration=0))
+            return p
+
+        p = build()
+        self.assertEqual([len(_) for _ in p.components()], [120, 60, 30, 8, 1, 1])
+        self.assertEqual(set(_.name[0] for _ in p.components()[1]), set([1]))
+        self.assertIs(p.components(), p.components())
+
+        expected = build()
+        expected.update_all(incremental=False)
+        for update in (
+                lambda p: p.update_all(components=True, workers=2),
+                lambda p: components.update(p, workers=2, min_size=50)):
+            p = build()
+            update(p)
+            self.assertFalse(p._needs_update())
+            self.assertEqual(p.duration, expected.duration)
+            self.assertEqual((p.es, p.ef, p.ls, p.lf), (expected.es, expected.ef, expected.ls, expected.lf))
+            self.assertEqual(
+                [_.name for _ in p.get_critical_path()], [_.name for _ in expected.get_critical_path()])
+            for x, y in zip(p.nodes, expected.nodes):
+                self.assertEqual(
+                    (x.es, x.ef, x.ls, x.lf, x.total_float, x.free_float, x.drag),
+                    (y.es, y.ef, y.ls, y.lf, y.total_float, y.free_float, y.drag))
+
+        # Later changes are picked up incrementally as usual.
+        p.nodes[1].duration += 100
+        p.update_all()
+        self.assertEqual(p.get_critical_path()[-1].name[0], 1)
+
     def test_acyclic(self):
 
         def test_graph(n):
@@ -160,6 +1366,128 @@ class Test(unittest.TestCase):
             t = timeit(lambda: g.is_acyclic(), number=1)
             print('%i %.06f' % (n, t))
 
+    def test_critical_path_ladder(self):
+        # A ladder with 2**n simple paths must not be solved by enumerating them.
+        n = 500
+        p = Node(name='graph')
+        for i in range(n):
+            from_id = 3 * i
+            to_id1 = 3 * i + 1
+            to_id2 = 3 * i + 2
+            to_id3 = 3 * (i + 1)
+            p.get_or_create_node(name=from_id, duration=1)
+            p.get_or_create_node(name=to_id1, duration=1)
+            p.get_or_create_node(name=to_id2, duration=2)
+            p.get_or_create_node(name=to_id3, duration=1)
+            p.link(from_id, to_id1)
+            p.link(from_id, to_id2)
+            p.link(to_id1, to_id3)
+            p.link(to_id2, to_id3)
+        t = timeit(lambda: p.get_critical_path(as_item=True), number=1)
+        print('ladder n=%i %.06f' % (n, t))
+        duration, path, priors = p.get_critical_path(as_item=True)
+        self.assertEqual(duration, 3 * n + 1)
+        self.assertEqual([_.name for _ in path], [3 * (i // 2) + 2 * (i % 2) for i in range(2 * n + 1)])
+        self.assertEqual(priors, set(path))
+
+    def test_critical_paths(self):
+
+        p = Node('project')
+        a = p.add(Node('A', duration=3))
+        b = p.add(Node('B', duration=3))
+        c = p.add(Node('C', duration=4))
+        d = p.add(Node('D', duration=6))
+        e = p.add(Node('E', duration=5))
+        p.link(a, b).link(a, c).link(a, d).link(b, e).link(c, e).link(d, e)
+        self.assertEqual(list(p.get_critical_paths()), [(14, [a, d, e]), (12, [a, c, e]), (11, [a, b, e])])
+        self.assertEqual(list(p.get_critical_paths(k=1)), [(14, p.get_critical_path())])
+        self.assertEqual(list(p.get_critical_paths(within=2)), [(14, [a, d, e]), (12, [a, c, e])])
+
+        # Every path, longest first, matches enumerating them all.
+        rng = random.Random(0)
+        p = Node('project')
+        for i in range(40):
+            p.add(Node(i, duration=rng.randint(0, 10)))
+        for _ in range(80):
+            p.link(*sorted(rng.sample(range(40), 2)))
+        p.update_all()
+
+        def paths(node):
+            if not node.to_nodes:
+                return [[node]]
+            return [[node] + _ for to_node in node.to_nodes for _ in paths(to_node)]
+        expected = [path for node in p.first_nodes for path in paths(node)]
+        expected = sorted(sum(_.duration for _ in path) for path in expected)[::-1]
+        found = list(p.get_critical_paths())
+        self.assertEqual([length for length, _ in found], expected)
+        for length, path in found:
+            self.assertEqual(sum(_.duration for _ in path), length)
+            self.assertFalse(path[0].incoming_nodes)
+            self.assertFalse(path[-1].to_nodes)
+        self.assertEqual(found[0][0], p.duration)
+        self.assertEqual(list(p.get_critical_paths(k=10)), found[:10])
+        self.assertEqual([_[0] for _ in p.get_critical_paths(within=5)], [_ for _ in expected if _ >= expected[0] - 5])
+
+        # Only the top few paths of a ladder with 2**500 of them are visited.
+        p = Node('graph')
+        for i in range(500):
+            p.get_or_create_node(name=3 * i, duration=1)
+            p.get_or_create_node(name=3 * i + 1, duration=1)
+            p.get_or_create_node(name=3 * i + 2, duration=2)
+            p.get_or_create_node(name=3 * i + 3, duration=1)
+            p.link(3 * i, 3 * i + 1).link(3 * i, 3 * i + 2).link(3 * i + 1, 3 * i + 3).link(3 * i + 2, 3 * i + 3)
+        p.update_all()
+        self.assertEqual([_[0] for _ in p.get_critical_paths(k=3)], [1501, 1500, 1500])
+
+        # Equally long paths are finished one at a time, not grown side by
+        # side, so a ladder of 2**500 tied paths yields the first few at once.
+        p = Node('graph')
+        for i in range(500):
+            p.get_or_create_node(name=3 * i, duration=1)
+            p.get_or_create_node(name=3 * i + 1, duration=1)
+            p.get_or_create_node(name=3 * i + 2, duration=1)
+            p.get_or_create_node(name=3 * i + 3, duration=1)
+            p.link(3 * i, 3 * i + 1).link(3 * i, 3 * i + 2).link(3 * i + 1, 3 * i + 3).link(3 * i + 2, 3 * i + 3)
+        p.update_all()
+        found = list(p.get_critical_paths(k=5, within=0))
+        self.assertEqual([_[0] for _ in found], [1001] * 5)
+        self.assertEqual(len(set(tuple(_[1]) for _ in found)), 5)
+
+    def test_from_dsv(self):
+
+        # The same network as test_model_small, without pandas.
+        p = Node.from_dsv(
+            os.path.join(BASE_DIR, 'fixtures/timings.dsv'),
+            os.path.join(BASE_DIR, 'fixtures/deps_small.dsv'),
+            missing='create_zero', from_column='PARENT_ID', to_column='UPROC_ID')
+        p.update_all()
+
+        expected = Node('project')
+        times = pd.read_csv(os.path.join(BASE_DIR, 'fixtures/timings.dsv'), delimiter='|', dtype={'PROC_ID': str})
+        deps = pd.read_csv(os.path.join(BASE_DIR, 'fixtures/deps_small.dsv'), delimiter='|', dtype={'PARENT_ID': str, 'UPROC_ID': str})
+        for utiming in times.itertuples(index=False):
+            expected.add(Node(utiming.PROC_ID, duration=utiming.DURATION))
+        for dep in deps.itertuples(index=False):
+            for errordep in dep:
+                expected.add(Node(errordep, duration=0))
+            expected.link(dep.PARENT_ID, dep.UPROC_ID)
+        expected.update_all()
+
+        self.assertEqual(p.duration, expected.duration)
+        self.assertEqual(p.get_critical_path(), expected.get_critical_path())
+        self.assertEqual(len(p.nodes), len(expected.nodes))
+
+        timings = io.StringIO(u'NAME,DAYS\nA,3\nB,1.5\n')
+        deps = io.StringIO(u'FROM,TO\nA,B\nB,C\n')
+        self.assertRaises(KeyError, Node.from_dsv, timings, deps, delimiter=',')
+
+        timings.seek(0)
+        deps.seek(0)
+        p = Node.from_dsv(timings, deps, delimiter=',', missing='skip')
+        self.assertEqual([(n.name, n.duration) for n in p.nodes], [('A', 3), ('B', 1.5)])
+        p.update_all()
+        self.assertEqual(p.get_critical_path(), [p.lookup_node('A'), p.lookup_node('B')])
+
     def test_model_small(self):
 
         p = Node('project')
@@ -187,7 +1515,6 @@ class Test(unittest.TestCase):
         critical_path = p.get_critical_path()
         print(critical_path)
 
-    @unittest.skip('Too intensive for Travis. Runs fine locally, but takes about 10 minutes to complete.')
     def test_model_big(self):
         """
         A very large graph that tests the CPU and memory efficiency of our cyclic checker.
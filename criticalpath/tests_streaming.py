@@ -0,0 +1,89 @@
+"""
+Tests of criticalpath.streaming, which use asynchronous generators, so
+tests.py only mixes them into its test case on Python 3.6 or later.
+"""
+import asyncio
+
+from criticalpath import Node
+from criticalpath.streaming import StreamingUpdater
+
+
+def _project():
+    p = Node('project')
+    for name, duration, lag in (('a', 3, 0), ('b', 4, 1), ('c', 5, 0), ('d', 2, 0)):
+        p.add(Node(name, duration=duration, lag=lag))
+    p.link('a', 'b').link('b', 'c').link('a', 'd').link('d', 'c')
+    p.update_all()
+    return p
+
+
+def _drain(queue):
+    revisions = []
+    while not queue.empty():
+        revisions.append(queue.get_nowait())
+    return revisions
+
+
+class StreamingTests(object):
+
+    def test_streaming(self):
+        p = _project()
+        updater = StreamingUpdater(p)
+        queue = updater.subscribe()
+
+        # Each flush publishes everything submitted since the last one as one revision.
+        for event in (('start', 'a', 0), ('finish', 'a', 5), ('start', 'b', 5), ('duration', 'd', 2)):
+            updater.submit(*event)
+        updater.flush()
+        # A finished task keeps its times, and a started one its start.
+        updater.submit('duration', 'a', 1)
+        updater.submit('duration', 'd', 10)
+        updater.flush()
+        updater.submit('finish', 'b', 12)
+        updater.flush()
+        # With nothing queued, nothing is published.
+        updater.flush()
+
+        revisions = _drain(queue)
+        self.assertEqual([_.version for _ in revisions], [0, 1, 2, 3])
+        self.assertEqual([_.events for _ in revisions], [0, 4, 2, 1])
+        self.assertEqual(revisions[0].finish, 13)
+        self.assertEqual(revisions[0].times['c'], (8, 13, 8, 13))
+        self.assertEqual((revisions[1].finish, revisions[1].critical_path), (14, ['a', 'b', 'c']))
+        self.assertEqual(revisions[1].times['b'], (5, 9, 5, 9))
+        self.assertEqual((revisions[2].finish, revisions[2].critical_path), (20, ['a', 'd', 'c']))
+        self.assertEqual(revisions[2].times['a'], (0, 5, 0, 5))
+        self.assertEqual(revisions[2].times['b'], (5, 9, 11, 15))
+        self.assertEqual(revisions[3].finish, 20)
+        self.assertEqual((p.name_to_node['a'].es, p.name_to_node['a'].ef), (0, 5))
+        self.assertEqual((p.name_to_node['b'].es, p.name_to_node['b'].ef), (5, 12))
+
+        # Only b had to be pinned, and gets its own lag back.
+        self.assertEqual(updater.original_lags, {'b': 1})
+        self.assertEqual(p.name_to_node['b'].lag, 0)
+        updater.restore()
+        self.assertEqual(p.name_to_node['b'].lag, 1)
+
+    def test_streaming_run(self):
+        p = _project()
+
+        async def events():
+            for event in (('start', 'a', 0), ('finish', 'a', 5), ('start', 'b', 5), ('duration', 'd', 10)):
+                yield event
+
+        async def run():
+            # A budget far longer than the stream takes, so every event
+            # arrives before it runs out and they all go in one batch.
+            updater = StreamingUpdater(p, latency=60)
+            queue = updater.subscribe()
+            await updater.run(events())
+            return _drain(queue)
+
+        loop = asyncio.new_event_loop()
+        try:
+            revisions = loop.run_until_complete(run())
+        finally:
+            loop.close()
+        self.assertEqual([_.version for _ in revisions], [0, 1])
+        self.assertEqual([_.events for _ in revisions], [0, 4])
+        self.assertEqual((revisions[1].finish, revisions[1].critical_path), (20, ['a', 'd', 'c']))